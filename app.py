@@ -1,27 +1,94 @@
+from collections.abc import AsyncIterator, Callable, Coroutine, Iterator
+import json
+import math
 import os
+import re
+from typing import Any
+import uuid
 
-from flask import Flask, render_template, request
+from flask import (
+    Flask,
+    Response,
+    g,
+    has_request_context,
+    jsonify,
+    render_template,
+    request,
+    stream_with_context,
+)
 from youtube_transcript_api import TranscriptsDisabled
 
-from services import video_processor
-from utils import file_io
-from utils.logging_config import setup_logging
+import config
+from services import jobs, overload, pipeline, video_processor, youtube
+from utils import file_io, metrics
+from utils.background_loop import BACKGROUND_LOOP
+from utils.logging_config import request_id_var, setup_logging
 
 # ============================================================================
 # App Configuration
 # ============================================================================
 
-app = Flask(__name__)
+
+class Youtamp(Flask):
+    """Runs async views on the shared background loop.
+
+    Flask's default starts a new event loop for every request, so the rate
+    limiter, Gemini clients and in-flight deduplication would never be shared
+    between concurrent requests. The request and its context variables are
+    carried over to the loop.
+    """
+
+    def async_to_sync(self, func: Callable[..., Coroutine[Any, Any, Any]]) -> Callable[..., Any]:
+        def run(*args: Any, **kwargs: Any) -> Any:
+            # Read the body on this thread so a slow client cannot stall the loop.
+            if has_request_context():
+                request.get_data(cache=True)
+            return BACKGROUND_LOOP.submit(func(*args, **kwargs)).result()
+
+        return run
+
+
+app = Youtamp(__name__)
 setup_logging(app)
 
+TRANSCRIPTS_DISABLED_MESSAGE = (
+    "Could not generate timestamps because transcripts are disabled for this video."
+)
+GEMINI_UNAVAILABLE_MESSAGE = (
+    "The timestamp generator is overloaded right now. Please try again in a minute."
+)
+
+
+# Accept a caller-supplied X-Request-ID only if it is short and log-safe.
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
 
 @app.before_request
 def log_request_info():
+    request_id = request.headers.get("X-Request-ID", "")
+    if not REQUEST_ID_RE.match(request_id):
+        request_id = uuid.uuid4().hex[:16]
+    g.request_id = request_id
+    g.request_id_token = request_id_var.set(request_id)
     app.logger.info(
         "Request: %s %s from %s", request.method, request.path, request.remote_addr
     )
 
 
+@app.after_request
+def add_request_id_header(response: Response) -> Response:
+    if "request_id" in g:
+        response.headers["X-Request-ID"] = g.request_id
+    return response
+
+
+@app.teardown_request
+def clear_request_id(_error: BaseException | None) -> None:
+    token = g.pop("request_id_token", None)
+    if token is not None:
+        request_id_var.reset(token)
+
+
 @app.route("/", methods=["GET"])
 def index() -> str:
     # Default to index.html, can be overridden by environment variable or other config
@@ -30,7 +97,7 @@ def index() -> str:
 
 
 @app.route("/api/timestamp/generate", methods=["POST"])
-async def generate_timestamps() -> str | tuple[str, int]:
+async def generate_timestamps() -> str | tuple[str, int] | tuple[str, int, dict[str, str]]:
     if request.method == "POST":
         # MOCK_FILE env var can be used for testing
         mock_file = os.environ.get("MOCK_FILE")
@@ -62,7 +129,11 @@ async def generate_timestamps() -> str | tuple[str, int]:
 
         except TranscriptsDisabled as e:
             app.logger.warning(f"Transcripts are disabled for URL {data.get('url', '')}: {e}")
-            return "Could not generate timestamps because transcripts are disabled for this video.", 400
+            return TRANSCRIPTS_DISABLED_MESSAGE, 400
+        except overload.GeminiUnavailableError as e:
+            app.logger.warning(f"Gemini is unavailable for URL {data.get('url', '')}: {e}")
+            retry_after = str(math.ceil(e.retry_after))
+            return GEMINI_UNAVAILABLE_MESSAGE, 503, {"Retry-After": retry_after}
         except Exception:
             app.logger.exception("An unexpected error occurred during timestamp generation.")
             return "An internal server error occurred.", 500
@@ -70,7 +141,220 @@ async def generate_timestamps() -> str | tuple[str, int]:
     return "Method Not Allowed", 405
 
 
+# ============================================================================
+# Streaming (Server-Sent Events)
+# ============================================================================
+
+def sse_event(event: str, data: str = "") -> str:
+    lines = data.split("\n") or [""]
+    return f"event: {event}\n" + "".join(f"data: {line}\n" for line in lines) + "\n"
+
+
+def iter_async(agen: AsyncIterator[str]) -> Iterator[str]:
+    """Drives an async generator on the background loop from the WSGI response iterator.
+
+    When the client disconnects, the server closes this generator, which closes
+    the async generator and cancels the Gemini stream behind it.
+    """
+    done = object()
+
+    async def step() -> object:
+        return await anext(agen, done)
+
+    try:
+        while (item := BACKGROUND_LOOP.submit(step()).result()) is not done:
+            yield item
+    finally:
+        BACKGROUND_LOOP.submit(agen.aclose()).result()
+
+
+async def stream_timestamp_events(
+    url: str, additional_instruction: str, language: str
+) -> AsyncIterator[str]:
+    try:
+        mock_file = os.environ.get("MOCK_FILE")
+        if mock_file:
+            app.logger.info(f"Mock mode enabled. Streaming from {mock_file}")
+            timestamps = await file_io.async_read_file(mock_file)
+            for line in timestamps.split("\n"):
+                if line.strip():
+                    yield sse_event("timestamp", line.strip())
+        else:
+            async for event, data in video_processor.stream_video_timestamp(
+                url, additional_instruction, language
+            ):
+                yield sse_event(event, data)
+        app.logger.info(f"Successfully streamed timestamps for URL: {url}")
+        yield sse_event("done")
+    except TranscriptsDisabled as e:
+        app.logger.warning(f"Transcripts are disabled for URL {url}: {e}")
+        yield sse_event("error", TRANSCRIPTS_DISABLED_MESSAGE)
+    except overload.GeminiUnavailableError as e:
+        app.logger.warning(f"Gemini is unavailable for URL {url}: {e}")
+        yield sse_event("error", GEMINI_UNAVAILABLE_MESSAGE)
+    except Exception:
+        app.logger.exception("An unexpected error occurred during timestamp streaming.")
+        yield sse_event("error", "An internal server error occurred.")
+
+
+@app.route("/api/timestamp/stream", methods=["POST"])
+def stream_timestamps() -> Response | tuple[str, int]:
+    data = request.get_json(silent=True)
+    if not data or "url" not in data:
+        app.logger.warning("Bad Request: 'url' missing from request body")
+        return "Error: 'url' is a required field.", 400
+
+    url = data.get("url")
+    additional_instruction = data.get("additional_instruction", "")
+    language = data.get("language", "auto")
+
+    app.logger.info(f"Streaming timestamp for URL: {url}")
+    events = iter_async(stream_timestamp_events(url, additional_instruction, language))
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ============================================================================
+# Playlists and Channels
+# ============================================================================
+
+def public_error(error_type: str) -> str:
+    if error_type == TranscriptsDisabled.__name__:
+        return TRANSCRIPTS_DISABLED_MESSAGE
+    if error_type == overload.GeminiUnavailableError.__name__:
+        return GEMINI_UNAVAILABLE_MESSAGE
+    return "An internal server error occurred."
+
+
+async def stream_collection_events(
+    url: str, additional_instruction: str, language: str, max_videos: int
+) -> AsyncIterator[str]:
+    try:
+        video_ids = await youtube.async_expand_url(url, max_videos)
+    except ValueError as e:
+        app.logger.warning(f"Could not expand {url}: {e}")
+        yield sse_event("error", str(e))
+        return
+    except Exception:
+        app.logger.exception(f"Could not expand {url}")
+        yield sse_event("error", "Could not list the videos for this URL.")
+        return
+
+    yield sse_event("videos", json.dumps(video_ids))
+    try:
+        async for result in pipeline.run_pipeline(
+            pipeline.items_for(video_ids), additional_instruction, language
+        ):
+            body = result.to_dict()
+            if result.status == "failed":
+                body["error"] = public_error(result.error_type)
+            yield sse_event("result", json.dumps(body, ensure_ascii=False))
+        app.logger.info(f"Successfully processed {len(video_ids)} videos for URL: {url}")
+        yield sse_event("done")
+    except Exception:
+        app.logger.exception("An unexpected error occurred while processing a collection.")
+        yield sse_event("error", "An internal server error occurred.")
+
+
+@app.route("/api/timestamp/collection", methods=["POST"])
+def collection_timestamps() -> Response | tuple[str, int]:
+    """Streams one ``result`` event per video of a playlist or channel as each finishes."""
+    data = request.get_json(silent=True)
+    if not data or "url" not in data:
+        app.logger.warning("Bad Request: 'url' missing from request body")
+        return "Error: 'url' is a required field.", 400
+    try:
+        max_videos = int(data.get("max_videos", config.COLLECTION_MAX_VIDEOS))
+    except (TypeError, ValueError):
+        return "Error: 'max_videos' must be an integer.", 400
+    max_videos = max(1, min(max_videos, config.COLLECTION_MAX_VIDEOS))
+
+    url = data.get("url")
+    app.logger.info(f"Processing collection for URL: {url}")
+    events = iter_async(
+        stream_collection_events(
+            url,
+            data.get("additional_instruction", ""),
+            data.get("language", "auto"),
+            max_videos,
+        )
+    )
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ============================================================================
+# Background Jobs
+# ============================================================================
+
+def job_response(job: jobs.Job) -> dict[str, object]:
+    body: dict[str, object] = {
+        "id": job.id,
+        "url": job.url,
+        "status": job.status,
+        "priority": job.priority,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == jobs.QUEUED:
+        body["queue_position"] = jobs.JOB_STORE.position(job)
+    elif job.status == jobs.DONE:
+        body["result"] = job.result
+    elif job.status == jobs.FAILED:
+        body["error"] = public_error(job.error_type)
+    return body
+
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job() -> tuple[Response, int] | tuple[str, int]:
+    data = request.get_json(silent=True)
+    if not data or "url" not in data:
+        app.logger.warning("Bad Request: 'url' missing from request body")
+        return "Error: 'url' is a required field.", 400
+    try:
+        priority = int(data.get("priority", 0))
+    except (TypeError, ValueError):
+        return "Error: 'priority' must be an integer.", 400
+
+    job = jobs.submit_job(
+        data.get("url"),
+        data.get("additional_instruction", ""),
+        data.get("language", "auto"),
+        priority,
+    )
+    response = jsonify(job_response(job))
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return response, 202
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id: str) -> tuple[Response, int] | tuple[str, int]:
+    # Resume any jobs left queued by a previous process.
+    jobs.JOB_POOL.start()
+    job = jobs.JOB_STORE.get(job_id)
+    if job is None:
+        return "Error: job not found.", 404
+    return jsonify(job_response(job)), 200
+
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint() -> Response:
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     app.logger.info("Starting Youtamp development server.")
-    # In a production environment, use a proper WSGI server like Gunicorn or uWSGI
+    jobs.JOB_POOL.start()
+    # In production, use cli/serve.py instead.
     app.run(debug=True, host="0.0.0.0", port=45334)
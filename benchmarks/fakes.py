@@ -0,0 +1,250 @@
+"""Local stand-ins for YouTube and Gemini used by the benchmarks.
+
+Nothing here touches the network, so runs are repeatable and free. Latencies are
+simulated with sleeps: blocking ``time.sleep`` for the transcript fetch (the real
+client is synchronous and runs in a thread) and ``asyncio.sleep`` for Gemini.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Iterator
+import contextlib
+from dataclasses import dataclass, field
+import random
+import re
+import threading
+import time
+from typing import Any
+from unittest.mock import patch
+
+from google.genai.errors import ClientError, ServerError
+from tenacity import wait_exponential
+
+import config
+from services import gemini, rate_limit, youtube
+
+WORDS = (
+    "so", "today", "we", "are", "going", "to", "talk", "about", "the", "new", "release", "and",
+    "how", "it", "changes",
+    "วันนี้", "เรา", "จะ", "มา", "คุย", "เรื่อง", "การ", "ออกแบบ", "ระบบ", "ที่", "ดี",
+)
+
+# "0:05:10 - caption text" lines in the prompt; see youtube.format_transcript.
+PROMPT_TIME_RE = re.compile(r"^(\d+):(\d{2}):(\d{2}) - ", re.MULTILINE)
+
+
+@dataclass(frozen=True, slots=True)
+class FakeSnippet:
+    text: str
+    start: float
+    duration: float
+
+
+def make_snippets(
+    duration_seconds: float, seconds_per_entry: float = 3.0, seed: int = 0
+) -> list[FakeSnippet]:
+    """Builds a caption track of the given length with ~8 words per entry."""
+    rng = random.Random(seed)
+    snippets: list[FakeSnippet] = []
+    start = 0.0
+    while start < duration_seconds:
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 11)))
+        snippets.append(FakeSnippet(text, round(start, 2), seconds_per_entry))
+        start += seconds_per_entry
+    return snippets
+
+
+class FakeTranscriptApi:
+    """Replaces ``YouTubeTranscriptApi``; every video has the same configured length."""
+
+    def __init__(self, duration_seconds: float, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.snippets = make_snippets(duration_seconds)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> "FakeTranscriptApi":
+        # Stands in for the class, so ``YouTubeTranscriptApi()`` returns this instance.
+        return self
+
+    def fetch_track(self) -> list[FakeSnippet]:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.snippets
+
+    def list(self, video_id: str) -> list["FakeTrack"]:
+        # Every fake video has one Thai track.
+        return [FakeTrack(self)]
+
+
+@dataclass(slots=True)
+class FakeTrack:
+    api: FakeTranscriptApi
+    language_code: str = "th"
+    is_generated: bool = False
+
+    def fetch(self) -> list[FakeSnippet]:
+        return self.api.fetch_track()
+
+
+@dataclass(slots=True)
+class FakeResponse:
+    text: str
+
+
+@dataclass(slots=True)
+class FakeGeminiStats:
+    calls: int = 0
+    errors: int = 0
+    # How much later than requested each simulated call woke up. On an otherwise
+    # idle loop this is the event-loop lag seen by that request.
+    oversleep: list[float] = field(default_factory=list)
+
+
+class FakeModels:
+    def __init__(
+        self,
+        latency: float,
+        error_rate: float,
+        chapter_every: float,
+        stats: FakeGeminiStats,
+        seed: int,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.chapter_every = chapter_every
+        self.stats = stats
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _maybe_fail(self) -> None:
+        with self._lock:
+            self.stats.calls += 1
+            failed = self._rng.random() < self.error_rate
+            code = self._rng.choice((429, 503))
+            if failed:
+                self.stats.errors += 1
+        if not failed:
+            return
+        status = "RESOURCE_EXHAUSTED" if code == 429 else "UNAVAILABLE"
+        error = ClientError if code == 429 else ServerError
+        raise error(code, {"error": {"code": code, "message": "injected", "status": status}})
+
+    async def _sleep(self, seconds: float) -> None:
+        started = time.perf_counter()
+        await asyncio.sleep(seconds)
+        overshoot = time.perf_counter() - started - seconds
+        with self._lock:
+            self.stats.oversleep.append(max(0.0, overshoot))
+
+    def _answer(self, contents: str | list[str]) -> str:
+        """Emits one chapter per ``chapter_every`` seconds of the transcript in the prompt."""
+        chapters: list[str] = []
+        next_at = -1.0
+        parts = [contents] if isinstance(contents, str) else contents
+        matches = (match for part in parts for match in PROMPT_TIME_RE.finditer(part))
+        for match in matches:
+            hours, minutes, seconds = map(int, match.groups())
+            at = hours * 3600 + minutes * 60 + seconds
+            if at >= next_at:
+                chapters.append(
+                    f"{hours:02d}:{minutes:02d}:{seconds:02d} - Chapter {len(chapters) + 1}"
+                )
+                next_at = at + self.chapter_every
+        return "\n".join(chapters) or "00:00 - Intro"
+
+    async def generate_content(
+        self, *, model: str, contents: str | list[str], config: Any
+    ) -> FakeResponse:
+        await self._sleep(self.latency)
+        self._maybe_fail()
+        return FakeResponse(self._answer(contents))
+
+    async def generate_content_stream(
+        self, *, model: str, contents: str | list[str], config: Any
+    ) -> AsyncIterator[FakeResponse]:
+        answer = self._answer(contents)
+
+        async def stream() -> AsyncIterator[FakeResponse]:
+            # Like the real client, nothing is sent until the first chunk is awaited.
+            await self._sleep(self.latency / 2)
+            self._maybe_fail()
+            lines = answer.split("\n")
+            for n, line in enumerate(lines):
+                if n:
+                    await self._sleep(self.latency / 2 / len(lines))
+                yield FakeResponse(line + "\n")
+
+        return stream()
+
+
+class FakeGeminiClient:
+    """Replaces the ``genai.Client(...).aio`` returned by ``gemini.get_client``."""
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        error_rate: float = 0.0,
+        chapter_every: float = 300.0,
+        seed: int = 0,
+    ) -> None:
+        self.stats = FakeGeminiStats()
+        self.models = FakeModels(latency, error_rate, chapter_every, self.stats, seed)
+
+
+@dataclass(slots=True)
+class Fakes:
+    transcripts: FakeTranscriptApi
+    gemini: FakeGeminiClient
+
+
+@contextlib.contextmanager
+def install_fakes(
+    transcript_seconds: float,
+    transcript_latency: float = 0.2,
+    gemini_latency: float = 1.0,
+    error_rate: float = 0.0,
+    rpm: int = 1_000_000,
+    retry_wait_scale: float = 1.0,
+) -> Iterator[Fakes]:
+    """Routes YouTube and Gemini calls to fakes for the duration of the block.
+
+    Caches, the transcript store and artifact saving are turned off so every request
+    does the full amount of work. ``retry_wait_scale`` shrinks the tenacity backoff
+    (4-20s in production) for runs with injected errors.
+    """
+    fakes = Fakes(
+        FakeTranscriptApi(transcript_seconds, transcript_latency),
+        FakeGeminiClient(gemini_latency, error_rate),
+    )
+    wait = wait_exponential(
+        multiplier=retry_wait_scale, min=4 * retry_wait_scale, max=20 * retry_wait_scale
+    )
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(patch.object(youtube, "YouTubeTranscriptApi", fakes.transcripts))
+        stack.enter_context(
+            patch.object(youtube, "TRACK_LISTS", youtube.TrackListCache(ttl=0, max_entries=0))
+        )
+        stack.enter_context(patch.object(gemini, "get_client", lambda api_key=None: fakes.gemini))
+        stack.enter_context(
+            patch.object(
+                gemini, "RATE_LIMITER", rate_limit.InProcessRateLimiter(rate_limit.Quota(rpm))
+            )
+        )
+        # A fresh controller per run, so one scenario's errors do not throttle the next.
+        stack.enter_context(patch.object(gemini, "OVERLOAD", gemini.create_overload_controller()))
+        for retried in (gemini.evaluate_timestamps, gemini._open_stream):
+            stack.enter_context(patch.object(retried.retry, "wait", wait))
+        # Every fake video has the same transcript, so near-duplicate reuse would
+        # skip Gemini for all but the first. The fake client has no cache API.
+        for name in (
+            "RESULT_CACHE_ENABLED",
+            "TRANSCRIPT_STORE_ENABLED",
+            "NEAR_DUPLICATE_ENABLED",
+            "CONTEXT_CACHE_ENABLED",
+        ):
+            stack.enter_context(patch.object(config, name, False))
+        for name in ("LOAD_PROMPT", "SAVE_PROMPT", "SAVE_RESPONSE"):
+            stack.enter_context(patch.object(config, name, False))
+        yield fakes
@@ -0,0 +1,101 @@
+"""Micro-benchmark of transcript formatting for the prompt.
+
+    uv run python -m benchmarks.formatting --durations 5m,1h,10h
+
+Compares the per-entry path (``format_transcript_lines``: a timedelta, ``str()``
+and f-string per caption, then a join) with the bulk ``format_transcript`` path
+on the same fake caption track, and checks that both produce the same text.
+"""
+
+import argparse
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+import gc
+from pathlib import Path
+import sys
+import time
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fakes import make_snippets
+from benchmarks.loadtest import parse_duration
+from services import youtube
+
+
+@dataclass(slots=True)
+class FormattingReport:
+    transcript_seconds: int
+    entries: int
+    per_entry_ms: float
+    bulk_ms: float
+
+    @property
+    def speedup(self) -> float:
+        return self.per_entry_ms / self.bulk_ms if self.bulk_ms else 0.0
+
+    def format(self) -> str:
+        return (
+            f"transcript {self.transcript_seconds}s ({self.entries} entries): "
+            f"per-entry {self.per_entry_ms:.2f}ms, bulk {self.bulk_ms:.2f}ms "
+            f"-> {self.speedup:.1f}x"
+        )
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    """Fastest of ``repeat`` runs in milliseconds, with the collector paused."""
+    timings = []
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return min(timings) * 1000
+
+
+def run(transcript_seconds: int, repeat: int = 20) -> FormattingReport:
+    entries = [
+        youtube.TranscriptEntry(snippet.start, snippet.duration, snippet.text)
+        for snippet in make_snippets(transcript_seconds)
+    ]
+
+    def per_entry() -> str:
+        return "\n".join(youtube.format_transcript_lines(entries))
+
+    def bulk() -> str:
+        return youtube.format_transcript(entries)
+
+    if per_entry() != bulk():
+        raise AssertionError("Bulk formatting differs from the per-entry path")
+    return FormattingReport(
+        transcript_seconds,
+        len(entries),
+        per_entry_ms=best_of(per_entry, repeat),
+        bulk_ms=best_of(bulk, repeat),
+    )
+
+
+def main(
+    argv: Sequence[str] | None = None, out: Callable[[str], None] = print
+) -> list[FormattingReport]:
+    parser = argparse.ArgumentParser(description="Benchmark transcript formatting.")
+    parser.add_argument(
+        "--durations",
+        default="5m,1h,10h",
+        help="Comma-separated transcript lengths, e.g. 5m,1h,10h (default: %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per path; best is kept.")
+    args = parser.parse_args(argv)
+
+    reports = []
+    for duration in args.durations.split(","):
+        report = run(parse_duration(duration), args.repeat)
+        out(report.format())
+        reports.append(report)
+    return reports
+
+
+if __name__ == "__main__":
+    main()
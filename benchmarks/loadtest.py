@@ -0,0 +1,336 @@
+"""Load test for the timestamp pipeline against local YouTube and Gemini fakes.
+
+    uv run python -m benchmarks.loadtest --target app --durations 5m,1h,10h
+    uv run python -m benchmarks.loadtest --target cli -n 200 -c 16 --error-rate 0.05
+
+``--target app`` posts to ``/api/timestamp/generate`` through Flask's test client
+from ``--concurrency`` threads, so every request goes through the same async view
+and per-request event loop as in production. ``--target cli`` runs the CLI's batch
+mode on one event loop. ``--url`` sends real HTTP requests to a running server
+instead; the fakes are not installed in that server, so point it at ``MOCK_FILE``
+or a staging key.
+"""
+
+import argparse
+import asyncio
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+import json
+import logging
+import os
+from pathlib import Path
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+# Only the fakes are called, so a real key is not needed.
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from benchmarks.fakes import install_fakes
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(text: str) -> int:
+    """Parses ``"90"``, ``"5m"`` or ``"10h"`` into seconds."""
+    text = text.strip().lower()
+    if text and text[-1] in DURATION_UNITS:
+        return int(float(text[:-1]) * DURATION_UNITS[text[-1]])
+    return int(text)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile; 0 for an empty sample."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, round(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class LagMonitor:
+    """Samples how late a periodic ``asyncio.sleep`` wakes up on the current loop."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: asyncio.Task[None] | None = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+@dataclass(slots=True)
+class Report:
+    target: str
+    transcript_seconds: int
+    requests: int
+    concurrency: int
+    ok: int = 0
+    failed: int = 0
+    wall_seconds: float = 0.0
+    latency_p50: float = 0.0
+    latency_p95: float = 0.0
+    latency_p99: float = 0.0
+    latency_max: float = 0.0
+    throughput_rps: float = 0.0
+    loop_lag_p50_ms: float = 0.0
+    loop_lag_p99_ms: float = 0.0
+    loop_lag_max_ms: float = 0.0
+    gemini_calls: int = 0
+    gemini_errors_injected: int = 0
+    peak_rss_mb: float = 0.0
+    traced_peak_mb: float | None = None
+    errors: dict[str, int] = field(default_factory=dict)
+    # Reports are only comparable for the same prompt.
+    prompt_version: str = ""
+
+    def summarize(
+        self, latencies: Sequence[float], lag: Sequence[float], wall_seconds: float
+    ) -> None:
+        self.wall_seconds = wall_seconds
+        self.latency_p50 = percentile(latencies, 50)
+        self.latency_p95 = percentile(latencies, 95)
+        self.latency_p99 = percentile(latencies, 99)
+        self.latency_max = max(latencies, default=0.0)
+        self.throughput_rps = self.ok / wall_seconds if wall_seconds else 0.0
+        self.loop_lag_p50_ms = percentile(lag, 50) * 1000
+        self.loop_lag_p99_ms = percentile(lag, 99) * 1000
+        self.loop_lag_max_ms = max(lag, default=0.0) * 1000
+        self.peak_rss_mb = peak_rss_mb()
+
+    def format(self) -> str:
+        memory = f"peak RSS {self.peak_rss_mb:.0f}MB"
+        if self.traced_peak_mb is not None:
+            memory += f", traced peak {self.traced_peak_mb:.1f}MB"
+        header = f"{self.target} | transcript {self.transcript_seconds}s | {self.prompt_version}"
+        lines = [f"{header} | {self.requests} requests, concurrency {self.concurrency}"]
+        lines.append(
+            f"  ok {self.ok}, failed {self.failed} in {self.wall_seconds:.2f}s"
+            f" -> {self.throughput_rps:.2f} req/s"
+        )
+        lines.append(
+            f"  latency p50 {self.latency_p50:.3f}s  p95 {self.latency_p95:.3f}s"
+            f"  p99 {self.latency_p99:.3f}s  max {self.latency_max:.3f}s"
+        )
+        lines.append(
+            f"  loop lag p50 {self.loop_lag_p50_ms:.1f}ms  p99 {self.loop_lag_p99_ms:.1f}ms"
+            f"  max {self.loop_lag_max_ms:.1f}ms"
+        )
+        lines.append(
+            f"  gemini calls {self.gemini_calls} ({self.gemini_errors_injected} injected"
+            f" errors)  {memory}"
+        )
+        if self.errors:
+            lines.append(f"  errors {self.errors}")
+        return "\n".join(lines)
+
+
+def video_url(n: int) -> str:
+    return f"https://www.youtube.com/watch?v=bench{n:06d}"
+
+
+def run_app_requests(
+    count: int, concurrency: int, url: str | None = None
+) -> tuple[list[float], dict[str, int]]:
+    """Posts ``count`` requests from ``concurrency`` threads; returns OK latencies and errors."""
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def post(n: int) -> None:
+        body = {"url": video_url(n), "additional_instruction": "", "language": "auto"}
+        started = time.perf_counter()
+        if url is None:
+            if not hasattr(local, "client"):
+                from app import app
+
+                local.client = app.test_client()
+            status = local.client.post("/api/timestamp/generate", json=body).status_code
+        else:
+            request = urllib.request.Request(
+                url.rstrip("/") + "/api/timestamp/generate",
+                data=json.dumps(body).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=600) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except OSError as e:
+                status = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            if status == 200:
+                latencies.append(elapsed)
+            else:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(post, range(count)))
+    return latencies, errors
+
+
+async def run_cli_requests(
+    count: int, concurrency: int
+) -> tuple[list[float], dict[str, int], list[float]]:
+    """Runs the CLI batch pipeline; returns OK latencies, errors and loop lag samples."""
+    from services import batch
+
+    items = batch.read_items(video_url(n) for n in range(count))
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    monitor = LagMonitor()
+    monitor.start()
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            async for result in batch.run_batch(
+                items, concurrency=concurrency, output_dir=Path(output_dir), resume=False
+            ):
+                if result.status == "done":
+                    latencies.append(result.elapsed)
+                else:
+                    errors[result.error] = errors.get(result.error, 0) + 1
+    finally:
+        await monitor.stop()
+    return latencies, errors, monitor.samples
+
+
+def run_scenario(
+    target: str,
+    transcript_seconds: int,
+    requests: int,
+    concurrency: int,
+    transcript_latency: float = 0.2,
+    gemini_latency: float = 1.0,
+    error_rate: float = 0.0,
+    rpm: int = 1_000_000,
+    retry_wait_scale: float = 0.01,
+    url: str | None = None,
+    trace_memory: bool = False,
+) -> Report:
+    from services import prompts
+
+    report = Report(target, transcript_seconds, requests, concurrency)
+    report.prompt_version = prompts.ACTIVE.version_id
+    if trace_memory:
+        tracemalloc.start()
+    with install_fakes(
+        transcript_seconds,
+        transcript_latency=transcript_latency,
+        gemini_latency=gemini_latency,
+        error_rate=error_rate,
+        rpm=rpm,
+        retry_wait_scale=retry_wait_scale,
+    ) as fakes:
+        started = time.perf_counter()
+        if target == "app":
+            latencies, report.errors = run_app_requests(requests, concurrency, url)
+            lag = fakes.gemini.stats.oversleep
+        else:
+            latencies, report.errors, lag = asyncio.run(run_cli_requests(requests, concurrency))
+            lag = lag + fakes.gemini.stats.oversleep
+        wall = time.perf_counter() - started
+    report.ok = len(latencies)
+    report.failed = requests - report.ok
+    report.gemini_calls = fakes.gemini.stats.calls
+    report.gemini_errors_injected = fakes.gemini.stats.errors
+    report.summarize(latencies, lag, wall)
+    if trace_memory:
+        report.traced_peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return report
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the timestamp pipeline against local fakes."
+    )
+    parser.add_argument("--target", choices=["app", "cli"], default="app")
+    parser.add_argument(
+        "--durations",
+        default="5m,1h,10h",
+        help="Comma-separated transcript lengths, e.g. 5m,1h,10h (default: %(default)s)",
+    )
+    parser.add_argument("-n", "--requests", type=int, default=50)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="Seconds per call.")
+    parser.add_argument(
+        "--transcript-latency", type=float, default=0.2, help="Seconds per transcript fetch."
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of Gemini calls that 429/503."
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=1_000_000, help="Rate limit applied to the fake Gemini."
+    )
+    parser.add_argument(
+        "--retry-wait-scale",
+        type=float,
+        default=0.01,
+        help="Multiplier on the 4-20s retry backoff (1 = production).",
+    )
+    parser.add_argument("--url", help="Send HTTP requests to this running server instead.")
+    parser.add_argument("--tracemalloc", action="store_true", help="Trace Python allocations.")
+    parser.add_argument("--json", help="Also write the reports to this JSON file.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Keep INFO logging.")
+    return parser
+
+
+def main(argv: Sequence[str] | None = None, out: Callable[[str], None] = print) -> list[Report]:
+    args = build_parser().parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    reports: list[Report] = []
+    for duration in args.durations.split(","):
+        report = run_scenario(
+            args.target,
+            parse_duration(duration),
+            args.requests,
+            args.concurrency,
+            transcript_latency=args.transcript_latency,
+            gemini_latency=args.gemini_latency,
+            error_rate=args.error_rate,
+            rpm=args.rpm,
+            retry_wait_scale=args.retry_wait_scale,
+            url=args.url,
+            trace_memory=args.tracemalloc,
+        )
+        out(report.format())
+        reports.append(report)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps([asdict(r) for r in reports], indent=2))
+    return reports
+
+
+if __name__ == "__main__":
+    main()
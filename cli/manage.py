@@ -1,18 +1,108 @@
 import argparse
 import asyncio
+from collections.abc import AsyncIterator
+import contextlib
+import json
 import logging
 from pathlib import Path
 import sys
+import time
+from typing import TextIO
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from services import video_processor
+import config
+from services import batch, pipeline, video_processor, youtube
+from utils import startup
 
 # Configure basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+def open_jsonl(path: str | None) -> contextlib.AbstractContextManager[TextIO | None]:
+    if not path:
+        return contextlib.nullcontext()
+    if path == "-":
+        return contextlib.nullcontext(sys.stdout)
+    return Path(path).open("a")
+
+
+async def report_results(
+    results: AsyncIterator[batch.BatchResult], total: int, jsonl_path: str | None
+) -> int:
+    """Prints progress for each result and a summary; returns the process exit code."""
+    counts = {"done": 0, "skipped": 0, "failed": 0}
+    started = time.monotonic()
+    with open_jsonl(jsonl_path) as jsonl:
+        async for result in results:
+            counts[result.status] += 1
+            finished = sum(counts.values())
+            detail = f" ({result.elapsed:.1f}s)" if result.status == "done" else ""
+            if result.error:
+                detail = f": {result.error}"
+            print(
+                f"[{finished}/{total}] {result.status} "
+                f"{result.video_id or result.url}{detail}",
+                file=sys.stderr,
+            )
+            if jsonl and result.status != "skipped":
+                jsonl.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+                jsonl.flush()
+
+    elapsed = time.monotonic() - started
+    per_minute = counts["done"] / elapsed * 60 if elapsed else 0.0
+    print(
+        f"\nProcessed {total} videos in {elapsed:.1f}s: "
+        f"{counts['done']} done, {counts['skipped']} skipped, {counts['failed']} failed "
+        f"({per_minute:.1f} videos/min)",
+        file=sys.stderr,
+    )
+    return 1 if counts["failed"] else 0
+
+
+async def run_batch_mode(args: argparse.Namespace) -> int:
+    """Processes every URL in args.batch and returns the process exit code."""
+    if args.batch == "-":
+        items = batch.read_items(sys.stdin)
+    else:
+        with Path(args.batch).open() as f:
+            items = batch.read_items(f)
+
+    logger.info(f"Batch processing {len(items)} videos (concurrency {args.concurrency}).")
+    results = batch.run_batch(
+        items,
+        additional_instruction=args.additional_instruction,
+        language=args.lang,
+        concurrency=args.concurrency,
+        output_dir=Path(args.output_dir),
+        resume=args.resume,
+    )
+    return await report_results(results, len(items), args.jsonl)
+
+
+async def run_collection_mode(url: str, args: argparse.Namespace) -> int:
+    """Expands a playlist or channel URL and processes its videos through the pipeline."""
+    try:
+        video_ids = await youtube.async_expand_url(url, args.max_videos)
+    except (ValueError, OSError) as e:
+        logger.error(f"Could not expand {url}: {e}")
+        print(f"\n[Error] {e!s}")
+        return 1
+
+    items = pipeline.items_for(video_ids)
+    print(f"Found {len(items)} videos in {url}", file=sys.stderr)
+    results = pipeline.run_pipeline(
+        items,
+        additional_instruction=args.additional_instruction,
+        language=args.lang,
+        generate_concurrency=args.concurrency,
+        output_dir=Path(args.output_dir),
+        resume=args.resume,
+    )
+    return await report_results(results, len(items), args.jsonl)
+
+
 async def main():
     # 1. Create the argument parser
     parser = argparse.ArgumentParser(
@@ -49,9 +139,66 @@ async def main():
         help='Target language (e.g., th, en). Default is "auto"',
     )
 
+    # --- Batch mode (-b / --batch) ---
+    parser.add_argument(
+        "-b",
+        "--batch",
+        metavar="FILE",
+        help='Process every URL in FILE (one per line, "-" for stdin)',
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=4,
+        help=(
+            "Videos processed at the same time in batch mode (Gemini calls at the same time "
+            "for playlists and channels). Default is 4"
+        ),
+    )
+    parser.add_argument(
+        "--max-videos",
+        type=int,
+        default=config.COLLECTION_MAX_VIDEOS,
+        help="Videos taken from a playlist or channel URL. Default is %(default)s",
+    )
+    parser.add_argument(
+        "--jsonl",
+        metavar="PATH",
+        help='Append batch results as JSON lines to PATH ("-" for stdout)',
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=str(config.ARTIFACTS_DIR),
+        help="Directory for per-video timestamps.txt files in batch, playlist and channel mode",
+    )
+    parser.add_argument(
+        "--no-resume",
+        dest="resume",
+        action="store_false",
+        help="Reprocess videos that already have a timestamps.txt",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        nargs="?",
+        const="cli.manage",
+        metavar="MODULE",
+        help=(
+            "Print where a cold start of MODULE spends its import time and exit "
+            "(default: cli.manage; \"app\" for the web app)"
+        ),
+    )
+
     # 3. Parse arguments
     args = parser.parse_args()
 
+    if args.profile_startup:
+        print(startup.format_report(startup.profile_startup(args.profile_startup)))
+        return
+
+    if args.batch:
+        sys.exit(await run_batch_mode(args))
+
     # 4. URL resolution logic (handles flexibility)
     # If -u is provided, use it; otherwise, check positional argument. If neither, raise an error.
     target_url = args.url_flag or args.url_pos
@@ -61,6 +208,10 @@ async def main():
         parser.print_help()
         sys.exit(1)  # Exit with error code
 
+    # Playlists and channels expand into many videos, processed like a batch.
+    if youtube.is_collection_url(target_url):
+        sys.exit(await run_collection_mode(target_url, args))
+
     logger.info("CLI processing started.")
     logger.info(f"URL: {target_url}")
     logger.info(f"Language: {args.lang}")
@@ -69,7 +220,9 @@ async def main():
 
     try:
         result = await video_processor.process_video_timestamp(
-            url=target_url, additional_instruction="", language=args.lang
+            url=target_url,
+            additional_instruction=args.additional_instruction,
+            language=args.lang,
         )
         logger.info("Timestamps generated successfully.")
         print(result)
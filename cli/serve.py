@@ -0,0 +1,122 @@
+"""Production server.
+
+Waitress handles HTTP on a bounded thread pool, and every async view and stream
+runs on the one shared background loop (see ``app.Youtamp``), so the rate
+limiter, Gemini clients and job workers are created once and shared by all
+requests. On SIGTERM or SIGINT, new requests get a 503 while those in flight,
+including open streams and running jobs, are given SHUTDOWN_TIMEOUT to finish.
+"""
+
+import argparse
+import logging
+from pathlib import Path
+import signal
+import sys
+import threading
+import time
+
+from waitress.server import BaseWSGIServer, create_server
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app import app
+import config
+from services import gemini, jobs
+from utils.background_loop import BACKGROUND_LOOP
+from utils.wsgi import DrainMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up() -> None:
+    """Creates the Gemini clients on the shared loop before the first request."""
+    for api_key in dict.fromkeys(endpoint.api_key for endpoint in gemini.POOL.endpoints):
+        gemini.get_client(api_key)
+
+
+def stop(server: BaseWSGIServer) -> None:
+    """Makes server.run() return by closing every channel from its own loop thread."""
+
+    def close_channels() -> None:
+        for channel in list(server._map.values()):
+            channel.close()
+
+    server.trigger.pull_trigger(close_channels)
+
+
+def drain(server: BaseWSGIServer, server_app: DrainMiddleware, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    if not server_app.drain(timeout):
+        logger.warning(f"{server_app.in_flight()} requests still running after {timeout}s")
+    if not jobs.JOB_POOL.stop(max(0.0, deadline - time.monotonic())):
+        logger.warning("Jobs still running at shutdown will be retried on the next start")
+    stop(server)
+
+
+def serve(host: str, port: int, threads: int, connection_limit: int, timeout: float) -> None:
+    server_app = DrainMiddleware(app)
+    server = create_server(
+        server_app,
+        host=host,
+        port=port,
+        threads=threads,
+        connection_limit=connection_limit,
+        ident="youtamp",
+    )
+    BACKGROUND_LOOP.submit(warm_up()).result()
+    jobs.JOB_POOL.start()
+
+    draining = threading.Event()
+
+    def on_signal(signum: int, _frame: object) -> None:
+        if draining.is_set():
+            logger.warning("Second signal received, exiting without waiting")
+            raise KeyboardInterrupt
+        draining.set()
+        logger.info(f"Received {signal.Signals(signum).name}, shutting down")
+        threading.Thread(target=drain, args=(server, server_app, timeout), name="drain").start()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    logger.info(
+        f"Serving on http://{host}:{port} with {threads} threads "
+        f"and up to {connection_limit} connections"
+    )
+    try:
+        # Returns once drain() has closed the channels, or on a second signal.
+        server.run()
+    finally:
+        server.close()
+        server.task_dispatcher.shutdown()
+        BACKGROUND_LOOP.stop()
+        logger.info("Server stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run Youtamp with a production WSGI server.")
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=config.SERVER_THREADS,
+        help="Requests handled at once; each open stream holds one.",
+    )
+    parser.add_argument("--connection-limit", type=int, default=config.SERVER_CONNECTION_LIMIT)
+    parser.add_argument(
+        "--shutdown-timeout",
+        type=float,
+        default=config.SHUTDOWN_TIMEOUT,
+        help="Seconds to let in-flight requests and jobs finish on shutdown.",
+    )
+    args = parser.parse_args()
+    try:
+        serve(args.host, args.port, args.threads, args.connection_limit, args.shutdown_timeout)
+    except KeyboardInterrupt:
+        # A second signal that arrives after server.run() has returned.
+        logger.warning("Interrupted during shutdown")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,19 +10,195 @@ def get_bool_env(name: str, default: str = "False") -> bool:
     return os.environ.get(name, default).lower() == "true"
 
 
+def get_int_env(name: str, default: int) -> int:
+    """Gets an integer value from an environment variable."""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Invalid integer for {name}: {value!r}. Using {default}.")
+        return default
+
+
+def get_float_env(name: str, default: float) -> float:
+    """Gets a float value from an environment variable."""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"Invalid number for {name}: {value!r}. Using {default}.")
+        return default
+
+
 # --- Gemini API ---
+# Only checked when Gemini is first called, so --help, mock mode and tests start without it.
 API_KEY: str | None = os.environ.get("GEMINI_API_KEY")
-if not API_KEY:
-    logger.error("GEMINI_API_KEY not found!")
-    raise ValueError("GEMINI_API_KEY environment variable not set.")
-else:
-    logger.info("GEMINI_API_KEY loaded.")
+MISSING_API_KEY_MESSAGE = "GEMINI_API_KEY environment variable not set."
+
+# Seconds to wait for a single Gemini call before giving up. 0 disables the timeout.
+GEMINI_TIMEOUT: int = get_int_env("GEMINI_TIMEOUT", 120)
+
+
+def get_list_env(name: str, default: str = "") -> list[str]:
+    """Gets a comma-separated list from an environment variable."""
+    return [item.strip() for item in os.environ.get(name, default).split(",") if item.strip()]
+
+
+# --- Gemini Client Pool ---
+# Extra keys spread load across projects; each key/model pair has its own quota.
+GEMINI_API_KEYS: list[str] = get_list_env("GEMINI_API_KEYS") or ([API_KEY] if API_KEY else [])
+# Model tiers in order of preference. Later tiers are used when earlier ones are
+# quarantined or out of quota.
+GEMINI_MODELS: list[str] = get_list_env("GEMINI_MODELS", "gemini-2.5-flash")
+# Optional cheaper/faster model tried first for prompts up to GEMINI_SHORT_PROMPT_TOKENS.
+GEMINI_SHORT_MODEL: str = os.environ.get("GEMINI_SHORT_MODEL", "")
+GEMINI_SHORT_PROMPT_TOKENS: int = get_int_env("GEMINI_SHORT_PROMPT_TOKENS", 8000)
+# How long a key/model pair is skipped after a 429.
+GEMINI_QUARANTINE_SECONDS: int = get_int_env("GEMINI_QUARANTINE_SECONDS", 60)
+
+# --- Gemini Overload Control ---
+# One controller for all Gemini calls in the process (services/overload.py): an
+# AIMD concurrency limit between the MIN and MAX below, a retry budget, and a
+# circuit breaker that fails calls fast while the API is unhealthy.
+GEMINI_OVERLOAD_CONTROL: bool = get_bool_env("GEMINI_OVERLOAD_CONTROL", "True")
+GEMINI_MIN_CONCURRENCY: int = get_int_env("GEMINI_MIN_CONCURRENCY", 1)
+GEMINI_MAX_CONCURRENCY: int = get_int_env("GEMINI_MAX_CONCURRENCY", 32)
+# Retries allowed per GEMINI_HEALTH_WINDOW_SECONDS, as a fraction of the calls
+# made in it; at least GEMINI_RETRY_BUDGET_MIN.
+GEMINI_RETRY_BUDGET_RATIO: float = get_float_env("GEMINI_RETRY_BUDGET_RATIO", 0.2)
+GEMINI_RETRY_BUDGET_MIN: int = get_int_env("GEMINI_RETRY_BUDGET_MIN", 3)
+GEMINI_HEALTH_WINDOW_SECONDS: int = get_int_env("GEMINI_HEALTH_WINDOW_SECONDS", 30)
+# The circuit opens when this fraction of at least GEMINI_CIRCUIT_MIN_CALLS calls
+# in the window were 429/503/timeouts, and stays open GEMINI_CIRCUIT_OPEN_SECONDS.
+GEMINI_CIRCUIT_FAILURE_RATIO: float = get_float_env("GEMINI_CIRCUIT_FAILURE_RATIO", 0.5)
+GEMINI_CIRCUIT_MIN_CALLS: int = get_int_env("GEMINI_CIRCUIT_MIN_CALLS", 10)
+GEMINI_CIRCUIT_OPEN_SECONDS: int = get_int_env("GEMINI_CIRCUIT_OPEN_SECONDS", 30)
+
+# --- Prompts ---
+# Version of the "timestamps" prompt template to use. 0 uses the latest.
+PROMPT_TEMPLATE_VERSION: int = get_int_env("PROMPT_TEMPLATE_VERSION", 0)
+
+# --- Gemini Context Caching ---
+# Large transcripts are uploaded once as cached content (with the system instruction)
+# and follow-up generations for the same transcript only send the instructions.
+CONTEXT_CACHE_ENABLED: bool = get_bool_env("CONTEXT_CACHE_ENABLED", "True")
+# Estimated prompt tokens below which a transcript is sent inline. Well above the
+# minimum Gemini accepts for cached content, and storage is billed per hour.
+CONTEXT_CACHE_MIN_TOKENS: int = get_int_env("CONTEXT_CACHE_MIN_TOKENS", 8192)
+# Lifetime of a cache on the server. Using an entry past half of it extends it again.
+CONTEXT_CACHE_TTL: int = get_int_env("CONTEXT_CACHE_TTL", 60 * 60)
+# Caches tracked per process; the least recently used are deleted above this.
+CONTEXT_CACHE_MAX_ENTRIES: int = get_int_env("CONTEXT_CACHE_MAX_ENTRIES", 64)
+# Longest wait for creating or extending a cache before sending the prompt inline.
+CONTEXT_CACHE_TIMEOUT: float = get_float_env("CONTEXT_CACHE_TIMEOUT", 10.0)
+
+# --- Long Transcripts ---
+# Transcripts longer than this many seconds are split into overlapping windows that
+# are evaluated concurrently and merged. 0 always sends the whole transcript at once.
+CHUNK_THRESHOLD_SECONDS: int = get_int_env("CHUNK_THRESHOLD_SECONDS", 2 * 60 * 60)
+CHUNK_WINDOW_SECONDS: int = get_int_env("CHUNK_WINDOW_SECONDS", 60 * 60)
+CHUNK_OVERLAP_SECONDS: int = get_int_env("CHUNK_OVERLAP_SECONDS", 2 * 60)
+# Maximum number of chunks of one video evaluated at the same time.
+CHUNK_CONCURRENCY: int = get_int_env("CHUNK_CONCURRENCY", 4)
+
+# --- Transcript Compaction ---
+# Cleans captions before building the prompt: drops [Music]-style tags and repeated
+# fragments, and merges fragments into windows of COMPACT_WINDOW_SECONDS (0 keeps them).
+COMPACT_TRANSCRIPT: bool = get_bool_env("COMPACT_TRANSCRIPT", "True")
+COMPACT_WINDOW_SECONDS: int = get_int_env("COMPACT_WINDOW_SECONDS", 10)
+COMPACT_DROP_FILLERS: bool = get_bool_env("COMPACT_DROP_FILLERS", "True")
 
 # --- Prompt Engineering ---
 LOAD_PROMPT: bool = get_bool_env("LOAD_PROMPT")
 SAVE_PROMPT: bool = get_bool_env("SAVE_PROMPT")
 SAVE_RESPONSE: bool = get_bool_env("SAVE_RESPONSE")
 
+# --- Result Cache ---
+RESULT_CACHE_ENABLED: bool = get_bool_env("RESULT_CACHE_ENABLED", "True")
+RESULT_CACHE_MAX_ENTRIES: int = get_int_env("RESULT_CACHE_MAX_ENTRIES", 256)
+# Seconds a result stays in the in-process tier.
+RESULT_CACHE_TTL: int = get_int_env("RESULT_CACHE_TTL", 60 * 60)
+# Seconds a result stays in the on-disk tier. 0 disables the disk tier.
+RESULT_CACHE_DISK_TTL: int = get_int_env("RESULT_CACHE_DISK_TTL", 7 * 24 * 60 * 60)
+
 # --- File System ---
 PROJECT_ROOT: Path = Path(__file__).resolve().parent
 ARTIFACTS_DIR = PROJECT_ROOT / "artifacts"
+# Where saved prompts, responses and timestamps go: "directory" writes one file
+# per artifact under ARTIFACTS_DIR, "sqlite" appends them compressed to ARTIFACT_DB.
+ARTIFACT_SINK: str = os.environ.get("ARTIFACT_SINK", "directory").lower()
+ARTIFACT_DB: Path = Path(os.environ.get("ARTIFACT_DB", str(ARTIFACTS_DIR / "artifacts.sqlite3")))
+# Artifacts waiting to be written; further saves are written on a worker thread
+# while the queue is full.
+ARTIFACT_QUEUE_SIZE: int = get_int_env("ARTIFACT_QUEUE_SIZE", 1000)
+# Rows older than this are deleted from ARTIFACT_DB. 0 keeps them forever.
+ARTIFACT_RETENTION_SECONDS: int = get_int_env("ARTIFACT_RETENTION_SECONDS", 30 * 24 * 60 * 60)
+
+# --- Rate Limiting ---
+# "memory" limits each process on its own; "sqlite" shares one budget across all
+# worker processes on the host through RATE_LIMIT_DB.
+RATE_LIMIT_BACKEND: str = os.environ.get("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_DB: Path = Path(
+    os.environ.get("RATE_LIMIT_DB", str(ARTIFACTS_DIR / "rate_limit.sqlite3"))
+)
+# Requests per minute. 0 disables request limiting.
+GEMINI_RPM: int = get_int_env("GEMINI_RPM", 9)
+# Tokens per minute. 0 disables token limiting.
+GEMINI_TPM: int = get_int_env("GEMINI_TPM", 250_000)
+# Per-key overrides, e.g. "gemini-2.5-pro:5:250000;gemini-2.5-flash:9:250000".
+GEMINI_QUOTAS: str = os.environ.get("GEMINI_QUOTAS", "")
+
+# --- Transcript Store ---
+# Raw captions are kept locally so regenerating a video never refetches from YouTube.
+TRANSCRIPT_STORE_ENABLED: bool = get_bool_env("TRANSCRIPT_STORE_ENABLED", "True")
+TRANSCRIPT_STORE_DB: Path = Path(
+    os.environ.get("TRANSCRIPT_STORE_DB", str(ARTIFACTS_DIR / "transcripts.sqlite3"))
+)
+# Least recently used transcripts are evicted above this compressed size.
+TRANSCRIPT_STORE_MAX_BYTES: int = get_int_env("TRANSCRIPT_STORE_MAX_BYTES", 256 * 1024 * 1024)
+# Caption track listings are kept in memory for this many seconds, so a video is
+# listed once however many languages are asked for. The listing holds signed
+# caption URLs, which YouTube expires after a few hours.
+TRANSCRIPT_LIST_TTL: int = get_int_env("TRANSCRIPT_LIST_TTL", 60 * 60)
+TRANSCRIPT_LIST_MAX_ENTRIES: int = get_int_env("TRANSCRIPT_LIST_MAX_ENTRIES", 1024)
+
+# --- Near-Duplicate Reuse ---
+# Re-uploads and mirrors of an already processed video reuse its chapters instead
+# of calling Gemini, matched by a fingerprint of the caption text.
+NEAR_DUPLICATE_ENABLED: bool = get_bool_env("NEAR_DUPLICATE_ENABLED", "True")
+NEAR_DUPLICATE_DB: Path = Path(
+    os.environ.get("NEAR_DUPLICATE_DB", str(ARTIFACTS_DIR / "near_duplicates.sqlite3"))
+)
+# Estimated Jaccard similarity (0-1) of the two transcripts needed to reuse chapters.
+NEAR_DUPLICATE_THRESHOLD: float = get_float_env("NEAR_DUPLICATE_THRESHOLD", 0.85)
+
+# --- Playlists and Channels ---
+# Videos taken from a playlist or channel URL, in page order.
+COLLECTION_MAX_VIDEOS: int = get_int_env("COLLECTION_MAX_VIDEOS", 100)
+# Transcript fetches are cheap and mostly waiting, so many run at once; Gemini
+# calls are bounded separately and by the rate limiter.
+PIPELINE_FETCH_CONCURRENCY: int = get_int_env("PIPELINE_FETCH_CONCURRENCY", 16)
+PIPELINE_GENERATE_CONCURRENCY: int = get_int_env("PIPELINE_GENERATE_CONCURRENCY", 4)
+# Fetched transcripts waiting for Gemini. Fetchers pause while this is full.
+PIPELINE_QUEUE_SIZE: int = get_int_env("PIPELINE_QUEUE_SIZE", 8)
+
+# --- Production Server (cli/serve.py) ---
+SERVER_HOST: str = os.environ.get("SERVER_HOST", "0.0.0.0")
+SERVER_PORT: int = get_int_env("SERVER_PORT", 45334)
+# Requests handled at once. Each open stream holds a thread until it ends.
+SERVER_THREADS: int = get_int_env("SERVER_THREADS", 16)
+# Open connections beyond this wait in the listen backlog.
+SERVER_CONNECTION_LIMIT: int = get_int_env("SERVER_CONNECTION_LIMIT", 200)
+# Seconds to wait for in-flight requests and jobs on SIGTERM/SIGINT before exiting.
+SHUTDOWN_TIMEOUT: int = get_int_env("SHUTDOWN_TIMEOUT", 60)
+
+# --- Background Jobs ---
+JOBS_DB: Path = Path(os.environ.get("JOBS_DB", str(ARTIFACTS_DIR / "jobs.sqlite3")))
+# Jobs processed concurrently by each web process.
+JOB_CONCURRENCY: int = get_int_env("JOB_CONCURRENCY", 2)
+# Finished jobs older than this many seconds are purged. 0 keeps them forever.
+JOB_RETENTION_SECONDS: int = get_int_env("JOB_RETENTION_SECONDS", 7 * 24 * 3600)
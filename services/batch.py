@@ -0,0 +1,139 @@
+import asyncio
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass
+import logging
+from pathlib import Path
+import time
+
+import config
+from services import video_processor, youtube
+from utils import file_io
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class BatchItem:
+    url: str
+    video_id: str | None
+    error: str = ""
+
+
+@dataclass(slots=True)
+class BatchResult:
+    url: str
+    video_id: str | None
+    status: str  # "done", "skipped" or "failed"
+    timestamps: str = ""
+    error: str = ""
+    elapsed: float = 0.0
+    # Exception class name, for callers that must not echo raw error text.
+    error_type: str = ""
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "url": self.url,
+            "video_id": self.video_id,
+            "status": self.status,
+            "timestamps": self.timestamps,
+            "error": self.error,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+
+def read_items(lines: Iterable[str]) -> list[BatchItem]:
+    """Parses one URL or video ID per line, skipping blanks, comments and duplicates."""
+    items: list[BatchItem] = []
+    seen: set[str] = set()
+    for line in lines:
+        url = line.strip()
+        if not url or url.startswith("#"):
+            continue
+        try:
+            video_id = youtube.extract_video_id(url)
+        except ValueError as e:
+            items.append(BatchItem(url=url, video_id=None, error=str(e)))
+            continue
+        if video_id in seen:
+            continue
+        seen.add(video_id)
+        items.append(BatchItem(url=url, video_id=video_id))
+    return items
+
+
+def timestamps_path(video_id: str, output_dir: Path) -> Path:
+    return Path(output_dir) / video_id / "timestamps.txt"
+
+
+async def _process(
+    item: BatchItem,
+    additional_instruction: str | None,
+    language: str,
+    output_dir: Path,
+    resume: bool,
+) -> BatchResult:
+    if item.video_id is None:
+        return BatchResult(item.url, None, "failed", error=item.error)
+    if resume and timestamps_path(item.video_id, output_dir).exists():
+        return BatchResult(item.url, item.video_id, "skipped")
+
+    started = time.monotonic()
+    try:
+        timestamps = await video_processor.process_video_timestamp(
+            url=item.url, additional_instruction=additional_instruction, language=language
+        )
+        # timestamps.txt doubles as the resume marker, so it is written regardless of
+        # SAVE_RESPONSE.
+        await file_io.async_write_file(
+            timestamps, f"{item.video_id}/timestamps.txt", output_dir
+        )
+    except Exception as e:
+        return BatchResult(
+            item.url,
+            item.video_id,
+            "failed",
+            error=str(e),
+            elapsed=time.monotonic() - started,
+            error_type=type(e).__name__,
+        )
+    return BatchResult(
+        item.url, item.video_id, "done", timestamps, elapsed=time.monotonic() - started
+    )
+
+
+async def run_batch(
+    items: list[BatchItem],
+    additional_instruction: str | None = None,
+    language: str = "auto",
+    concurrency: int = 4,
+    output_dir: Path = config.ARTIFACTS_DIR,
+    resume: bool = True,
+) -> AsyncIterator[BatchResult]:
+    """Processes items with at most ``concurrency`` in flight, yielding results as they finish.
+
+    Gemini calls still go through the shared rate limiter, so concurrency mostly
+    overlaps transcript fetches with model calls.
+    """
+    queue: asyncio.Queue[BatchItem] = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    results: asyncio.Queue[BatchResult] = asyncio.Queue()
+
+    async def worker() -> None:
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await results.put(
+                await _process(item, additional_instruction, language, output_dir, resume)
+            )
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        for _ in items:
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,240 @@
+"""Typed chapters: parsing model output, repairing it, and serializing it.
+
+A ``ChapterList`` keeps start times in an unsigned int array and labels in a
+tuple, so long lists (chunked videos, batch backfills) stay small and two
+results compare without formatting them. Model output is parsed line by line in
+one pass; lines that are not chapters are dropped, and ``repair`` then sorts,
+de-duplicates and clamps what is left to the transcript.
+"""
+
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# "01:02:03 - Label", "[05:30] Label", "5:30: Label" (hyphen, en or em dash)
+CHAPTER_LINE_RE = re.compile(
+    r"^\s*\[?(\d{1,2}(?::\d{1,2}){1,2})\]?\s*[-\u2013\u2014:]?\s*(.*?)\s*$"
+)
+
+# Chapters closer than this are treated as the same boundary when merging chunks.
+MIN_CHAPTER_GAP_SECONDS = 10
+
+# YouTube only turns a description into chapters when the first one is at 0:00,
+# there are at least three, and each is at least ten seconds long.
+YOUTUBE_MIN_CHAPTERS = 3
+YOUTUBE_MIN_CHAPTER_SECONDS = 10
+
+
+@dataclass(frozen=True, slots=True)
+class Chapter:
+    start: int
+    label: str
+
+
+def parse_timestamp(text: str) -> int | None:
+    """Seconds in ``MM:SS`` or ``HH:MM:SS``; None when a field is out of range."""
+    parts = text.split(":")
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        return None
+    seconds = int(parts[0])
+    for part in parts[1:]:
+        value = int(part)
+        if value >= 60:
+            return None
+        seconds = seconds * 60 + value
+    return seconds
+
+
+def format_timestamp(seconds: int, with_hours: bool) -> str:
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, secs = divmod(remainder, 60)
+    if with_hours:
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    return f"{hours * 60 + minutes:02d}:{secs:02d}"
+
+
+def format_youtube_timestamp(seconds: int) -> str:
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def parse_chapter_line(line: str) -> tuple[int, str] | None:
+    match = CHAPTER_LINE_RE.match(line)
+    if not match:
+        return None
+    seconds = parse_timestamp(match.group(1))
+    if seconds is None:
+        return None
+    return seconds, match.group(2)
+
+
+class ChapterList:
+    """An immutable list of chapters, optionally with the duration of its video."""
+
+    __slots__ = ("_labels", "_starts", "duration")
+
+    def __init__(
+        self, chapters: Iterable[Chapter | tuple[int, str]] = (), duration: float | None = None
+    ) -> None:
+        starts = array("I")
+        labels = []
+        for start, label in (
+            (chapter.start, chapter.label) if isinstance(chapter, Chapter) else chapter
+            for chapter in chapters
+        ):
+            starts.append(start)
+            labels.append(label)
+        self._starts = starts
+        self._labels = tuple(labels)
+        self.duration = duration
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __iter__(self) -> Iterator[Chapter]:
+        return map(Chapter, self._starts, self._labels)
+
+    def __getitem__(self, index: int) -> Chapter:
+        return Chapter(self._starts[index], self._labels[index])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ChapterList):
+            return NotImplemented
+        return self._starts == other._starts and self._labels == other._labels
+
+    def __hash__(self) -> int:
+        return hash((self._starts.tobytes(), self._labels))
+
+    def __repr__(self) -> str:
+        return f"ChapterList({list(self)!r}, duration={self.duration!r})"
+
+    @property
+    def starts(self) -> tuple[int, ...]:
+        return tuple(self._starts)
+
+    @property
+    def labels(self) -> tuple[str, ...]:
+        return self._labels
+
+    def with_hours(self) -> bool:
+        """Whether timestamps need an hour field, as the prompt asks for 1h+ videos."""
+        if self.duration is not None:
+            return self.duration >= 3600
+        return bool(self._starts) and max(self._starts) >= 3600
+
+    def lines(self) -> list[str]:
+        with_hours = self.with_hours()
+        return [
+            f"{format_timestamp(start, with_hours)} - {label}"
+            for start, label in zip(self._starts, self._labels, strict=True)
+        ]
+
+    def to_text(self) -> str:
+        return "\n".join(self.lines())
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "duration": self.duration,
+                "chapters": list(zip(self._starts, self._labels, strict=True)),
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "ChapterList":
+        payload = json.loads(data)
+        return cls(
+            ((int(start), str(label)) for start, label in payload["chapters"]),
+            payload.get("duration"),
+        )
+
+    def to_youtube_description(self) -> str:
+        """Chapter lines YouTube recognizes in a description, or "" if it would not.
+
+        The first chapter is moved to 0:00 and chapters shorter than ten seconds
+        are folded into the one before them.
+        """
+        kept: list[tuple[int, str]] = []
+        for start, label in zip(self._starts, self._labels, strict=True):
+            if not kept:
+                kept.append((0, label))
+            elif start - kept[-1][0] >= YOUTUBE_MIN_CHAPTER_SECONDS:
+                kept.append((start, label))
+        if (
+            kept
+            and self.duration is not None
+            and self.duration - kept[-1][0] < YOUTUBE_MIN_CHAPTER_SECONDS
+        ):
+            kept.pop()
+        if len(kept) < YOUTUBE_MIN_CHAPTERS:
+            return ""
+        return "\n".join(f"{format_youtube_timestamp(start)} {label}" for start, label in kept)
+
+    def shifted(self, offset: float, duration: float) -> "ChapterList":
+        """Chapters moved by ``offset`` seconds, without those outside [0, duration].
+
+        The last chapter that starts before 0 is kept at 0, since its section
+        continues into the start of the shifted video.
+        """
+        chapters: list[tuple[int, str]] = []
+        for start, label in zip(self._starts, self._labels, strict=True):
+            moved = int(start + offset)
+            if moved < 0:
+                chapters = [(0, label)]
+            elif moved <= duration:
+                if chapters and chapters[-1][0] == moved == 0:
+                    chapters.pop()
+                chapters.append((moved, label))
+        return ChapterList(chapters, duration)
+
+
+def parse_output(output: str | Iterable[str], duration: float | None = None) -> ChapterList:
+    """Chapters in model output, in the order given; other lines are dropped."""
+    lines = output.splitlines() if isinstance(output, str) else output
+    chapters = []
+    dropped = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        parsed = parse_chapter_line(line)
+        if parsed is None or not parsed[1]:
+            dropped += 1
+            continue
+        chapters.append(parsed)
+    if dropped:
+        logger.warning(f"Dropped {dropped} lines that are not chapters")
+    return ChapterList(chapters, duration)
+
+
+def repair(chapters: ChapterList, duration: float, min_gap: int = 0) -> ChapterList:
+    """Sorts chapters, clamps them to ``duration`` and drops duplicates.
+
+    A chapter is a duplicate when it starts at the same second as (or less than
+    ``min_gap`` seconds after) the one kept before it, or repeats its label.
+    """
+    last = int(duration)
+    ordered = sorted(
+        ((min(chapter.start, last), chapter.label) for chapter in chapters),
+        key=lambda chapter: chapter[0],
+    )
+    kept: list[tuple[int, str]] = []
+    for start, label in ordered:
+        if kept:
+            previous_start, previous_label = kept[-1]
+            too_close = start == previous_start or start - previous_start < min_gap
+            if too_close or label.casefold() == previous_label.casefold():
+                continue
+        kept.append((start, label))
+    if len(kept) != len(chapters):
+        logger.info(f"Repaired chapters: kept {len(kept)} of {len(chapters)}")
+    return ChapterList(kept, duration)
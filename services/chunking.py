@@ -0,0 +1,133 @@
+import asyncio
+from collections.abc import Sequence
+from dataclasses import dataclass
+import logging
+
+import config
+from services import gemini, prompts
+from services.chapters import (
+    MIN_CHAPTER_GAP_SECONDS,
+    ChapterList,
+    format_timestamp,
+    parse_output,
+    repair,
+)
+from services.youtube import TranscriptEntry, format_transcript, transcript_duration
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Chunk:
+    index: int
+    start: float
+    end: float
+    # Chapters starting in [core_start, core_end) belong to this chunk; the rest
+    # of the window is overlap that only gives the model context.
+    core_start: float
+    core_end: float
+    entries: list[TranscriptEntry]
+
+
+def should_chunk(entries: Sequence[TranscriptEntry]) -> bool:
+    threshold = config.CHUNK_THRESHOLD_SECONDS
+    return threshold > 0 and transcript_duration(list(entries)) > threshold
+
+
+def split_into_chunks(
+    entries: Sequence[TranscriptEntry],
+    window: float,
+    overlap: float,
+) -> list[Chunk]:
+    """Splits caption entries into fixed time windows that overlap their neighbours."""
+    if not entries:
+        return []
+    duration = transcript_duration(list(entries))
+    step = max(window - overlap, 1.0)
+
+    chunks: list[Chunk] = []
+    start = 0.0
+    while start < duration:
+        end = start + window
+        if duration - end < window / 4:
+            # Fold a short tail into this window instead of spending a call on it.
+            end = duration
+        is_last = end >= duration
+        chunk_entries = [entry for entry in entries if start <= entry.start < end]
+        if chunk_entries:
+            chunks.append(
+                Chunk(
+                    index=len(chunks),
+                    start=start,
+                    end=end,
+                    core_start=0.0 if start == 0 else start + overlap / 2,
+                    core_end=float("inf") if is_last else start + step + overlap / 2,
+                    entries=chunk_entries,
+                )
+            )
+        if is_last:
+            break
+        start += step
+    return chunks
+
+
+def chunk_instruction(chunk: Chunk, total: int, duration: float) -> str:
+    return prompts.ACTIVE.chunk_note.format(
+        part=chunk.index + 1,
+        total=total,
+        start=format_timestamp(int(chunk.start), True),
+        end=format_timestamp(int(chunk.end), True),
+        duration=format_timestamp(int(duration), True),
+    )
+
+
+def merge_chapters(
+    outputs: Sequence[Sequence[str]],
+    chunks: Sequence[Chunk],
+    duration: float,
+) -> ChapterList:
+    """Merges per-chunk chapter lists into one ordered, de-duplicated list."""
+    kept = []
+    for lines, chunk in zip(outputs, chunks, strict=True):
+        kept.extend(
+            chapter
+            for chapter in parse_output(lines)
+            if chunk.core_start <= chapter.start < chunk.core_end
+        )
+    return repair(ChapterList(kept), duration, min_gap=MIN_CHAPTER_GAP_SECONDS)
+
+
+async def evaluate_chunked(
+    entries: Sequence[TranscriptEntry],
+    additional_instructions: str = "",
+    video_id: str = "",
+    language: str = "Same as Transcript",
+) -> ChapterList:
+    duration = transcript_duration(list(entries))
+    chunks = split_into_chunks(
+        entries, config.CHUNK_WINDOW_SECONDS, config.CHUNK_OVERLAP_SECONDS
+    )
+    logger.info(f"Evaluating {video_id} in {len(chunks)} chunks ({duration:.0f}s)")
+    semaphore = asyncio.Semaphore(max(config.CHUNK_CONCURRENCY, 1))
+
+    async def evaluate(chunk: Chunk) -> list[str]:
+        async with semaphore:
+            captions = format_transcript(chunk.entries)
+            return await gemini.evaluate_timestamps(
+                captions,
+                chunk_instruction(chunk, len(chunks), duration) + (additional_instructions or ""),
+                f"{video_id}/part-{chunk.index + 1:02d}",
+                language=language,
+            )
+
+    tasks = [asyncio.create_task(evaluate(chunk)) for chunk in chunks]
+    try:
+        outputs = await asyncio.gather(*tasks)
+    except BaseException:
+        # One failed part fails the whole video; stop spending quota on the rest.
+        for task in tasks:
+            task.cancel()
+        raise
+    merged = merge_chapters(outputs, chunks, duration)
+    logger.info(f"Merged {sum(map(len, outputs))} chunk chapters into {len(merged)}")
+    return merged
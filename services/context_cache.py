@@ -0,0 +1,206 @@
+"""Gemini context caches for large transcripts.
+
+A transcript above CONTEXT_CACHE_MIN_TOKENS is uploaded once per key/model pair
+as cached content, together with the system instruction, and later generations
+for it (other instructions, other target languages, retries) only send the
+instruction parts. Cached tokens are billed at a fraction of the input price and
+are not processed again. The registry is local to the process: it maps each
+transcript to its cache name and expiry, extends caches that are still in use,
+and drops expired and least recently used ones. Whenever a cache cannot be
+created or used in time, the whole prompt is sent as before.
+"""
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+import hashlib
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import config
+from services.gemini_pool import Endpoint, api_error_code
+from services.prompts import PromptTemplate
+from utils import metrics
+from utils.singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    from google.genai.client import AsyncClient
+
+logger = logging.getLogger(__name__)
+
+# Entries this close to expiry are treated as expired, so a generation never
+# starts against a cache the server is about to drop.
+EXPIRY_MARGIN_SECONDS = 30
+
+# (video_id, endpoint name, prompt version, transcript digest). The transcript
+# digest stands in for the caption language: each language is its own track.
+CacheKey = tuple[str, str, str, str]
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    name: str
+    api_key: str
+    expires_at: float
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def expiry_of(cached: object, ttl: int) -> float:
+    expire_time = getattr(cached, "expire_time", None)
+    if expire_time is None:
+        return time.time() + ttl
+    return expire_time.timestamp()
+
+
+class ContextCacheRegistry:
+    def __init__(
+        self,
+        client_for: Callable[[str], "AsyncClient"],
+        ttl: int,
+        min_tokens: int,
+        max_entries: int,
+        timeout: float = 0,
+    ) -> None:
+        self._client_for = client_for
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        # Seconds a lookup may spend creating or extending a cache; 0 waits forever.
+        self.timeout = timeout
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        # Model -> time until which caching is not attempted for it.
+        self._unsupported: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight("context_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def eligible(self, captions: str, model: str) -> bool:
+        if not config.CONTEXT_CACHE_ENABLED or config.LOAD_PROMPT:
+            return False
+        if estimate_tokens(captions) < self.min_tokens:
+            return False
+        with self._lock:
+            return self._unsupported.get(model, 0.0) <= time.time()
+
+    async def lookup(
+        self, endpoint: Endpoint, video_id: str, captions: str, template: PromptTemplate
+    ) -> str | None:
+        """The name of a live cache holding ``captions`` on this endpoint, created if needed.
+
+        Returns None when the transcript should be sent inline instead, including
+        when the cache could not be set up within ``timeout`` seconds.
+        """
+        if not self.eligible(captions, endpoint.model):
+            return None
+        digest = hashlib.sha256(captions.encode()).hexdigest()[:16]
+        key: CacheKey = (video_id, endpoint.name, template.version_id, digest)
+
+        try:
+            async with asyncio.timeout(self.timeout or None):
+                entry = self._get(key)
+                if entry is not None and entry.expires_at - time.time() < self.ttl / 2:
+                    entry = await self._refresh(key, entry)
+                if entry is not None:
+                    metrics.CACHE_REQUESTS.inc(cache="gemini_context", result="hit")
+                    return entry.name
+                return await self._flights.do(
+                    key, lambda: self._create(key, endpoint, video_id, captions, template)
+                )
+        except TimeoutError:
+            metrics.CACHE_REQUESTS.inc(cache="gemini_context", result="timeout")
+            logger.warning(
+                f"Context cache for {video_id} on {endpoint.name} not ready after "
+                f"{self.timeout}s, sending the full prompt"
+            )
+            return None
+
+    def invalidate(self, name: str) -> None:
+        """Forgets a cache the server no longer has."""
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.name == name:
+                    del self._entries[key]
+
+    def _get(self, key: CacheKey) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at - EXPIRY_MARGIN_SECONDS <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    async def _refresh(self, key: CacheKey, entry: CacheEntry) -> CacheEntry | None:
+        try:
+            updated = await self._client_for(entry.api_key).caches.update(
+                name=entry.name, config={"ttl": f"{self.ttl}s"}
+            )
+        except Exception as e:
+            logger.warning(f"Could not extend context cache {entry.name}: {e}")
+            self.invalidate(entry.name)
+            return None
+        entry.expires_at = expiry_of(updated, self.ttl)
+        logger.info(f"Extended context cache {entry.name} for {key[0]}")
+        return entry
+
+    async def _create(
+        self,
+        key: CacheKey,
+        endpoint: Endpoint,
+        video_id: str,
+        captions: str,
+        template: PromptTemplate,
+    ) -> str | None:
+        try:
+            cached = await self._client_for(endpoint.api_key).caches.create(
+                model=endpoint.model,
+                config={
+                    "contents": [captions],
+                    "system_instruction": template.system_instruction,
+                    "ttl": f"{self.ttl}s",
+                    "display_name": f"youtamp-{video_id}",
+                },
+            )
+        except Exception as e:
+            metrics.CACHE_REQUESTS.inc(cache="gemini_context", result="error")
+            code = api_error_code(e)
+            if code is not None and 400 <= code < 500 and code != 429:
+                # The model does not support caching, or the request will never be
+                # accepted as built; do not pay for the round trip on every call.
+                with self._lock:
+                    self._unsupported[endpoint.model] = time.time() + self.ttl
+            logger.warning(
+                f"Could not create context cache for {video_id} on {endpoint.name} "
+                f"({code or e}), sending the full prompt"
+            )
+            return None
+
+        metrics.CACHE_REQUESTS.inc(cache="gemini_context", result="miss")
+        entry = CacheEntry(cached.name, endpoint.api_key, expiry_of(cached, self.ttl))
+        with self._lock:
+            self._entries[key] = entry
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[1])
+        logger.info(f"Created context cache {entry.name} for {video_id} on {endpoint.name}")
+        for old in evicted:
+            await self._delete(old)
+        return entry.name
+
+    async def _delete(self, entry: CacheEntry) -> None:
+        try:
+            await self._client_for(entry.api_key).caches.delete(name=entry.name)
+        except Exception as e:
+            # It still expires on its own.
+            logger.warning(f"Could not delete context cache {entry.name}: {e}")
@@ -1,11 +1,27 @@
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
 import logging
-from aiolimiter import AsyncLimiter
-from google import genai
-from google.genai.errors import APIError
-from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+import time
+from typing import TYPE_CHECKING
+import weakref
+
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential,
+)
 
 import config
-from utils import file_io
+from services import context_cache, gemini_pool, overload, prompts, rate_limit
+from utils import file_io, metrics
+
+# google.genai takes most of a second to import, so it is only imported by the
+# first get_client() call; see gemini_pool.api_error_code for error checks.
+if TYPE_CHECKING:
+    from google.genai.client import AsyncClient
+    from google.genai.types import GenerateContentResponse
 
 logger = logging.getLogger(__name__)
 
@@ -22,26 +38,121 @@ def is_gemini_overloaded(exception):
         - HTTP 503 indicates the service is temporarily unavailable or overloaded.
         - HTTP 429 indicates the rate limit has been exceeded.
     """
-    if isinstance(exception, APIError):
-        error_code = getattr(exception, "code", None) or getattr(
-            exception, "status_code", None
+    error_code = gemini_pool.api_error_code(exception)
+    if error_code in [503, 429]:
+        # 503:  "UNAVAILABLE" The service may be temporarily overloaded or down
+        # 429:  "RESOURCE_EXHAUSTED" You've exceeded the rate limit.
+        logger.warning(
+            f"API overloaded/rate-limited (Code: {error_code}). Retrying..."
         )
-
-        if error_code in [503, 429]:
-            # 503:  "UNAVAILABLE" The service may be temporarily overloaded or down
-            # 429:  "RESOURCE_EXHAUSTED" You've exceeded the rate limit.
-            logger.warning(
-                f"API overloaded/rate-limited (Code: {error_code}). Retrying..."
-            )
-            return True
+        return True
 
     return False
 
 
-# RPM 10 = 10 requests per 60 seconds
-RATE_LIMITER = AsyncLimiter(max_rate=9, time_period=60)
+def should_retry(exception: BaseException) -> bool:
+    """Retries 429/503s while the shared retry budget lasts; see services.overload."""
+    return is_gemini_overloaded(exception) and OVERLOAD.allow_retry()
+
+
+def record_retry(retry_state: RetryCallState) -> None:
+    name = retry_state.fn.__name__ if retry_state.fn else "unknown"
+    metrics.GEMINI_RETRIES.inc(call=name)
+
+
+def attempt_outcome(error: BaseException | None) -> str:
+    if error is None:
+        return "ok"
+    if isinstance(error, asyncio.CancelledError):
+        return "cancelled"
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    code = gemini_pool.api_error_code(error)
+    return "error" if code is None else str(code)
+
+
+USAGE_FIELDS = {
+    "prompt": "prompt_token_count",
+    "cached": "cached_content_token_count",
+    "output": "candidates_token_count",
+    "thoughts": "thoughts_token_count",
+    "total": "total_token_count",
+}
+
+
+def record_usage(response: "GenerateContentResponse | None", model: str) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, field in USAGE_FIELDS.items():
+        count = getattr(usage, field, None)
+        if isinstance(count, int) and count > 0:
+            metrics.GEMINI_TOKENS.inc(count, model=model, kind=kind)
+
+
+# Shared by every Gemini call in this process; see services.rate_limit for backends.
+# Limiter keys are "model@key-id", one bucket per endpoint in POOL.
+RATE_LIMITER = rate_limit.create_limiter()
+POOL = gemini_pool.create_pool()
+metrics.REGISTRY.register(
+    metrics.Gauge(
+        "youtamp_gemini_endpoints",
+        "Gemini key/model endpoints by state.",
+        POOL.states,
+        labels=("model", "state"),
+    )
+)
 
-client = genai.Client(api_key=config.API_KEY)
+
+def create_overload_controller() -> overload.OverloadController:
+    return overload.OverloadController(
+        min_limit=config.GEMINI_MIN_CONCURRENCY,
+        max_limit=config.GEMINI_MAX_CONCURRENCY,
+        window_seconds=config.GEMINI_HEALTH_WINDOW_SECONDS,
+        retry_ratio=config.GEMINI_RETRY_BUDGET_RATIO,
+        min_retries=config.GEMINI_RETRY_BUDGET_MIN,
+        failure_ratio=config.GEMINI_CIRCUIT_FAILURE_RATIO,
+        min_calls=config.GEMINI_CIRCUIT_MIN_CALLS,
+        open_seconds=config.GEMINI_CIRCUIT_OPEN_SECONDS,
+        enabled=config.GEMINI_OVERLOAD_CONTROL,
+    )
+
+
+# Shared concurrency limit, retry budget and circuit breaker for every attempt.
+OVERLOAD = create_overload_controller()
+metrics.REGISTRY.register(
+    metrics.Gauge(
+        "youtamp_gemini_overload",
+        "Gemini overload controller state: concurrency limit, calls in flight, "
+        "retries left in the budget, seconds the circuit stays open, and whether it is open.",
+        lambda: OVERLOAD.gauges(),
+        labels=("field",),
+    )
+)
+
+# The async client's HTTP pool is bound to the event loop it was first used on,
+# so keep one client per loop (and per API key) instead of sharing one across loops.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_client(api_key: str | None = None) -> "AsyncClient":
+    api_key = api_key or config.API_KEY
+    if not api_key:
+        raise ValueError(config.MISSING_API_KEY_MESSAGE)
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(api_key)
+    if client is None:
+        from google import genai
+
+        client = genai.Client(api_key=api_key).aio
+        clients[api_key] = client
+    return client
+
+
+# The preferred model; POOL may route to other tiers.
+MODEL = POOL.models[0]
 
 generation_config = {
     "temperature": 0.4,
@@ -51,73 +162,132 @@ generation_config = {
     "response_mime_type": "text/plain",
 }
 
-system_instruction = """
-You are an intelligent video content analyzer. Your task is to extract timestamped chapters from a YouTube video transcript.
-
-**Input Data:**
-1. **Transcript**
-2. **Target Language** (e.g., Thai, English, Same as Transcript)
-
-**Instructions:**
-
-1. **Analyze Content & Strategy:**
-   - **Determine Content Type:**
-     - First, read the transcript to determine the nature of the content and apply the extraction logic accordingly
-     - **Q&A / Interview:** If the content consists of questions, you MUST extract **every single question** start time.
-     - **Tutorial / Step-by-Step:** Extract every major step.
-     - **Storytelling / General:** Extract key topic transitions only.
-   - **Determine Timestamp Format:**
-     - Check the final timestamp in the transcript.
-     - If the video is **under 1 hour**, use `MM:SS` format (e.g., 05:30, 59:45).
-     - If the video is **1 hour or longer**, use `HH:MM:SS` format (e.g., 01:05:30).
-
-2. **Labeling:**
-   - Write labels in the **Target Language**.
-   - Keep labels concise (1-6 words).
-   - Use original English words for technical terms or specific loanwords.
-   - If the Target Language is Thai, use English only for specific technical terms or loanwords (e.g., Sponsor, Member, Cosplay).
-
-3. **Output Formatting:**
-   - Format: `[Timestamp] - [Label]`
-   - Example (Short video): `05:12 - Intro`
-   - Example (Long video): `01:12:05 - Conclusion`
-   - Output **ONLY** the list of timestamps. No conversational text.
-
-**Example Output:**
-00:00 - Start
-02:15 - Introduction to the project
-05:30 - What is the budget?
-10:45 - Summary
-"""
+# Result caches and the near-duplicate index key on this, so results produced
+# by an older prompt are never served.
+PROMPT_VERSION = prompts.ACTIVE.version_id
+request_config = {**generation_config, "system_instruction": prompts.ACTIVE.system_instruction}
+
+
+# Large transcripts are kept in Gemini context caches; see services.context_cache.
+# The lambda keeps the client lookup patchable.
+CONTEXT_CACHE = context_cache.ContextCacheRegistry(
+    lambda api_key: get_client(api_key),
+    ttl=config.CONTEXT_CACHE_TTL,
+    min_tokens=config.CONTEXT_CACHE_MIN_TOKENS,
+    max_entries=config.CONTEXT_CACHE_MAX_ENTRIES,
+    timeout=config.CONTEXT_CACHE_TIMEOUT,
+)
+
+
+def estimate_tokens(prompt: Sequence[str]) -> int:
+    """Rough token count (about 4 characters per token) used for TPM budgeting."""
+    return prompts.prompt_length(prompt) // 4 + 1
 
 
 def generate_prompt(
     captions: str,
-    additional_instructions: str,
+    additional_instructions: str | None,
     video_id: str,
     language: str = "Same as Transcript",
-) -> str:
+) -> list[str]:
     logger.info(f"Generating prompt for {video_id}")
-    transcript = f"""
-**Target Language:** {language}
-**Here is the transcript:**
-{captions}
+    return prompts.ACTIVE.parts(captions, additional_instructions, language)
+
+
+async def build_prompt(
+    captions: str,
+    additional_instructions: str | None,
+    video_id: str,
+    language: str = "Same as Transcript",
+) -> list[str]:
+    """The prompt parts, or a prompt saved for this video when LOAD_PROMPT is on."""
+    if config.LOAD_PROMPT:
+        prompt_from_file = await file_io.async_load_prompt_from_file(video_id)
+        if prompt_from_file:
+            logger.info(f"Loaded prompt from file for {video_id}")
+            return [prompt_from_file]
+    return generate_prompt(captions, additional_instructions, video_id, language)
+
+
+async def acquire_endpoint(prompt: list[str]) -> gemini_pool.Endpoint:
+    """Takes an OVERLOAD slot, then an endpoint with rate-limit capacity.
+
+    Raises overload.GeminiUnavailableError right away while the circuit is open.
     """
+    with metrics.span("concurrency_wait"):
+        await OVERLOAD.acquire()
+    try:
+        with metrics.span("rate_limit_wait"):
+            return await POOL.acquire(RATE_LIMITER, tokens=estimate_tokens(prompt))
+    except BaseException:
+        OVERLOAD.cancel()
+        raise
+
+
+async def _with_context_cache[T](
+    call: Callable[[list[str], dict], Awaitable[T]],
+    prompt: list[str],
+    cache_name: str | None,
+    cached_prompt: list[str],
+) -> T:
+    """Calls with the cached content when there is one, else (or if it is gone) inline."""
+    if cache_name is not None:
+        try:
+            return await call(cached_prompt, {**generation_config, "cached_content": cache_name})
+        except Exception as e:
+            code = gemini_pool.api_error_code(e)
+            if code not in (403, 404):
+                raise
+            logger.warning(f"Context cache {cache_name} is gone ({code}), sending the full prompt")
+            CONTEXT_CACHE.invalidate(cache_name)
+    return await call(prompt, request_config)
+
 
-    prompt_from_file = file_io.load_prompt_from_file(video_id)
-    if prompt_from_file:
-        logger.info(f"Loaded prompt from file for {video_id}")
-        return prompt_from_file
+async def _generate(
+    client: "AsyncClient",
+    model: str,
+    prompt: list[str],
+    cache_name: str | None,
+    cached_prompt: list[str],
+) -> "GenerateContentResponse":
+    async def call(contents: list[str], request: dict) -> "GenerateContentResponse":
+        return await client.models.generate_content(model=model, contents=contents, config=request)
+
+    return await _with_context_cache(call, prompt, cache_name, cached_prompt)
+
+
+async def _start_stream(
+    client: "AsyncClient",
+    model: str,
+    prompt: list[str],
+    cache_name: str | None,
+    cached_prompt: list[str],
+) -> tuple[AsyncIterator["GenerateContentResponse"], "GenerateContentResponse | None"]:
+    """Opens a streaming call and returns it with its first chunk."""
+
+    async def call(
+        contents: list[str], request: dict
+    ) -> tuple[AsyncIterator["GenerateContentResponse"], "GenerateContentResponse | None"]:
+        stream = await client.models.generate_content_stream(
+            model=model, contents=contents, config=request
+        )
+        iterator = aiter(stream)
+        try:
+            async with asyncio.timeout(config.GEMINI_TIMEOUT or None):
+                return iterator, await anext(iterator, None)
+        except BaseException:
+            # Do not leave the HTTP stream open while the caller retries.
+            await _aclose_quietly(iterator)
+            raise
 
-    prompt = additional_instructions + transcript
-    logger.info(f"Generated new prompt for {video_id}")
-    return prompt
+    return await _with_context_cache(call, prompt, cache_name, cached_prompt)
 
 
 @retry(
     stop=stop_after_attempt(5),
     wait=wait_exponential(multiplier=1, min=4, max=20),
-    retry=retry_if_exception(is_gemini_overloaded),
+    retry=retry_if_exception(should_retry),
+    before_sleep=record_retry,
 )
 async def evaluate_timestamps(
     captions: str,
@@ -125,29 +295,168 @@ async def evaluate_timestamps(
     video_id: str = "",
     language: str = "Same as Transcript",
 ) -> list[str]:
-    async with RATE_LIMITER:
-        logger.info(f"Evaluating timestamps for {video_id}")
-        prompt = generate_prompt(captions, additional_instructions, video_id, language)
-        await file_io.async_save_prompt_to_file(prompt, video_id)
+    with metrics.span("prompt_build"):
+        prompt = await build_prompt(captions, additional_instructions, video_id, language)
+    await file_io.async_save_prompt_to_file(prompt, video_id)
 
-        try:
-            logger.info(f"Calling Gemini API for {video_id}")
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=prompt,
-                config={**generation_config, "system_instruction": system_instruction},
-            )
-            logger.info(f"API response received for {video_id}")
-            await file_io.async_save_response_to_file(response.text, video_id)
-
-            output = [
-                line.strip() for line in response.text.strip().split("\n") if line.strip()
-            ]
-            logger.info(f"Timestamps processed for {video_id}")
-            return output
-        except Exception as e:
-            logger.error(
-                f"API call failed for {video_id}: {e}",
-                exc_info=True,
+    endpoint = await acquire_endpoint(prompt)
+    logger.info(f"Evaluating timestamps for {video_id}")
+    error: BaseException | None = None
+    started = time.perf_counter()
+    try:
+        with metrics.span("context_cache"):
+            cache_name = await CONTEXT_CACHE.lookup(endpoint, video_id, captions, prompts.ACTIVE)
+        logger.info(f"Calling Gemini API ({endpoint.name}) for {video_id}")
+        with metrics.span("gemini_call"):
+            async with asyncio.timeout(config.GEMINI_TIMEOUT or None):
+                response = await _generate(
+                    get_client(endpoint.api_key),
+                    endpoint.model,
+                    prompt,
+                    cache_name,
+                    prompts.ACTIVE.cached_parts(additional_instructions, language),
+                )
+        logger.info(f"API response received for {video_id}")
+    except asyncio.CancelledError as e:
+        error = e
+        logger.warning(f"API call cancelled for {video_id}")
+        raise
+    except TimeoutError as e:
+        error = e
+        logger.error(f"API call timed out after {config.GEMINI_TIMEOUT}s for {video_id}")
+        raise
+    except Exception as e:
+        error = e
+        logger.error(
+            f"API call failed for {video_id}: {e}",
+            exc_info=True,
+        )
+        raise
+    finally:
+        metrics.GEMINI_ATTEMPTS.inc(outcome=attempt_outcome(error))
+        POOL.release(endpoint, error, time.perf_counter() - started)
+        OVERLOAD.release(error)
+    record_usage(response, endpoint.model)
+
+    await file_io.async_save_response_to_file(response.text, video_id)
+
+    output = [line.strip() for line in response.text.strip().split("\n") if line.strip()]
+    logger.info(f"Timestamps processed for {video_id}")
+    return output
+
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=4, max=20),
+    retry=retry_if_exception(should_retry),
+    before_sleep=record_retry,
+)
+async def _open_stream(
+    prompt: list[str],
+    video_id: str,
+    captions: str,
+    additional_instructions: str,
+    language: str,
+) -> tuple[
+    gemini_pool.Endpoint,
+    AsyncIterator["GenerateContentResponse"],
+    "GenerateContentResponse | None",
+]:
+    """Starts a streaming call and waits for its first chunk.
+
+    The request is only sent when the first chunk is awaited, so the retry policy
+    covers everything up to the first output. Errors after that are not retried,
+    since lines may already have been delivered. On success the caller must
+    release the returned endpoint, and its OVERLOAD slot, once the stream ends.
+    """
+    endpoint = await acquire_endpoint(prompt)
+    error: BaseException | None = None
+    try:
+        with metrics.span("context_cache"):
+            cache_name = await CONTEXT_CACHE.lookup(endpoint, video_id, captions, prompts.ACTIVE)
+        logger.info(f"Calling Gemini API (stream, {endpoint.name}) for {video_id}")
+        with metrics.span("gemini_first_chunk"):
+            iterator, first = await _start_stream(
+                get_client(endpoint.api_key),
+                endpoint.model,
+                prompt,
+                cache_name,
+                prompts.ACTIVE.cached_parts(additional_instructions, language),
             )
-            raise
+    except BaseException as e:
+        error = e
+        POOL.release(endpoint, error)
+        OVERLOAD.release(error)
+        raise
+    finally:
+        metrics.GEMINI_ATTEMPTS.inc(outcome=attempt_outcome(error))
+    return endpoint, iterator, first
+
+
+async def stream_timestamps(
+    captions: str,
+    additional_instructions: str = "",
+    video_id: str = "",
+    language: str = "Same as Transcript",
+) -> AsyncIterator[str]:
+    """Yields each timestamp line as soon as the model has produced it in full."""
+    with metrics.span("prompt_build"):
+        prompt = await build_prompt(captions, additional_instructions, video_id, language)
+    await file_io.async_save_prompt_to_file(prompt, video_id)
+
+    started = time.perf_counter()
+    endpoint, iterator, chunk = await _open_stream(
+        prompt, video_id, captions, additional_instructions, language
+    )
+    response_parts: list[str] = []
+    pending = ""
+    last_chunk = chunk
+    outcome = "error"
+    error: BaseException | None = None
+    try:
+        while chunk is not None:
+            last_chunk = chunk
+            text = chunk.text or ""
+            response_parts.append(text)
+            *lines, pending = (pending + text).split("\n")
+            for line in lines:
+                if line.strip():
+                    yield line.strip()
+            # The timeout bounds the gap between chunks, not the whole stream.
+            async with asyncio.timeout(config.GEMINI_TIMEOUT or None):
+                chunk = await anext(iterator, None)
+        outcome = "ok"
+    except TimeoutError as e:
+        error = e
+        logger.error(f"API stream stalled for {config.GEMINI_TIMEOUT}s for {video_id}")
+        raise
+    except (GeneratorExit, asyncio.CancelledError) as e:
+        error = e
+        outcome = "cancelled"
+        raise
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        await _aclose_quietly(iterator)
+        POOL.release(endpoint, error, time.perf_counter() - started)
+        OVERLOAD.release(error)
+        metrics.STAGE_SECONDS.observe(
+            time.perf_counter() - started, stage="gemini_stream", outcome=outcome
+        )
+
+    # Usage metadata is complete on the final chunk.
+    record_usage(last_chunk, endpoint.model)
+    if pending.strip():
+        yield pending.strip()
+    logger.info(f"API stream finished for {video_id}")
+    await file_io.async_save_response_to_file("".join(response_parts), video_id)
+
+
+async def _aclose_quietly(iterator: AsyncIterator[object]) -> None:
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception:
+            logger.debug("Error while closing Gemini stream", exc_info=True)
@@ -0,0 +1,191 @@
+import asyncio
+from collections.abc import Sequence
+from dataclasses import dataclass
+import hashlib
+import logging
+import math
+import sys
+import threading
+import time
+
+import config
+from services.rate_limit import RateLimiter
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the per-endpoint latency average.
+LATENCY_EWMA_ALPHA = 0.3
+# Longest the pool sleeps before re-checking every endpoint's limiter.
+MAX_POLL_SECONDS = 1.0
+
+
+def key_id(api_key: str) -> str:
+    """Short, stable, non-secret name for an API key, used in limiter keys and logs."""
+    return "k" + hashlib.sha256(api_key.encode()).hexdigest()[:8]
+
+
+def api_error_code(error: BaseException | None) -> int | None:
+    """The HTTP status of a Gemini ``APIError``, or None for any other exception.
+
+    Looked up through ``sys.modules`` so that importing this module does not
+    import the SDK, which is slow; an ``APIError`` cannot exist before it is.
+    """
+    errors = sys.modules.get("google.genai.errors")
+    if errors is None or not isinstance(error, errors.APIError):
+        return None
+    return error.code
+
+
+@dataclass(slots=True)
+class Endpoint:
+    """One API key paired with one model; the unit the pool routes, limits and quarantines."""
+
+    api_key: str
+    model: str
+    in_flight: int = 0
+    failures: int = 0
+    latency: float = 0.0
+    quarantined_until: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.model}@{key_id(self.api_key)}"
+
+    def is_quarantined(self, now: float) -> bool:
+        return self.quarantined_until > now
+
+    def load(self) -> tuple[int, int, float]:
+        # Fewest requests in flight first, then fewest recent failures, then fastest.
+        return self.in_flight, self.failures, self.latency
+
+
+class GeminiPool:
+    """Routes Gemini calls across API keys and model tiers.
+
+    ``models`` are tiers in order of preference; an endpoint from a later tier is
+    only used when every endpoint of the earlier tiers is quarantined or out of
+    quota. Within a tier the least-loaded healthy endpoint wins. A 429 quarantines
+    the endpoint for ``quarantine_seconds``; 503s and timeouts count as failures
+    that push it down the order and quarantine it briefly with exponential backoff.
+    If everything is quarantined, the endpoint released soonest is used anyway
+    and the caller's retry policy decides what happens next.
+    """
+
+    def __init__(
+        self,
+        api_keys: Sequence[str],
+        models: Sequence[str],
+        quarantine_seconds: float = 60,
+        short_model: str = "",
+        short_prompt_tokens: int = 0,
+    ) -> None:
+        if not models:
+            raise ValueError("GeminiPool needs at least one model")
+        self.models = list(dict.fromkeys(models))
+        self.short_model = short_model
+        self.short_prompt_tokens = short_prompt_tokens
+        self.quarantine_seconds = quarantine_seconds
+        tiers = [*self.models, short_model] if short_model else self.models
+        self.endpoints = [
+            Endpoint(api_key, model)
+            for model in dict.fromkeys(tiers)
+            for api_key in dict.fromkeys(api_keys)
+        ]
+        self._lock = threading.Lock()
+
+    @property
+    def signature(self) -> str:
+        """Identifies the routing policy, for cache keys."""
+        if not self.short_model:
+            return ",".join(self.models)
+        return f"{','.join(self.models)};{self.short_model}<={self.short_prompt_tokens}"
+
+    def tiers_for(self, tokens: int) -> list[str]:
+        if self.short_model and tokens <= self.short_prompt_tokens:
+            return [self.short_model, *(m for m in self.models if m != self.short_model)]
+        return self.models
+
+    def candidates(self, tokens: int) -> list[Endpoint]:
+        """Endpoints in the order they should be tried for a prompt of ``tokens``."""
+        now = time.monotonic()
+        with self._lock:
+            healthy: list[Endpoint] = []
+            for model in self.tiers_for(tokens):
+                tier = [e for e in self.endpoints if e.model == model]
+                healthy.extend(
+                    sorted((e for e in tier if not e.is_quarantined(now)), key=Endpoint.load)
+                )
+            if healthy:
+                return healthy
+            tiers = self.tiers_for(tokens)
+            quarantined = [e for e in self.endpoints if e.model in tiers]
+            return [min(quarantined, key=lambda e: e.quarantined_until)]
+
+    async def acquire(self, limiter: RateLimiter, tokens: int = 0) -> Endpoint:
+        """Waits for an endpoint with rate-limit capacity and marks it in flight."""
+        if not self.endpoints:
+            # Without keys the pool is empty; the app still starts, e.g. in mock mode.
+            raise ValueError(config.MISSING_API_KEY_MESSAGE)
+        while True:
+            wait = math.inf
+            for endpoint in self.candidates(tokens):
+                endpoint_wait = await limiter.try_acquire(endpoint.name, tokens)
+                if endpoint_wait <= 0:
+                    with self._lock:
+                        endpoint.in_flight += 1
+                    return endpoint
+                wait = min(wait, endpoint_wait)
+            logger.info(f"All Gemini endpoints at their rate limit, waiting {wait:.1f}s")
+            await asyncio.sleep(min(wait, MAX_POLL_SECONDS))
+
+    def release(
+        self, endpoint: Endpoint, error: BaseException | None = None, latency: float = 0.0
+    ) -> None:
+        """Records the outcome of a call made through ``acquire``."""
+        now = time.monotonic()
+        with self._lock:
+            endpoint.in_flight = max(0, endpoint.in_flight - 1)
+            if error is None:
+                endpoint.failures = 0
+                endpoint.latency = (
+                    latency
+                    if not endpoint.latency
+                    else LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * endpoint.latency
+                )
+                return
+            if isinstance(error, asyncio.CancelledError):
+                return
+            code = api_error_code(error)
+            if code == 429:
+                endpoint.quarantined_until = now + self.quarantine_seconds
+            elif code == 503 or isinstance(error, TimeoutError):
+                endpoint.failures += 1
+                backoff = min(self.quarantine_seconds, 2.0**endpoint.failures)
+                endpoint.quarantined_until = now + backoff
+            else:
+                return
+        metrics.GEMINI_QUARANTINES.inc(model=endpoint.model, reason=str(code or "timeout"))
+        logger.warning(
+            f"Quarantined Gemini endpoint {endpoint.name} for "
+            f"{endpoint.quarantined_until - now:.0f}s after {code or 'a timeout'}"
+        )
+
+    def states(self) -> dict[tuple[str, ...], float]:
+        now = time.monotonic()
+        counts: dict[tuple[str, ...], float] = {}
+        with self._lock:
+            for endpoint in self.endpoints:
+                state = "quarantined" if endpoint.is_quarantined(now) else "healthy"
+                counts[(endpoint.model, state)] = counts.get((endpoint.model, state), 0) + 1
+        return counts
+
+
+def create_pool() -> GeminiPool:
+    return GeminiPool(
+        api_keys=config.GEMINI_API_KEYS,
+        models=config.GEMINI_MODELS,
+        quarantine_seconds=config.GEMINI_QUARANTINE_SECONDS,
+        short_model=config.GEMINI_SHORT_MODEL,
+        short_prompt_tokens=config.GEMINI_SHORT_PROMPT_TOKENS,
+    )
@@ -0,0 +1,413 @@
+import asyncio
+from collections.abc import Iterable
+import contextlib
+from dataclasses import asdict, dataclass
+import logging
+from pathlib import Path
+import sqlite3
+import threading
+import time
+import uuid
+
+import config
+from services import video_processor
+from utils import metrics
+from utils.background_loop import BACKGROUND_LOOP, BackgroundLoop
+from utils.logging_config import request_id_var
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Workers refresh heartbeat_at of their running jobs this often. A running job
+# without a heartbeat for STALE_JOB_SECONDS belongs to a dead worker and is
+# queued again, however long it has been running.
+HEARTBEAT_SECONDS = 60
+STALE_JOB_SECONDS = 5 * 60
+MAX_ATTEMPTS = 3
+
+
+@dataclass(slots=True)
+class Job:
+    id: str
+    url: str
+    additional_instruction: str
+    language: str
+    priority: int
+    status: str
+    attempts: int = 0
+    result: str | None = None
+    error_type: str | None = None
+    error: str | None = None
+    created_at: float = 0.0
+    started_at: float | None = None
+    finished_at: float | None = None
+    heartbeat_at: float | None = None
+
+    def to_dict(self) -> dict[str, object]:
+        return asdict(self)
+
+
+class JobStore:
+    """Persistent priority queue of generation jobs backed by SQLite.
+
+    Higher ``priority`` runs first, then oldest first. Claiming a job is a single
+    ``BEGIN IMMEDIATE`` transaction, so several web processes can share one file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        if not self._initialized:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    " id TEXT PRIMARY KEY,"
+                    " url TEXT NOT NULL,"
+                    " additional_instruction TEXT NOT NULL,"
+                    " language TEXT NOT NULL,"
+                    " priority INTEGER NOT NULL,"
+                    " status TEXT NOT NULL,"
+                    " attempts INTEGER NOT NULL DEFAULT 0,"
+                    " result TEXT,"
+                    " error_type TEXT,"
+                    " error TEXT,"
+                    " created_at REAL NOT NULL,"
+                    " started_at REAL,"
+                    " finished_at REAL,"
+                    " heartbeat_at REAL)"
+                )
+                columns = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+                if "heartbeat_at" not in columns:
+                    connection.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS jobs_queue"
+                    " ON jobs (status, priority DESC, created_at)"
+                )
+                self._initialized = True
+        return connection
+
+    def submit(
+        self,
+        url: str,
+        additional_instruction: str = "",
+        language: str = "auto",
+        priority: int = 0,
+    ) -> Job:
+        job = Job(
+            id=uuid.uuid4().hex,
+            url=url,
+            additional_instruction=additional_instruction or "",
+            language=language,
+            priority=priority,
+            status=QUEUED,
+            created_at=time.time(),
+        )
+        connection = self._connect()
+        try:
+            connection.execute(
+                "INSERT INTO jobs"
+                " (id, url, additional_instruction, language, priority, status, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.id,
+                    job.url,
+                    job.additional_instruction,
+                    job.language,
+                    job.priority,
+                    job.status,
+                    job.created_at,
+                ),
+            )
+        finally:
+            connection.close()
+        logger.info(f"Queued job {job.id} for {url} (priority {priority})")
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            connection.close()
+        return Job(**row) if row is not None else None
+
+    def position(self, job: Job) -> int:
+        """Number of queued jobs that will run before ``job``."""
+        connection = self._connect()
+        try:
+            (ahead,) = connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?"
+                " AND (priority > ? OR (priority = ? AND created_at < ?))",
+                (QUEUED, job.priority, job.priority, job.created_at),
+            ).fetchone()
+        finally:
+            connection.close()
+        return ahead
+
+    def claim(self) -> Job | None:
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT * FROM jobs WHERE status = ?"
+                    " ORDER BY priority DESC, created_at LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                if row is None:
+                    connection.execute("COMMIT")
+                    return None
+                job = Job(**row)
+                job.status = RUNNING
+                job.attempts += 1
+                job.started_at = job.heartbeat_at = time.time()
+                connection.execute(
+                    "UPDATE jobs SET status = ?, attempts = ?, started_at = ?, heartbeat_at = ?"
+                    " WHERE id = ?",
+                    (job.status, job.attempts, job.started_at, job.heartbeat_at, job.id),
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        finally:
+            connection.close()
+        return job
+
+    def _finish(self, job_id: str, status: str, **fields: str | None) -> None:
+        connection = self._connect()
+        try:
+            connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error_type = ?, error = ?,"
+                " finished_at = ? WHERE id = ?",
+                (
+                    status,
+                    fields.get("result"),
+                    fields.get("error_type"),
+                    fields.get("error"),
+                    time.time(),
+                    job_id,
+                ),
+            )
+        finally:
+            connection.close()
+
+    def complete(self, job_id: str, result: str) -> None:
+        self._finish(job_id, DONE, result=result)
+
+    def fail(self, job_id: str, error_type: str, error: str) -> None:
+        self._finish(job_id, FAILED, error_type=error_type, error=error)
+
+    def heartbeat(self, job_ids: Iterable[str]) -> None:
+        """Marks running jobs as still owned by a live worker."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        connection = self._connect()
+        try:
+            connection.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?",
+                [(time.time(), job_id, RUNNING) for job_id in job_ids],
+            )
+        finally:
+            connection.close()
+
+    def requeue_stale(self, max_age: float = STALE_JOB_SECONDS) -> int:
+        """Requeues running jobs whose worker stopped sending heartbeats.
+
+        Jobs already out of attempts are failed instead.
+        """
+        cutoff = time.time() - max_age
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "UPDATE jobs SET status = ?, error_type = 'Abandoned',"
+                " error = 'Worker stopped before the job finished', finished_at = ?"
+                " WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ? AND attempts >= ?",
+                (FAILED, time.time(), RUNNING, cutoff, MAX_ATTEMPTS),
+            )
+            requeued = connection.execute(
+                "UPDATE jobs SET status = ?"
+                " WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ?",
+                (QUEUED, RUNNING, cutoff),
+            ).rowcount
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+        if requeued:
+            logger.warning(f"Requeued {requeued} stale jobs")
+        return requeued
+
+    def purge(self, retention: float) -> int:
+        if retention <= 0:
+            return 0
+        connection = self._connect()
+        try:
+            purged = connection.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, time.time() - retention),
+            ).rowcount
+        finally:
+            connection.close()
+        if purged:
+            logger.info(f"Purged {purged} finished jobs")
+        return purged
+
+    def stats(self) -> dict[str, int]:
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        finally:
+            connection.close()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+
+class JobWorkerPool:
+    """Runs queued jobs on the background loop with at most ``concurrency`` at once."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        concurrency: int,
+        loop: BackgroundLoop = BACKGROUND_LOOP,
+        poll_interval: float = 2.0,
+    ) -> None:
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self._loop = loop
+        self._wakeup: asyncio.Event | None = None
+        self._started = False
+        self._stopping = False
+        self._running: set[str] = set()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self._loop.submit(self._run())
+
+    def stop(self, timeout: float) -> bool:
+        """Stops claiming jobs and waits up to ``timeout`` for the running ones.
+
+        Returns whether every running job finished. Jobs still running are
+        cancelled with the background loop and requeued by the next process.
+        """
+        with self._lock:
+            if not self._started:
+                return True
+            self._stopping = True
+        self.notify()
+        return self._loop.submit(self._wait_idle(timeout)).result()
+
+    async def _wait_idle(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while self._running and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        return not self._running
+
+    def notify(self) -> None:
+        """Wakes an idle worker after a job was submitted from another thread."""
+        if self._wakeup is not None:
+            self._loop.call_soon(self._wakeup.set)
+
+    async def _run(self) -> None:
+        self._wakeup = asyncio.Event()
+        logger.info(f"Starting {self.concurrency} job workers")
+        await asyncio.to_thread(self.store.requeue_stale)
+        await asyncio.gather(
+            *(self._worker(n) for n in range(self.concurrency)),
+            self._heartbeat(),
+            self._housekeeping(),
+        )
+
+    async def _worker(self, number: int) -> None:
+        assert self._wakeup is not None
+        while not self._stopping:
+            job = await asyncio.to_thread(self.store.claim)
+            if job is None:
+                self._wakeup.clear()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                continue
+            self._running.add(job.id)
+            try:
+                await self.run_job(job, number)
+            finally:
+                self._running.discard(job.id)
+
+    async def run_job(self, job: Job, worker: int = 0) -> None:
+        request_id_var.set(job.id)
+        logger.info(f"Worker {worker} running job {job.id} (attempt {job.attempts})")
+        started = time.monotonic()
+        try:
+            timestamps = await video_processor.process_video_timestamp(
+                job.url, job.additional_instruction, job.language
+            )
+        except asyncio.CancelledError:
+            # Shutting down: leave the job running so requeue_stale picks it up.
+            raise
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed")
+            await asyncio.to_thread(self.store.fail, job.id, type(e).__name__, str(e))
+            return
+        await asyncio.to_thread(self.store.complete, job.id, timestamps)
+        logger.info(f"Job {job.id} finished in {time.monotonic() - started:.1f}s")
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            try:
+                await asyncio.to_thread(self.store.heartbeat, list(self._running))
+            except sqlite3.Error:
+                logger.warning("Could not refresh job heartbeats", exc_info=True)
+
+    async def _housekeeping(self) -> None:
+        while True:
+            await asyncio.sleep(STALE_JOB_SECONDS / 3)
+            await asyncio.to_thread(self.store.requeue_stale)
+            await asyncio.to_thread(self.store.purge, config.JOB_RETENTION_SECONDS)
+
+
+JOB_STORE = JobStore(config.JOBS_DB)
+JOB_POOL = JobWorkerPool(JOB_STORE, config.JOB_CONCURRENCY)
+
+
+def _job_counts() -> dict[tuple[str, ...], float]:
+    try:
+        return {(status,): count for status, count in JOB_STORE.stats().items()}
+    except sqlite3.Error:
+        logger.warning("Could not read job counts for metrics", exc_info=True)
+        return {}
+
+
+metrics.REGISTRY.register(
+    metrics.Gauge("youtamp_jobs", "Background jobs by status.", _job_counts, labels=("status",))
+)
+
+
+def submit_job(
+    url: str, additional_instruction: str = "", language: str = "auto", priority: int = 0
+) -> Job:
+    JOB_POOL.start()
+    job = JOB_STORE.submit(url, additional_instruction, language, priority)
+    JOB_POOL.notify()
+    return job
@@ -0,0 +1,288 @@
+"""Reuses chapters across re-uploads and mirrors with near-identical transcripts.
+
+Each transcript is fingerprinted with one-permutation MinHash over byte shingles
+of its caption text (timestamps excluded, so a copy that starts a few seconds
+later fingerprints the same) and indexed with LSH bands in SQLite, which keeps
+lookups to a handful of candidates however many videos are indexed. A match is
+re-timed by the median offset between caption lines the two transcripts share.
+"""
+
+import asyncio
+from collections.abc import Sequence
+from dataclasses import dataclass
+import json
+import logging
+from pathlib import Path
+import re
+import sqlite3
+import statistics
+import threading
+import time
+import zlib
+
+import config
+from services.chapters import ChapterList, parse_output
+from services.result_cache import CacheKey
+from services.youtube import TranscriptEntry, transcript_duration
+from utils import file_io, metrics
+
+logger = logging.getLogger(__name__)
+
+NUM_BINS = 64
+BAND_ROWS = 4
+EMPTY_BIN = 1 << 32
+# Long enough that shingles are specific, short enough that small caption edits
+# only disturb a few of them. Thai is three bytes per character in UTF-8.
+SHINGLE_BYTES = 16
+# Transcripts shorter than this are too generic to match on.
+MIN_TEXT_BYTES = 500
+# Caption lines shorter than this ("[Music]", "yeah") are useless for alignment.
+MIN_ANCHOR_CHARS = 12
+MIN_ANCHORS = 3
+
+NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+@dataclass(frozen=True, slots=True)
+class Fingerprint:
+    signature: tuple[int, ...]
+    # crc32 of a caption line that occurs once -> its start time.
+    anchors: dict[int, float]
+    duration: float
+
+
+@dataclass(frozen=True, slots=True)
+class Match:
+    video_id: str
+    similarity: float
+    offset: float
+    chapters: list[str]
+
+
+def normalize(text: str) -> str:
+    return NON_WORD_RE.sub("", text.casefold())
+
+
+def fingerprint(entries: Sequence[TranscriptEntry]) -> Fingerprint | None:
+    data = normalize("".join(entry.text for entry in entries)).encode()
+    if len(data) < MIN_TEXT_BYTES:
+        return None
+    hashes = {
+        zlib.crc32(data[i : i + SHINGLE_BYTES]) for i in range(len(data) - SHINGLE_BYTES + 1)
+    }
+    bins = [EMPTY_BIN] * NUM_BINS
+    for value in hashes:
+        index, rest = value % NUM_BINS, value // NUM_BINS
+        if rest < bins[index]:
+            bins[index] = rest
+
+    anchors: dict[int, float] = {}
+    repeated: set[int] = set()
+    for entry in entries:
+        text = normalize(entry.text)
+        if len(text) < MIN_ANCHOR_CHARS:
+            continue
+        key = zlib.crc32(text.encode())
+        if key in anchors:
+            repeated.add(key)
+        anchors.setdefault(key, entry.start)
+    for key in repeated:
+        del anchors[key]
+    return Fingerprint(tuple(bins), anchors, transcript_duration(list(entries)))
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    used = agree = 0
+    for x, y in zip(a, b, strict=True):
+        if x == EMPTY_BIN and y == EMPTY_BIN:
+            continue
+        used += 1
+        agree += x == y
+    return agree / used if used else 0.0
+
+
+def band_keys(signature: Sequence[int]) -> list[tuple[int, int]]:
+    keys = []
+    for band, start in enumerate(range(0, NUM_BINS, BAND_ROWS)):
+        rows = signature[start : start + BAND_ROWS]
+        if all(value == EMPTY_BIN for value in rows):
+            continue
+        keys.append((band, zlib.crc32(",".join(map(str, rows)).encode())))
+    return keys
+
+
+def estimate_offset(old: dict[int, float], new: dict[int, float]) -> float:
+    """Seconds to add to the old transcript's times to line them up with the new one."""
+    deltas = [new[key] - old[key] for key in new.keys() & old.keys()]
+    if len(deltas) < MIN_ANCHORS:
+        return 0.0
+    return float(round(statistics.median(deltas)))
+
+
+def shift_chapters(lines: Sequence[str], offset: float, duration: float) -> list[str]:
+    """Moves stored chapter lines by ``offset`` seconds (see ``ChapterList.shifted``)."""
+    if not offset:
+        return list(lines)
+    return parse_output(lines).shifted(offset, duration).lines()
+
+
+class NearDuplicateIndex:
+    """SQLite index of transcript fingerprints and the chapters generated for them."""
+
+    def __init__(self, path: Path, threshold: float) -> None:
+        self.path = Path(path)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            with self._lock:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.executescript(
+                    "CREATE TABLE IF NOT EXISTS fingerprints ("
+                    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                    " video_id TEXT NOT NULL,"
+                    " variant TEXT NOT NULL,"
+                    " signature TEXT NOT NULL,"
+                    " anchors BLOB NOT NULL,"
+                    " chapters TEXT NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " UNIQUE (video_id, variant));"
+                    "CREATE TABLE IF NOT EXISTS bands ("
+                    " band INTEGER NOT NULL,"
+                    " key INTEGER NOT NULL,"
+                    " fingerprint_id INTEGER NOT NULL);"
+                    "CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, key);"
+                    "CREATE INDEX IF NOT EXISTS bands_owner ON bands (fingerprint_id);"
+                )
+                self._initialized = True
+        return connection
+
+    def find(self, fp: Fingerprint, variant: str, exclude_video_id: str) -> Match | None:
+        keys = band_keys(fp.signature)
+        if not keys:
+            return None
+        clauses = " OR ".join(["(b.band = ? AND b.key = ?)"] * len(keys))
+        params: list[object] = [variant, exclude_video_id]
+        for band, key in keys:
+            params += [band, key]
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT DISTINCT f.video_id, f.signature, f.anchors, f.chapters"
+                " FROM bands b JOIN fingerprints f ON f.id = b.fingerprint_id"
+                f" WHERE f.variant = ? AND f.video_id != ? AND ({clauses})",
+                params,
+            ).fetchall()
+        finally:
+            connection.close()
+
+        best: Match | None = None
+        for video_id, signature, anchors, chapters in rows:
+            score = similarity(fp.signature, json.loads(signature))
+            if score < self.threshold or (best is not None and score <= best.similarity):
+                continue
+            old_anchors = {int(k): v for k, v in json.loads(zlib.decompress(anchors)).items()}
+            best = Match(
+                video_id, score, estimate_offset(old_anchors, fp.anchors), json.loads(chapters)
+            )
+        return best
+
+    def add(self, fp: Fingerprint, video_id: str, variant: str, chapters: Sequence[str]) -> None:
+        anchors = zlib.compress(json.dumps(fp.anchors, separators=(",", ":")).encode())
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "DELETE FROM bands WHERE fingerprint_id IN"
+                    " (SELECT id FROM fingerprints WHERE video_id = ? AND variant = ?)",
+                    (video_id, variant),
+                )
+                connection.execute(
+                    "DELETE FROM fingerprints WHERE video_id = ? AND variant = ?",
+                    (video_id, variant),
+                )
+                cursor = connection.execute(
+                    "INSERT INTO fingerprints"
+                    " (video_id, variant, signature, anchors, chapters, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        video_id,
+                        variant,
+                        json.dumps(fp.signature),
+                        anchors,
+                        json.dumps(list(chapters), ensure_ascii=False),
+                        time.time(),
+                    ),
+                )
+                connection.executemany(
+                    "INSERT INTO bands (band, key, fingerprint_id) VALUES (?, ?, ?)",
+                    [(band, key, cursor.lastrowid) for band, key in band_keys(fp.signature)],
+                )
+        finally:
+            connection.close()
+        logger.info(f"Indexed transcript fingerprint for {video_id}")
+
+
+async def reuse(
+    entries: Sequence[TranscriptEntry], video_id: str, cache_key: CacheKey
+) -> tuple[Fingerprint | None, ChapterList | None]:
+    """Looks for an indexed near-duplicate and returns its chapters re-timed for this video.
+
+    Also returns the fingerprint, so the caller can ``remember`` the result without
+    computing it twice.
+    """
+    if not config.NEAR_DUPLICATE_ENABLED:
+        return None, None
+    fp = await asyncio.to_thread(fingerprint, entries)
+    if fp is None:
+        return None, None
+    try:
+        match = await asyncio.to_thread(
+            NEAR_DUPLICATES.find, fp, cache_key.variant, video_id
+        )
+    except sqlite3.Error:
+        logger.warning(f"Could not search near-duplicate index for {video_id}", exc_info=True)
+        return fp, None
+    reused = (
+        parse_output(match.chapters).shifted(match.offset, fp.duration) if match else None
+    )
+    if match is None or not reused:
+        metrics.CACHE_REQUESTS.inc(cache="near_duplicate", result="miss")
+        return fp, None
+
+    metrics.CACHE_REQUESTS.inc(cache="near_duplicate", result="hit")
+    logger.info(
+        f"Reusing chapters of {match.video_id} for {video_id} "
+        f"(similarity {match.similarity:.2f}, offset {match.offset:+.0f}s)"
+    )
+    provenance = {
+        "near_duplicate_of": match.video_id,
+        "similarity": round(match.similarity, 3),
+        "offset_seconds": match.offset,
+        "chapters": reused.lines(),
+    }
+    await file_io.async_save_response_to_file(json.dumps(provenance, ensure_ascii=False), video_id)
+    return fp, reused
+
+
+async def remember(
+    fp: Fingerprint | None, video_id: str, cache_key: CacheKey, chapters: ChapterList
+) -> None:
+    if fp is None or not chapters or not config.NEAR_DUPLICATE_ENABLED:
+        return
+    try:
+        await asyncio.to_thread(
+            NEAR_DUPLICATES.add, fp, video_id, cache_key.variant, chapters.lines()
+        )
+    except sqlite3.Error:
+        # Only costs a Gemini call for a future re-upload.
+        logger.warning(f"Could not index transcript for {video_id}", exc_info=True)
+
+
+NEAR_DUPLICATES = NearDuplicateIndex(config.NEAR_DUPLICATE_DB, config.NEAR_DUPLICATE_THRESHOLD)
@@ -0,0 +1,235 @@
+"""Process-wide overload control for Gemini calls.
+
+Every attempt (first tries and retries alike) goes through one controller, which
+combines three mechanisms:
+
+- An AIMD concurrency limit: each successful call raises the limit by about one
+  per ``limit`` calls, and a 429, 503 or timeout halves it (at most once per
+  DECREASE_COOLDOWN_SECONDS, so one burst of failures counts once).
+- A retry budget: retries within the window are capped at ``retry_ratio`` of
+  the calls made in it (never below ``min_retries``), so during an outage
+  queued requests cannot multiply the load by retrying on their own.
+- A circuit breaker: when overload errors reach ``failure_ratio`` of at least
+  ``min_calls`` recent calls, calls fail fast with GeminiUnavailableError for
+  ``open_seconds``. A single probe call then decides whether to close it.
+
+Waiting polls like the rate limiters instead of using asyncio primitives, so one
+controller serves the web app's loop, the CLI's loop and test loops alike.
+"""
+
+import asyncio
+from collections import deque
+import logging
+import math
+import threading
+import time
+
+from services.gemini_pool import api_error_code
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN_SECONDS = 1.0
+POLL_SECONDS = 0.05
+# What callers turned away during a probe call are told to wait.
+PROBE_RETRY_AFTER_SECONDS = 1.0
+
+
+class GeminiUnavailableError(RuntimeError):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Gemini is unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def is_overload(error: BaseException | None) -> bool:
+    return isinstance(error, TimeoutError) or api_error_code(error) in (429, 503)
+
+
+class OverloadController:
+    def __init__(
+        self,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        window_seconds: float = 30,
+        retry_ratio: float = 0.2,
+        min_retries: int = 3,
+        failure_ratio: float = 0.5,
+        min_calls: int = 10,
+        open_seconds: float = 30,
+        enabled: bool = True,
+    ) -> None:
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.window_seconds = window_seconds
+        self.retry_ratio = retry_ratio
+        self.min_retries = min_retries
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.enabled = enabled
+
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.state = CLOSED
+        self.open_until = 0.0
+        self._probing = False
+        self._last_decrease = -math.inf
+        # Monotonic times of finished calls, overload failures and granted retries.
+        self._calls: deque[float] = deque()
+        self._failures: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        for events in (self._calls, self._failures, self._retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+
+    def _admit(self, now: float) -> bool:
+        """Takes a slot if one is free; raises while the circuit is open. Holds the lock."""
+        if self.state == OPEN:
+            if now < self.open_until:
+                metrics.GEMINI_REJECTIONS.inc(reason="circuit_open")
+                raise GeminiUnavailableError(self.open_until - now)
+            self.state = HALF_OPEN
+            logger.info("Gemini circuit half-open, sending a probe call")
+        if self.state == HALF_OPEN:
+            if self._probing:
+                metrics.GEMINI_REJECTIONS.inc(reason="circuit_open")
+                raise GeminiUnavailableError(PROBE_RETRY_AFTER_SECONDS)
+            self._probing = True
+            self.in_flight += 1
+            return True
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    async def acquire(self) -> None:
+        """Waits for a slot under the concurrency limit; pair with ``release``."""
+        if not self.enabled:
+            return
+        while True:
+            with self._lock:
+                if self._admit(time.monotonic()):
+                    return
+            await asyncio.sleep(POLL_SECONDS)
+
+    def release(self, error: BaseException | None = None) -> None:
+        """Records the outcome of an acquired call and adapts the limit and circuit."""
+        if not self.enabled:
+            return
+        if isinstance(error, asyncio.CancelledError | GeneratorExit):
+            self.cancel()
+            return
+        now = time.monotonic()
+        overloaded = is_overload(error)
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if self.state == HALF_OPEN and self._probing:
+                self._probing = False
+                if overloaded:
+                    self._open(now)
+                else:
+                    self._close()
+                return
+            self._trim(now)
+            self._calls.append(now)
+            if not overloaded:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+                return
+            self._failures.append(now)
+            if now - self._last_decrease >= DECREASE_COOLDOWN_SECONDS:
+                self._last_decrease = now
+                self.limit = max(float(self.min_limit), self.limit * DECREASE_FACTOR)
+                logger.warning(f"Gemini overloaded, concurrency limit now {int(self.limit)}")
+            calls = len(self._calls)
+            if (
+                self.state == CLOSED
+                and calls >= self.min_calls
+                and len(self._failures) >= self.failure_ratio * calls
+            ):
+                self._open(now)
+
+    def cancel(self) -> None:
+        """Gives back an acquired slot without recording an outcome."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._probing = False
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.open_until = now + self.open_seconds
+        logger.error(f"Gemini circuit open for {self.open_seconds:.0f}s, failing calls fast")
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._calls.clear()
+        self._failures.clear()
+        self._retries.clear()
+        logger.info("Gemini circuit closed")
+
+    def retry_budget(self) -> int:
+        """Retries still allowed in the current window."""
+        with self._lock:
+            self._trim(time.monotonic())
+            return self._retry_budget()
+
+    def _retry_budget(self) -> int:
+        allowed = max(self.min_retries, int(self.retry_ratio * len(self._calls)))
+        return max(0, allowed - len(self._retries))
+
+    def allow_retry(self) -> bool:
+        """Spends one retry from the budget; False when it is used up or the circuit is open."""
+        if not self.enabled:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            if self.state != CLOSED:
+                return False
+            if self._retry_budget() <= 0:
+                metrics.GEMINI_REJECTIONS.inc(reason="retry_budget")
+                logger.warning("Gemini retry budget exhausted, not retrying")
+                return False
+            self._retries.append(now)
+            return True
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.enabled and self.state == OPEN and time.monotonic() < self.open_until
+
+    def snapshot(self) -> dict[str, float | str]:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            return {
+                "state": self.state,
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "calls": len(self._calls),
+                "overloaded": len(self._failures),
+                "retries": len(self._retries),
+                "retry_budget": self._retry_budget(),
+                "open_for": max(0.0, self.open_until - now) if self.state == OPEN else 0.0,
+            }
+
+    def gauges(self) -> dict[tuple[str, ...], float]:
+        """Current values for the youtamp_gemini_overload gauge, one per field."""
+        snapshot = self.snapshot()
+        values = {
+            (name,): float(snapshot[name])
+            for name in ("limit", "in_flight", "retry_budget", "open_for")
+        }
+        values[("circuit_open",)] = float(snapshot["state"] != CLOSED)
+        return values
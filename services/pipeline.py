@@ -0,0 +1,164 @@
+"""Staged pipeline for many videos at once (playlists and channels).
+
+    fetch (wide) -> [bounded queue] -> generate (narrow) -> [bounded queue] -> persist
+
+Transcript fetches are mostly network waits and run many at a time. Gemini calls
+are limited by ``generate_concurrency`` and the shared rate limiter; when they
+fall behind, the bounded queue between the stages fills and the fetchers stop,
+so at most ``queue_size`` transcripts are held in memory waiting for the model.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+import logging
+from pathlib import Path
+import time
+
+import config
+from services import chapters, video_processor, youtube
+from services.batch import BatchItem, BatchResult, timestamps_path
+from services.result_cache import CacheKey
+from utils import file_io
+from utils.logging_config import video_id_var
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _Work:
+    item: BatchItem
+    video_id: str
+    cache_key: CacheKey
+    started: float = field(default_factory=time.monotonic)
+    entries: list[youtube.TranscriptEntry] = field(default_factory=list)
+    raw_output: chapters.ChapterList | None = None
+    timestamps: str | None = None
+
+    def failed(self, error: BaseException) -> BatchResult:
+        return BatchResult(
+            self.item.url,
+            self.video_id,
+            "failed",
+            error=str(error),
+            elapsed=time.monotonic() - self.started,
+            error_type=type(error).__name__,
+        )
+
+
+def items_for(video_ids: list[str]) -> list[BatchItem]:
+    return [BatchItem(youtube.video_url(video_id), video_id) for video_id in video_ids]
+
+
+async def run_pipeline(
+    items: list[BatchItem],
+    additional_instruction: str | None = None,
+    language: str = "auto",
+    fetch_concurrency: int = config.PIPELINE_FETCH_CONCURRENCY,
+    generate_concurrency: int = config.PIPELINE_GENERATE_CONCURRENCY,
+    queue_size: int = config.PIPELINE_QUEUE_SIZE,
+    output_dir: Path | None = None,
+    resume: bool = True,
+) -> AsyncIterator[BatchResult]:
+    """Processes items through the staged pipeline, yielding one result per item as it finishes.
+
+    With ``output_dir`` each video's timestamps are also written to
+    ``<output_dir>/<video_id>/timestamps.txt``, and with ``resume`` videos that
+    already have that file are skipped, as in batch mode.
+    """
+    pending: asyncio.Queue[BatchItem] = asyncio.Queue()
+    for item in items:
+        pending.put_nowait(item)
+    to_generate: asyncio.Queue[_Work] = asyncio.Queue(maxsize=max(1, queue_size))
+    to_persist: asyncio.Queue[_Work] = asyncio.Queue(maxsize=max(1, queue_size))
+    results: asyncio.Queue[BatchResult] = asyncio.Queue()
+
+    async def fetch_worker() -> None:
+        while True:
+            try:
+                item = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if item.video_id is None:
+                await results.put(BatchResult(item.url, None, "failed", error=item.error))
+                continue
+            if resume and output_dir and timestamps_path(item.video_id, output_dir).exists():
+                await results.put(BatchResult(item.url, item.video_id, "skipped"))
+                continue
+            video_id_var.set(item.video_id)
+            work = _Work(
+                item,
+                item.video_id,
+                video_processor.make_cache_key(item.video_id, language, additional_instruction),
+            )
+            try:
+                work.timestamps = await video_processor.get_cached(work.cache_key)
+                if work.timestamps is not None:
+                    logger.info(f"Serving cached timestamps for {work.video_id}")
+                    await to_persist.put(work)
+                    continue
+                work.entries = await video_processor.prepare_transcript(work.video_id, language)
+            except Exception as e:
+                await results.put(work.failed(e))
+                continue
+            # Blocks while Gemini is behind, which is the point.
+            await to_generate.put(work)
+
+    async def generate_worker() -> None:
+        while True:
+            work = await to_generate.get()
+            video_id_var.set(work.video_id)
+            try:
+                work.raw_output = await video_processor.evaluate_transcript(
+                    work.entries, additional_instruction or "", work.video_id, language
+                )
+            except Exception as e:
+                await results.put(work.failed(e))
+                continue
+            finally:
+                work.entries = []
+            await to_persist.put(work)
+
+    async def persist_worker() -> None:
+        while True:
+            work = await to_persist.get()
+            video_id_var.set(work.video_id)
+            try:
+                if work.raw_output is not None:
+                    work.timestamps = await video_processor.store_timestamps(
+                        work.raw_output, work.video_id, work.cache_key
+                    )
+                timestamps = work.timestamps or ""
+                if output_dir is not None:
+                    await file_io.async_write_file(
+                        timestamps, f"{work.video_id}/timestamps.txt", output_dir
+                    )
+            except Exception as e:
+                await results.put(work.failed(e))
+                continue
+            await results.put(
+                BatchResult(
+                    work.item.url,
+                    work.video_id,
+                    "done",
+                    timestamps,
+                    elapsed=time.monotonic() - work.started,
+                )
+            )
+
+    logger.info(
+        f"Pipeline processing {len(items)} videos "
+        f"(fetch {fetch_concurrency}, generate {generate_concurrency}, queue {queue_size})"
+    )
+    workers = [asyncio.create_task(fetch_worker()) for _ in range(max(1, fetch_concurrency))]
+    workers += [
+        asyncio.create_task(generate_worker()) for _ in range(max(1, generate_concurrency))
+    ]
+    workers.append(asyncio.create_task(persist_worker()))
+    try:
+        for _ in items:
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,169 @@
+"""Versioned prompt templates.
+
+Templates are plain data registered once at import. Each has a human version
+(bumped on purpose) and a content digest (changes on any edit), and both are part
+of ``version_id``, which result caches, the near-duplicate index and benchmark
+reports key on. Prompts are returned as a list of parts for the Gemini SDK, so a
+large transcript is passed through as-is instead of being copied into one string.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+import hashlib
+import logging
+
+import config
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class PromptTemplate:
+    name: str
+    version: int
+    system_instruction: str
+    # Placed between the caller's instructions and the transcript.
+    transcript_header: str
+    # Prepended to the instructions for each part of a chunked transcript.
+    chunk_note: str
+    # Follows the caller's instructions when the transcript is in a context cache
+    # and so comes before them.
+    cached_header: str
+    digest: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        content = "\0".join(
+            [self.system_instruction, self.transcript_header, self.chunk_note, self.cached_header]
+        )
+        object.__setattr__(self, "digest", hashlib.sha256(content.encode()).hexdigest()[:12])
+
+    @property
+    def version_id(self) -> str:
+        return f"{self.name}-v{self.version}-{self.digest}"
+
+    def parts(
+        self, captions: str, additional_instructions: str | None, language: str
+    ) -> list[str]:
+        parts = [self.transcript_header.format(language=language), captions]
+        if additional_instructions:
+            parts.insert(0, additional_instructions)
+        return parts
+
+    def cached_parts(self, additional_instructions: str | None, language: str) -> list[str]:
+        """The parts sent alongside a context cache holding the transcript."""
+        parts = [self.cached_header.format(language=language)]
+        if additional_instructions:
+            parts.insert(0, additional_instructions)
+        return parts
+
+
+def prompt_length(parts: Sequence[str]) -> int:
+    return sum(len(part) for part in parts)
+
+
+class PromptRegistry:
+    def __init__(self) -> None:
+        self._templates: dict[tuple[str, int], PromptTemplate] = {}
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        key = (template.name, template.version)
+        if key in self._templates:
+            raise ValueError(f"Prompt {template.name} v{template.version} is already registered")
+        self._templates[key] = template
+        return template
+
+    def get(self, name: str, version: int | None = None) -> PromptTemplate:
+        """The requested version of a template, or its latest version."""
+        versions = [t for (n, _), t in self._templates.items() if n == name]
+        if not versions:
+            raise KeyError(f"Unknown prompt template {name!r}")
+        if version is None:
+            return max(versions, key=lambda t: t.version)
+        for template in versions:
+            if template.version == version:
+                return template
+        raise KeyError(f"Unknown version {version} of prompt template {name!r}")
+
+    def templates(self) -> list[PromptTemplate]:
+        return list(self._templates.values())
+
+
+REGISTRY = PromptRegistry()
+
+TIMESTAMPS_V1_SYSTEM = """
+You are an intelligent video content analyzer. Your task is to extract timestamped chapters from a YouTube video transcript.
+
+**Input Data:**
+1. **Transcript**
+2. **Target Language** (e.g., Thai, English, Same as Transcript)
+
+**Instructions:**
+
+1. **Analyze Content & Strategy:**
+   - **Determine Content Type:**
+     - First, read the transcript to determine the nature of the content and apply the extraction logic accordingly
+     - **Q&A / Interview:** If the content consists of questions, you MUST extract **every single question** start time.
+     - **Tutorial / Step-by-Step:** Extract every major step.
+     - **Storytelling / General:** Extract key topic transitions only.
+   - **Determine Timestamp Format:**
+     - Check the final timestamp in the transcript.
+     - If the video is **under 1 hour**, use `MM:SS` format (e.g., 05:30, 59:45).
+     - If the video is **1 hour or longer**, use `HH:MM:SS` format (e.g., 01:05:30).
+
+2. **Labeling:**
+   - Write labels in the **Target Language**.
+   - Keep labels concise (1-6 words).
+   - Use original English words for technical terms or specific loanwords.
+   - If the Target Language is Thai, use English only for specific technical terms or loanwords (e.g., Sponsor, Member, Cosplay).
+
+3. **Output Formatting:**
+   - Format: `[Timestamp] - [Label]`
+   - Example (Short video): `05:12 - Intro`
+   - Example (Long video): `01:12:05 - Conclusion`
+   - Output **ONLY** the list of timestamps. No conversational text.
+
+**Example Output:**
+00:00 - Start
+02:15 - Introduction to the project
+05:30 - What is the budget?
+10:45 - Summary
+"""
+
+REGISTRY.register(
+    PromptTemplate(
+        name="timestamps",
+        version=1,
+        system_instruction=TIMESTAMPS_V1_SYSTEM,
+        transcript_header="\n**Target Language:** {language}\n**Here is the transcript:**\n",
+        chunk_note=(
+            "This transcript is part {part} of {total}, covering {start} to {end} of a "
+            "{duration} video. "
+            "Use the absolute timestamps shown in the transcript, in HH:MM:SS format. "
+            "Do not add a chapter at 00:00:00 unless this is part 1.\n"
+        ),
+        cached_header="\n**Target Language:** {language}\nThe transcript is given above.\n",
+    )
+)
+
+
+def _active() -> PromptTemplate:
+    try:
+        return REGISTRY.get("timestamps", config.PROMPT_TEMPLATE_VERSION or None)
+    except KeyError:
+        logger.warning(
+            f"Unknown PROMPT_TEMPLATE_VERSION {config.PROMPT_TEMPLATE_VERSION}, using the latest"
+        )
+        return REGISTRY.get("timestamps")
+
+
+ACTIVE = _active()
+
+metrics.REGISTRY.register(
+    metrics.Gauge(
+        "youtamp_prompt_info",
+        "The prompt template in use (always 1).",
+        lambda: {(ACTIVE.name, str(ACTIVE.version), ACTIVE.version_id): 1},
+        ("template", "version", "version_id"),
+    )
+)
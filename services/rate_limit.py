@@ -0,0 +1,194 @@
+from abc import ABC, abstractmethod
+import asyncio
+from dataclasses import dataclass
+import logging
+from pathlib import Path
+import sqlite3
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Quota:
+    """Requests and tokens allowed per minute for one limiter key."""
+
+    rpm: int  # 0 means requests are not limited
+    tpm: int = 0  # 0 means tokens are not limited
+
+    def __post_init__(self) -> None:
+        if self.rpm < 0 or self.tpm < 0:
+            raise ValueError(f"Quota limits must not be negative: {self}")
+
+
+@dataclass(slots=True)
+class BucketState:
+    requests: float
+    tokens: float
+    updated_at: float
+
+
+def parse_quotas(spec: str) -> dict[str, Quota]:
+    """Parses ``"key:rpm:tpm;key:rpm"`` into per-key quotas."""
+    quotas: dict[str, Quota] = {}
+    for item in filter(None, (part.strip() for part in spec.split(";"))):
+        key, _, limits = item.partition(":")
+        rpm, _, tpm = limits.partition(":")
+        try:
+            quotas[key.strip()] = Quota(rpm=int(rpm), tpm=int(tpm or 0))
+        except ValueError:
+            logger.warning(f"Ignoring invalid quota spec: {item!r}")
+    return quotas
+
+
+def take(
+    state: BucketState | None, quota: Quota, tokens: int, now: float
+) -> tuple[BucketState, float]:
+    """Refills the bucket and tries to take one request plus ``tokens``.
+
+    Returns the new state and how long to wait before trying again (0 when the
+    request was admitted and the state already has it deducted).
+    """
+    if state is None:
+        state = BucketState(requests=quota.rpm, tokens=quota.tpm, updated_at=now)
+
+    elapsed = max(0.0, now - state.updated_at)
+    # Both stay at 0 when their limit is 0 (unlimited).
+    requests = min(quota.rpm, state.requests + elapsed * quota.rpm / 60)
+    available_tokens = min(quota.tpm, state.tokens + elapsed * quota.tpm / 60)
+    # A request larger than the whole bucket would never fit; let it drain the bucket.
+    tokens = min(tokens, quota.tpm) if quota.tpm else 0
+    request_cost = 1 if quota.rpm else 0
+
+    wait = 0.0
+    if quota.rpm and requests < 1:
+        wait = (1 - requests) * 60 / quota.rpm
+    if quota.tpm and available_tokens < tokens:
+        wait = max(wait, (tokens - available_tokens) * 60 / quota.tpm)
+
+    if wait > 0:
+        return BucketState(requests, available_tokens, now), wait
+    return BucketState(requests - request_cost, available_tokens - tokens, now), 0.0
+
+
+class RateLimiter(ABC):
+    """Token-bucket limiter with per-key requests-per-minute and tokens-per-minute quotas."""
+
+    def __init__(self, default_quota: Quota, quotas: dict[str, Quota] | None = None) -> None:
+        self.default_quota = default_quota
+        self.quotas = quotas or {}
+
+    def quota_for(self, key: str) -> Quota:
+        """Quota for ``key``; ``"model@key-id"`` falls back to the quota for ``model``."""
+        if key in self.quotas:
+            return self.quotas[key]
+        return self.quotas.get(key.partition("@")[0], self.default_quota)
+
+    @abstractmethod
+    async def try_acquire(self, key: str, tokens: int) -> float:
+        """Takes capacity if available; otherwise returns the seconds to wait."""
+
+    async def acquire(self, key: str = "default", tokens: int = 0) -> float:
+        """Waits until ``key`` has capacity for one request of ``tokens`` tokens.
+
+        Returns the total time spent waiting.
+        """
+        started = time.monotonic()
+        while (wait := await self.try_acquire(key, tokens)) > 0:
+            logger.info(f"Rate limit reached for {key}, waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+        return time.monotonic() - started
+
+
+class InProcessRateLimiter(RateLimiter):
+    """Keeps buckets in memory. Limits are per process, shared by all its threads and loops."""
+
+    def __init__(self, default_quota: Quota, quotas: dict[str, Quota] | None = None) -> None:
+        super().__init__(default_quota, quotas)
+        self._buckets: dict[str, BucketState] = {}
+        self._lock = threading.Lock()
+
+    async def try_acquire(self, key: str, tokens: int) -> float:
+        with self._lock:
+            state, wait = take(self._buckets.get(key), self.quota_for(key), tokens, time.time())
+            self._buckets[key] = state
+        return wait
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """Keeps buckets in a SQLite file so every worker process on the host shares them.
+
+    Each attempt runs in a ``BEGIN IMMEDIATE`` transaction, which serializes the
+    read-refill-write cycle across processes.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        default_quota: Quota,
+        quotas: dict[str, Quota] | None = None,
+    ) -> None:
+        super().__init__(default_quota, quotas)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " key TEXT PRIMARY KEY,"
+                " requests REAL NOT NULL,"
+                " tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def _try_acquire(self, key: str, tokens: int) -> float:
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT requests, tokens, updated_at FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            state, wait = take(
+                BucketState(*row) if row else None, self.quota_for(key), tokens, time.time()
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (key, requests, tokens, updated_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, state.requests, state.tokens, state.updated_at),
+            )
+            connection.execute("COMMIT")
+            return wait
+        except Exception:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    async def try_acquire(self, key: str, tokens: int) -> float:
+        return await asyncio.to_thread(self._try_acquire, key, tokens)
+
+
+def create_limiter(
+    backend: str = config.RATE_LIMIT_BACKEND,
+    default_quota: Quota | None = None,
+    quotas: dict[str, Quota] | None = None,
+) -> RateLimiter:
+    default_quota = default_quota or Quota(
+        rpm=max(0, config.GEMINI_RPM), tpm=max(0, config.GEMINI_TPM)
+    )
+    if quotas is None:
+        quotas = parse_quotas(config.GEMINI_QUOTAS)
+    if backend == "sqlite":
+        logger.info(f"Using shared SQLite rate limiter at {config.RATE_LIMIT_DB}")
+        return SQLiteRateLimiter(config.RATE_LIMIT_DB, default_quota, quotas)
+    if backend != "memory":
+        logger.warning(f"Unknown RATE_LIMIT_BACKEND {backend!r}, using in-process limiter.")
+    return InProcessRateLimiter(default_quota, quotas)
@@ -0,0 +1,200 @@
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import logging
+from pathlib import Path
+import threading
+import time
+
+import config
+from utils import file_io, metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class CacheKey:
+    video_id: str
+    language: str
+    instruction_hash: str
+    model: str
+    prompt_version: str
+
+    @property
+    def digest(self) -> str:
+        raw = "|".join(
+            [
+                self.video_id,
+                self.language,
+                self.instruction_hash,
+                self.model,
+                self.prompt_version,
+            ]
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    @property
+    def variant(self) -> str:
+        """Everything but the video, so the same settings can be matched across videos."""
+        raw = "|".join([self.language, self.instruction_hash, self.model, self.prompt_version])
+        return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+    @property
+    def filename(self) -> str:
+        return f"{self.video_id}/cache/{self.digest}.json"
+
+
+def normalize_language(language: str | None) -> str:
+    return (language or "auto").strip().lower() or "auto"
+
+
+def hash_instruction(additional_instruction: str | None) -> str:
+    instruction = (additional_instruction or "").strip()
+    return hashlib.sha256(instruction.encode()).hexdigest()[:16]
+
+
+def make_key(
+    video_id: str,
+    language: str | None,
+    additional_instruction: str | None,
+    model: str,
+    prompt_version: str,
+) -> CacheKey:
+    return CacheKey(
+        video_id=video_id,
+        language=normalize_language(language),
+        instruction_hash=hash_instruction(additional_instruction),
+        model=model,
+        prompt_version=prompt_version,
+    )
+
+
+class ResultCache:
+    """Two-tier cache of generated timestamps.
+
+    The memory tier is an LRU with a TTL. The disk tier stores one JSON file per
+    key under ``<ARTIFACTS_DIR>/<video_id>/cache/`` so results survive restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 3600,
+        disk_ttl: float = 0,
+        base_dir: Path = config.ARTIFACTS_DIR,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl
+        self.base_dir = Path(base_dir)
+        self._entries: OrderedDict[CacheKey, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _get_memory(self, key: CacheKey) -> str | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                # Left in place for get_stale until it is evicted or replaced.
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_memory(self, key: CacheKey, value: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def _read_disk(self, key: CacheKey) -> dict | None:
+        if self.disk_ttl <= 0 or not (self.base_dir / key.filename).exists():
+            return None
+        try:
+            return json.loads(await file_io.async_read_file(key.filename, self.base_dir))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {key.filename}: {e}")
+            return None
+
+    async def _get_disk(self, key: CacheKey) -> str | None:
+        record = await self._read_disk(key)
+        if record is None:
+            return None
+        if time.time() - record.get("created_at", 0) > self.disk_ttl:
+            logger.info(f"Cache entry expired: {key.filename}")
+            return None
+        return record.get("timestamps")
+
+    async def _set_disk(self, key: CacheKey, value: str) -> None:
+        if self.disk_ttl <= 0:
+            return
+        record = {"created_at": time.time(), "key": asdict(key), "timestamps": value}
+        try:
+            await file_io.async_write_file(json.dumps(record), key.filename, self.base_dir)
+        except OSError:
+            # The memory tier still holds the result; a failed disk write is not fatal.
+            logger.warning(f"Could not persist cache entry {key.filename}")
+
+    async def get(self, key: CacheKey) -> str | None:
+        value = self._get_memory(key)
+        if value is not None:
+            self._count("memory_hits")
+            metrics.CACHE_REQUESTS.inc(cache="result", result="memory_hit")
+            logger.info(f"Result cache hit (memory) for {key.video_id}")
+            return value
+
+        value = await self._get_disk(key)
+        if value is not None:
+            self._count("disk_hits")
+            metrics.CACHE_REQUESTS.inc(cache="result", result="disk_hit")
+            logger.info(f"Result cache hit (disk) for {key.video_id}")
+            self._set_memory(key, value)
+            return value
+
+        self._count("misses")
+        metrics.CACHE_REQUESTS.inc(cache="result", result="miss")
+        logger.info(f"Result cache miss for {key.video_id}")
+        return None
+
+    async def get_stale(self, key: CacheKey) -> str | None:
+        """The last result stored for ``key``, however old, for when Gemini is down."""
+        with self._lock:
+            item = self._entries.get(key)
+        if item is not None:
+            metrics.CACHE_REQUESTS.inc(cache="result", result="stale_hit")
+            return item[1]
+        record = await self._read_disk(key)
+        if record is not None and record.get("timestamps"):
+            metrics.CACHE_REQUESTS.inc(cache="result", result="stale_hit")
+            return record["timestamps"]
+        return None
+
+    async def set(self, key: CacheKey, value: str) -> None:
+        self._set_memory(key, value)
+        await self._set_disk(key, value)
+        self._count("stores")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+RESULT_CACHE = ResultCache(
+    max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+    ttl=config.RESULT_CACHE_TTL,
+    disk_ttl=config.RESULT_CACHE_DISK_TTL,
+)
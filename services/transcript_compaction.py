@@ -0,0 +1,129 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
+import logging
+import re
+
+import config
+from services.gemini import estimate_tokens
+from services.youtube import TranscriptEntry, format_transcript
+
+logger = logging.getLogger(__name__)
+
+# "[Music]", "[Applause]", "(laughter)", "♪"
+TAG_RE = re.compile(
+    r"\[[^\]]*\]|\((?:music|applause|laughter|laughs|inaudible|silence)\)|[♪♫]+",
+    re.IGNORECASE,
+)
+FILLER_WORDS = frozenset(
+    {"um", "umm", "uh", "uhh", "uhm", "erm", "er", "ah", "hmm", "mm", "mhm"}
+    | {"เอ่อ", "อ่า", "อืม", "เอ้อ"}
+)
+PUNCTUATION = ",.!?…"
+
+
+@dataclass(frozen=True, slots=True)
+class CompactionReport:
+    entries_before: int
+    entries_after: int
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def saved_ratio(self) -> float:
+        if not self.tokens_before:
+            return 0.0
+        return 1 - self.tokens_after / self.tokens_before
+
+
+def clean_text(text: str, drop_fillers: bool = True, collapse_repeats: bool = True) -> str:
+    text = TAG_RE.sub(" ", text.replace("\n", " "))
+    words: list[str] = []
+    for word in text.split():
+        bare = word.strip(PUNCTUATION).casefold()
+        if drop_fillers and bare in FILLER_WORDS:
+            continue
+        # "the the the" -> "the"
+        if collapse_repeats and words and bare and words[-1].strip(PUNCTUATION).casefold() == bare:
+            continue
+        words.append(word)
+    return " ".join(words)
+
+
+def merge_windows(
+    entries: Sequence[TranscriptEntry], window_seconds: float
+) -> list[TranscriptEntry]:
+    """Merges adjacent entries so each output entry spans at most ``window_seconds``."""
+    merged: list[TranscriptEntry] = []
+    start = end = 0.0
+    texts: list[str] = []
+    for entry in entries:
+        if texts and entry.start - start >= window_seconds:
+            merged.append(TranscriptEntry(start, end - start, " ".join(texts)))
+            texts = []
+            end = 0.0
+        if not texts:
+            start = entry.start
+        texts.append(entry.text)
+        end = max(end, entry.start + entry.duration)
+    if texts:
+        merged.append(TranscriptEntry(start, end - start, " ".join(texts)))
+    return merged
+
+
+def compact_transcript(
+    entries: Sequence[TranscriptEntry],
+    window_seconds: float = 0,
+    drop_fillers: bool = True,
+    collapse_repeats: bool = True,
+) -> tuple[list[TranscriptEntry], CompactionReport]:
+    compacted: list[TranscriptEntry] = []
+    for entry in entries:
+        text = clean_text(entry.text, drop_fillers, collapse_repeats)
+        if not text:
+            continue
+        if collapse_repeats and compacted and compacted[-1].text == text:
+            # Rolling captions often repeat the previous fragment verbatim.
+            previous = compacted[-1]
+            end = max(previous.start + previous.duration, entry.start + entry.duration)
+            compacted[-1] = TranscriptEntry(previous.start, end - previous.start, text)
+            continue
+        compacted.append(TranscriptEntry(entry.start, entry.duration, text))
+
+    if window_seconds > 0:
+        compacted = merge_windows(compacted, window_seconds)
+
+    report = CompactionReport(
+        entries_before=len(entries),
+        entries_after=len(compacted),
+        tokens_before=estimate_tokens(format_transcript(entries)),
+        tokens_after=estimate_tokens(format_transcript(compacted)),
+    )
+    return compacted, report
+
+
+def signature() -> str:
+    """Identifies the configured compaction, so results built from it are keyed apart."""
+    if not config.COMPACT_TRANSCRIPT:
+        return "raw"
+    fillers = "-fillers" if config.COMPACT_DROP_FILLERS else ""
+    return f"compact-w{config.COMPACT_WINDOW_SECONDS}{fillers}"
+
+
+def compact_for_prompt(
+    entries: Sequence[TranscriptEntry], video_id: str = ""
+) -> list[TranscriptEntry]:
+    """Applies the configured compaction, or returns the entries unchanged when disabled."""
+    if not config.COMPACT_TRANSCRIPT:
+        return list(entries)
+    compacted, report = compact_transcript(
+        entries,
+        window_seconds=config.COMPACT_WINDOW_SECONDS,
+        drop_fillers=config.COMPACT_DROP_FILLERS,
+        collapse_repeats=True,
+    )
+    logger.info(
+        f"Compacted transcript for {video_id}: {report.entries_before} -> "
+        f"{report.entries_after} entries, ~{report.tokens_before} -> "
+        f"~{report.tokens_after} tokens ({report.saved_ratio:.0%} saved)"
+    )
+    return compacted
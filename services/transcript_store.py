@@ -0,0 +1,131 @@
+from collections.abc import Sequence
+import json
+import logging
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Protocol
+import zlib
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class Entry(Protocol):
+    start: float
+    duration: float
+    text: str
+
+
+class TranscriptStore:
+    """SQLite store of raw caption entries keyed by (video_id, language).
+
+    Entries are stored as zlib-compressed JSON rows of ``[start, duration, text]``.
+    When the total compressed size exceeds ``max_bytes``, the least recently read
+    transcripts are evicted.
+    """
+
+    def __init__(self, path: Path, max_bytes: int) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            with self._lock:
+                try:
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.execute(
+                        "CREATE TABLE IF NOT EXISTS transcripts ("
+                        " video_id TEXT NOT NULL,"
+                        " language TEXT NOT NULL,"
+                        " entries BLOB NOT NULL,"
+                        " size INTEGER NOT NULL,"
+                        " fetched_at REAL NOT NULL,"
+                        " accessed_at REAL NOT NULL,"
+                        " PRIMARY KEY (video_id, language))"
+                    )
+                except sqlite3.Error:
+                    connection.close()
+                    raise
+                self._initialized = True
+        return connection
+
+    def get(self, video_id: str, language: str) -> list[tuple[float, float, str]] | None:
+        connection = self._connect()
+        try:
+            with connection:
+                row = connection.execute(
+                    "SELECT entries FROM transcripts WHERE video_id = ? AND language = ?",
+                    (video_id, language),
+                ).fetchone()
+                if row is None:
+                    return None
+                connection.execute(
+                    "UPDATE transcripts SET accessed_at = ? WHERE video_id = ? AND language = ?",
+                    (time.time(), video_id, language),
+                )
+        finally:
+            connection.close()
+        logger.info(f"Transcript store hit for {video_id} ({language})")
+        return [tuple(item) for item in json.loads(zlib.decompress(row[0]))]
+
+    def put(self, video_id: str, language: str, entries: Sequence[Entry]) -> None:
+        payload = json.dumps(
+            [[entry.start, entry.duration, entry.text] for entry in entries],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        blob = zlib.compress(payload.encode(), level=6)
+        now = time.time()
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO transcripts"
+                    " (video_id, language, entries, size, fetched_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (video_id, language, blob, len(blob), now, now),
+                )
+                self._evict(connection)
+        finally:
+            connection.close()
+        logger.info(f"Stored transcript for {video_id} ({language}, {len(blob)} bytes)")
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        (total,) = connection.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = connection.execute(
+            "SELECT video_id, language, size FROM transcripts ORDER BY accessed_at"
+        ).fetchall()
+        evicted = 0
+        for video_id, language, size in rows:
+            if total <= self.max_bytes:
+                break
+            connection.execute(
+                "DELETE FROM transcripts WHERE video_id = ? AND language = ?",
+                (video_id, language),
+            )
+            total -= size
+            evicted += 1
+        logger.info(f"Evicted {evicted} transcripts from the store")
+
+    def stats(self) -> dict[str, int]:
+        connection = self._connect()
+        try:
+            count, size = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcripts"
+            ).fetchone()
+        finally:
+            connection.close()
+        return {"transcripts": count, "bytes": size}
+
+
+TRANSCRIPT_STORE = TranscriptStore(config.TRANSCRIPT_STORE_DB, config.TRANSCRIPT_STORE_MAX_BYTES)
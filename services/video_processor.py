@@ -1,17 +1,25 @@
+import asyncio
+from collections.abc import AsyncIterator
 import logging
-from collections.abc import Iterable
 
-from services import gemini, youtube
-from utils import file_io
+import config
+from services import (
+    chapters,
+    chunking,
+    gemini,
+    near_duplicate,
+    overload,
+    result_cache,
+    transcript_compaction,
+    youtube,
+)
+from utils import file_io, metrics
+from utils.logging_config import video_id_var
+from utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
-def format_timestamps(timestamps: Iterable[str]) -> str:
-    logger.info("Formatting final timestamps.")
-    return "\n".join(timestamps)
-
-
 def format_language(language: str) -> list[str]:
     if language.lower() == "auto":
         logger.info("Language 'auto', using ['th'].")
@@ -21,33 +29,190 @@ def format_language(language: str) -> list[str]:
     return lang_list
 
 
+# Identical in-flight requests share one transcript fetch and one Gemini call.
+TRANSCRIPT_FLIGHTS = SingleFlight("transcript")
+GENERATION_FLIGHTS = SingleFlight("generation")
+
+
+async def fetch_transcript(video_id: str, language: str) -> list[youtube.TranscriptEntry]:
+    lang_list = format_language(language)
+
+    logger.info(f"Fetching transcript for {video_id} ({lang_list})")
+    entries = await TRANSCRIPT_FLIGHTS.do(
+        (video_id, tuple(lang_list)),
+        lambda: youtube.async_get_transcript_entries(video_id, lang_list),
+    )
+    logger.info(f"Transcript received for {video_id}")
+    return entries
+
+
+async def prepare_transcript(video_id: str, language: str) -> list[youtube.TranscriptEntry]:
+    entries = await fetch_transcript(video_id, language)
+    with metrics.span("transcript_compaction"):
+        return transcript_compaction.compact_for_prompt(entries, video_id)
+
+
+async def evaluate_transcript(
+    entries: list[youtube.TranscriptEntry],
+    additional_instruction: str,
+    video_id: str,
+    language: str,
+) -> chapters.ChapterList:
+    """Chapters for the transcript, reused from a near-duplicate video when there is one."""
+    cache_key = make_cache_key(video_id, language, additional_instruction)
+    fingerprint, reused = await near_duplicate.reuse(entries, video_id, cache_key)
+    if reused is not None:
+        return reused
+    result = await call_gemini(entries, additional_instruction, video_id, language)
+    await near_duplicate.remember(fingerprint, video_id, cache_key, result)
+    return result
+
+
+async def call_gemini(
+    entries: list[youtube.TranscriptEntry],
+    additional_instruction: str,
+    video_id: str,
+    language: str,
+) -> chapters.ChapterList:
+    if chunking.should_chunk(entries):
+        logger.info(f"Long transcript, sending to Gemini in chunks for {video_id}")
+        return await chunking.evaluate_chunked(
+            entries, additional_instruction, video_id, language=language
+        )
+
+    captions = youtube.format_transcript(entries)
+    logger.info(f"Sending to Gemini for {video_id}")
+    output = await gemini.evaluate_timestamps(
+        captions,
+        additional_instruction,
+        video_id,
+        language=language,
+    )
+    return repair_output(output, entries)
+
+
+def repair_output(
+    output: list[str], entries: list[youtube.TranscriptEntry]
+) -> chapters.ChapterList:
+    duration = youtube.transcript_duration(entries)
+    return chapters.repair(chapters.parse_output(output, duration), duration)
+
+
+def make_cache_key(
+    video_id: str, language: str, additional_instruction: str | None
+) -> result_cache.CacheKey:
+    # Compaction changes the prompt as much as the template does.
+    prompt_version = f"{gemini.PROMPT_VERSION}+{transcript_compaction.signature()}"
+    return result_cache.make_key(
+        video_id, language, additional_instruction, gemini.POOL.signature, prompt_version
+    )
+
+
+async def get_cached(cache_key: result_cache.CacheKey) -> str | None:
+    if not config.RESULT_CACHE_ENABLED:
+        return None
+    return await result_cache.RESULT_CACHE.get(cache_key)
+
+
+async def get_stale(cache_key: result_cache.CacheKey) -> str | None:
+    if not config.RESULT_CACHE_ENABLED:
+        return None
+    return await result_cache.RESULT_CACHE.get_stale(cache_key)
+
+
+async def check_gemini_available(cache_key: result_cache.CacheKey) -> str | None:
+    """Fails fast while Gemini's circuit is open, unless an older result can be served."""
+    if not gemini.OVERLOAD.is_open():
+        return None
+    stale = await get_stale(cache_key)
+    if stale is None:
+        raise overload.GeminiUnavailableError(gemini.OVERLOAD.snapshot()["open_for"])
+    logger.warning(f"Gemini is unavailable, serving stale timestamps for {cache_key.video_id}")
+    return stale
+
+
+async def store_timestamps(
+    result: chapters.ChapterList, video_id: str, cache_key: result_cache.CacheKey
+) -> str:
+    """Saves the chapters as an artifact and caches the formatted timestamps."""
+    lines = result.lines()
+    await file_io.async_save_timestamps_to_file(lines, video_id)
+
+    timestamps = "\n".join(lines)
+    if config.RESULT_CACHE_ENABLED and timestamps:
+        await result_cache.RESULT_CACHE.set(cache_key, timestamps)
+    return timestamps
+
+
+async def generate_timestamps(
+    video_id: str,
+    additional_instruction: str,
+    language: str,
+    cache_key: result_cache.CacheKey,
+) -> str:
+    entries = await prepare_transcript(video_id, language)
+    result = await evaluate_transcript(entries, additional_instruction, video_id, language)
+    logger.info(f"Gemini evaluation complete for {video_id}")
+    return await store_timestamps(result, video_id, cache_key)
+
+
+async def join_generation(
+    video_id: str,
+    additional_instruction: str,
+    language: str,
+    cache_key: result_cache.CacheKey,
+) -> str:
+    """Waits for the generation already in flight for ``cache_key``.
+
+    If that flight has finished or its leader went away in the meantime, the
+    cached result is used or the timestamps are generated here instead.
+    """
+
+    async def generate() -> str:
+        cached = await get_cached(cache_key)
+        if cached is not None:
+            return cached
+        return await generate_timestamps(video_id, additional_instruction, language, cache_key)
+
+    logger.info(f"Joining in-flight generation for {video_id}")
+    with metrics.span("generate"):
+        return await GENERATION_FLIGHTS.do(cache_key, generate)
+
+
 async def process_video_timestamp(
     url: str, additional_instruction: str, language: str
 ) -> str:
     logger.info(f"Processing URL: {url}")
     try:
-        video_id = youtube.extract_video_id(url)
+        with metrics.span("extract_video_id"):
+            video_id = youtube.extract_video_id(url)
+        video_id_var.set(video_id)
         logger.info(f"Video ID: {video_id}")
 
-        lang_list = format_language(language)
+        cache_key = make_cache_key(video_id, language, additional_instruction)
+        cached = await get_cached(cache_key)
+        if cached is not None:
+            logger.info(f"Serving cached timestamps for {url}")
+            return cached
 
-        logger.info(f"Fetching transcript for {video_id} ({lang_list})")
-        captions_list = await youtube.async_get_transcript_lines(video_id, lang_list)
-        captions = "\n".join(captions_list)
-        logger.info(f"Transcript received for {video_id}")
-
-        logger.info(f"Sending to Gemini for {video_id}")
-        raw_output = await gemini.evaluate_timestamps(
-            captions,
-            additional_instruction,
-            video_id,
-            language=language,
-        )
-        logger.info(f"Gemini evaluation complete for {video_id}")
+        stale = await check_gemini_available(cache_key)
+        if stale is not None:
+            return stale
 
-        await file_io.async_save_timestamps_to_file(raw_output, video_id)
-
-        timestamps = format_timestamps(raw_output)
+        try:
+            with metrics.span("generate"):
+                timestamps = await GENERATION_FLIGHTS.do(
+                    cache_key,
+                    lambda: generate_timestamps(
+                        video_id, additional_instruction, language, cache_key
+                    ),
+                )
+        except overload.GeminiUnavailableError:
+            stale = await get_stale(cache_key)
+            if stale is None:
+                raise
+            logger.warning(f"Gemini became unavailable, serving stale timestamps for {url}")
+            return stale
         logger.info(f"Finished processing for {url}")
         return timestamps
     except Exception as e:
@@ -55,4 +220,114 @@ async def process_video_timestamp(
             f"Processing failed for {url}: {e}",
             exc_info=True,
         )
-        raise
\ No newline at end of file
+        raise
+
+
+# Events yielded by stream_video_timestamp as (event, data) pairs.
+TIMESTAMP_EVENT = "timestamp"
+# Replaces everything sent so far with the repaired chapters that were stored.
+REPLACE_EVENT = "replace"
+
+
+async def stream_gemini_chapters(
+    entries: list[youtube.TranscriptEntry],
+    additional_instruction: str,
+    video_id: str,
+    language: str,
+    raw_output: list[str],
+) -> AsyncIterator[str]:
+    """Chapter lines from the Gemini stream as they arrive, collecting the raw output.
+
+    Lines that are not chapters, out of order or past the end of the video are
+    not passed on; ``repair_output`` decides what is finally kept.
+    """
+    duration = youtube.transcript_duration(entries)
+    with_hours = duration >= 3600
+    last_start = -1
+    captions = youtube.format_transcript(entries)
+    logger.info(f"Streaming from Gemini for {video_id}")
+    async for line in gemini.stream_timestamps(
+        captions,
+        additional_instruction,
+        video_id,
+        language=language,
+    ):
+        raw_output.append(line)
+        parsed = chapters.parse_chapter_line(line)
+        if parsed is None or not parsed[1] or not last_start < parsed[0] <= duration:
+            continue
+        last_start = parsed[0]
+        yield f"{chapters.format_timestamp(parsed[0], with_hours)} - {parsed[1]}"
+
+
+async def stream_video_timestamp(
+    url: str, additional_instruction: str, language: str
+) -> AsyncIterator[tuple[str, str]]:
+    """Streaming variant of process_video_timestamp.
+
+    Yields a TIMESTAMP_EVENT per chapter line, and a final REPLACE_EVENT with the
+    stored chapters when repairing the streamed output changed them.
+    """
+    logger.info(f"Streaming URL: {url}")
+    with metrics.span("extract_video_id"):
+        video_id = youtube.extract_video_id(url)
+    video_id_var.set(video_id)
+    logger.info(f"Video ID: {video_id}")
+
+    cache_key = make_cache_key(video_id, language, additional_instruction)
+    cached = await get_cached(cache_key)
+    if cached is not None:
+        logger.info(f"Streaming cached timestamps for {url}")
+        for line in cached.split("\n"):
+            yield TIMESTAMP_EVENT, line
+        return
+    stale = await check_gemini_available(cache_key)
+    if stale is not None:
+        for line in stale.split("\n"):
+            yield TIMESTAMP_EVENT, line
+        return
+
+    flight = GENERATION_FLIGHTS.lead(cache_key)
+    if flight is None:
+        timestamps = await join_generation(video_id, additional_instruction, language, cache_key)
+        for line in timestamps.split("\n"):
+            yield TIMESTAMP_EVENT, line
+        return
+
+    try:
+        entries = await prepare_transcript(video_id, language)
+
+        if chunking.should_chunk(entries):
+            # Chunk results are only final once neighbouring chunks are merged.
+            result = await evaluate_transcript(entries, additional_instruction, video_id, language)
+            for line in result.lines():
+                yield TIMESTAMP_EVENT, line
+        else:
+            fingerprint, reused = await near_duplicate.reuse(entries, video_id, cache_key)
+            if reused is not None:
+                result = reused
+                for line in result.lines():
+                    yield TIMESTAMP_EVENT, line
+            else:
+                raw_output: list[str] = []
+                sent: list[str] = []
+                async for line in stream_gemini_chapters(
+                    entries, additional_instruction, video_id, language, raw_output
+                ):
+                    sent.append(line)
+                    yield TIMESTAMP_EVENT, line
+                result = repair_output(raw_output, entries)
+                await near_duplicate.remember(fingerprint, video_id, cache_key, result)
+                if result.lines() != sent:
+                    yield REPLACE_EVENT, result.to_text()
+        logger.info(f"Gemini stream complete for {video_id}")
+
+        timestamps = await store_timestamps(result, video_id, cache_key)
+    except (asyncio.CancelledError, GeneratorExit):
+        flight.cancel()
+        raise
+    except BaseException as e:
+        flight.set_exception(e)
+        raise
+    flight.set_result(timestamps)
+    logger.info(f"Finished streaming for {url}")
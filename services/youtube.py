@@ -1,9 +1,22 @@
 import asyncio
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
 import datetime
 import logging
 import re
+import sqlite3
+import threading
+import time
+from typing import Any, Protocol
+import urllib.request
+import weakref
 
-from youtube_transcript_api import YouTubeTranscriptApi
+from youtube_transcript_api import NoTranscriptFound, YouTubeTranscriptApi
+
+import config
+from services.transcript_store import TRANSCRIPT_STORE
+from utils import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +26,7 @@ def extract_video_id(url_or_id: str) -> str:
     if len(url_or_id) == 11:
         logger.info("Input is 11 chars, assuming video ID.")
         return url_or_id
-    match = re.search(r"(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})", url_or_id)
+    match = re.search(r"(?:v=|youtu\.be/|/shorts/|/live/|/embed/)([a-zA-Z0-9_-]{11})", url_or_id)
     video_id = match.group(1) if match else None
     if not video_id:
         logger.error("Invalid YouTube URL or ID provided.")
@@ -22,23 +35,276 @@ def extract_video_id(url_or_id: str) -> str:
     return video_id
 
 
+PLAYLIST_RE = re.compile(r"youtube\.com/playlist\?(?:.*&)?list=([\w-]+)")
+CHANNEL_RE = re.compile(r"youtube\.com/(@[\w.-]+|channel/[\w-]+|c/[\w.-]+|user/[\w.-]+)")
+PAGE_VIDEO_ID_RE = re.compile(r'"videoId":"([a-zA-Z0-9_-]{11})"')
+PAGE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko)",
+    "Accept-Language": "en-US,en;q=0.9",
+    # Skips the EU cookie consent interstitial, which lists no videos.
+    "Cookie": "CONSENT=YES+",
+}
+
+
+def collection_page_url(url: str) -> str | None:
+    """The page listing a playlist's or channel's videos, or None for any other URL."""
+    if match := PLAYLIST_RE.search(url):
+        return f"https://www.youtube.com/playlist?list={match.group(1)}"
+    if match := CHANNEL_RE.search(url):
+        return f"https://www.youtube.com/{match.group(1)}/videos"
+    return None
+
+
+def is_collection_url(url: str) -> bool:
+    return collection_page_url(url) is not None
+
+
+def fetch_page(url: str) -> str:
+    request = urllib.request.Request(url, headers=PAGE_HEADERS)
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read().decode("utf-8", errors="replace")
+
+
+def expand_collection(url: str, limit: int = config.COLLECTION_MAX_VIDEOS) -> list[str]:
+    """Video IDs of a playlist or channel, in page order.
+
+    Only the videos on the first page YouTube serves are listed (about 100 for a
+    playlist, the latest 30 or so for a channel); there is no API key to page further.
+    """
+    page_url = collection_page_url(url)
+    if page_url is None:
+        raise ValueError("Not a YouTube playlist or channel URL.")
+    logger.info(f"Expanding {page_url}")
+    try:
+        with metrics.span("collection_expand"):
+            page = fetch_page(page_url)
+    except OSError as e:
+        logger.error(f"Could not fetch {page_url}: {e}")
+        raise
+    video_ids = list(dict.fromkeys(PAGE_VIDEO_ID_RE.findall(page)))[:limit]
+    if not video_ids:
+        raise ValueError("No videos found for this playlist or channel.")
+    logger.info(f"Found {len(video_ids)} videos in {page_url}")
+    return video_ids
+
+
+async def async_expand_url(url: str, limit: int = config.COLLECTION_MAX_VIDEOS) -> list[str]:
+    """Video IDs for a playlist or channel URL, or the single ID of a video URL."""
+    if is_collection_url(url):
+        return await asyncio.to_thread(expand_collection, url, limit)
+    return [extract_video_id(url)]
+
+
+def video_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+@dataclass(frozen=True, slots=True)
+class TranscriptEntry:
+    start: float
+    duration: float
+    text: str
+
+
 def format_time(seconds: float) -> str:
     return str(datetime.timedelta(seconds=int(seconds)))
 
 
-def get_transcript_lines(
+def format_transcript_lines(entries: Iterable[TranscriptEntry]) -> list[str]:
+    return [f"{format_time(entry.start)} - {entry.text.replace('\n', ' ')}" for entry in entries]
+
+
+# "H:MM:" for each minute, as format_time writes it, and "SS - " for each second.
+# The minute table grows to the longest transcript seen.
+_MINUTE_PREFIXES: list[str] = []
+_SECOND_SUFFIXES = [f"{second:02d} - " for second in range(60)]
+
+
+def _minute_prefixes(last_minute: int) -> list[str]:
+    global _MINUTE_PREFIXES
+    table = _MINUTE_PREFIXES
+    if len(table) <= last_minute:
+        # Replaced rather than extended, so a concurrent reader never sees it half built.
+        table = [format_time(minute * 60)[:-2] for minute in range(last_minute + 61)]
+        _MINUTE_PREFIXES = table
+    return table
+
+
+def format_transcript_columns(starts: Sequence[float], texts: Sequence[str]) -> str:
+    """The prompt text for parallel start/text columns, "\n".join of the lines above.
+
+    Time prefixes come from lookup tables instead of a timedelta per entry, and the
+    text is joined once; a 10 hour transcript has over 10,000 entries.
+    """
+    if not starts:
+        return ""
+    seconds = [int(start) for start in starts]
+    minutes = _minute_prefixes(max(seconds) // 60)
+    suffixes = _SECOND_SUFFIXES
+    return "\n".join(
+        [
+            minutes[second // 60] + suffixes[second % 60] + text.replace("\n", " ")
+            for second, text in zip(seconds, texts, strict=True)
+        ]
+    )
+
+
+def format_transcript(entries: Sequence[TranscriptEntry]) -> str:
+    return format_transcript_columns(
+        [entry.start for entry in entries], [entry.text for entry in entries]
+    )
+
+
+def transcript_duration(entries: list[TranscriptEntry]) -> float:
+    if not entries:
+        return 0.0
+    return max(entry.start + entry.duration for entry in entries)
+
+
+class Track(Protocol):
+    language_code: str
+    is_generated: bool
+
+
+def base_language(code: str) -> str:
+    return code.split("-")[0].lower()
+
+
+def select_track[TrackT: Track](
+    tracks: Sequence[TrackT], languages: Sequence[str]
+) -> tuple[TrackT, str] | None:
+    """Picks the caption track to fetch and says why.
+
+    In order: the first requested language that has a track (manual before
+    auto-generated, then the exact code before a regional variant), the video's
+    original language (the language YouTube auto-captioned it in), an
+    auto-generated track, and finally any track at all.
+    """
+    manual = [track for track in tracks if not track.is_generated]
+    generated = [track for track in tracks if track.is_generated]
+    for language in languages:
+        candidates = [
+            track
+            for track in manual + generated
+            if base_language(track.language_code) == base_language(language)
+        ]
+        if candidates:
+            best = min(
+                candidates,
+                key=lambda track: (
+                    track.is_generated,
+                    track.language_code.lower() != language.lower(),
+                ),
+            )
+            return best, "requested"
+    if generated:
+        original = base_language(generated[0].language_code)
+        for track in manual:
+            if base_language(track.language_code) == original:
+                return track, "original"
+        return generated[0], "generated"
+    if manual:
+        return manual[0], "available"
+    return None
+
+
+class TrackListCache:
+    """Caption track listings per video, so each video is listed once per ``ttl``.
+
+    Concurrent lookups for the same video (batch runs asking for several
+    languages) wait for one listing call instead of making their own.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._video_locks: weakref.WeakValueDictionary[str, threading.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+
+    def _get(self, video_id: str) -> Any | None:
+        with self._lock:
+            item = self._entries.get(video_id)
+            if item is None:
+                return None
+            expires_at, tracks = item
+            if expires_at < time.monotonic():
+                del self._entries[video_id]
+                return None
+            self._entries.move_to_end(video_id)
+            return tracks
+
+    def get(self, video_id: str) -> Any:
+        tracks = self._get(video_id)
+        if tracks is not None:
+            metrics.CACHE_REQUESTS.inc(cache="transcript_list", result="hit")
+            return tracks
+        with self._lock:
+            video_lock = self._video_locks.setdefault(video_id, threading.Lock())
+        with video_lock:
+            tracks = self._get(video_id)
+            if tracks is not None:
+                metrics.CACHE_REQUESTS.inc(cache="transcript_list", result="hit")
+                return tracks
+            metrics.CACHE_REQUESTS.inc(cache="transcript_list", result="miss")
+            with metrics.span("transcript_list"):
+                tracks = YouTubeTranscriptApi().list(video_id)
+            if self.max_entries > 0:
+                with self._lock:
+                    self._entries[video_id] = (time.monotonic() + self.ttl, tracks)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return tracks
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+TRACK_LISTS = TrackListCache(config.TRANSCRIPT_LIST_TTL, config.TRANSCRIPT_LIST_MAX_ENTRIES)
+
+
+def fetch_transcript_track(video_id: str, languages: list[str]) -> list[TranscriptEntry]:
+    tracks = list(TRACK_LISTS.get(video_id))
+    selected = select_track(tracks, languages)
+    if selected is None:
+        raise NoTranscriptFound(video_id, languages, tracks)
+    track, reason = selected
+    kind = "auto-generated" if track.is_generated else "manual"
+    logger.info(
+        f"Using {kind} {track.language_code} captions for {video_id} ({reason}, asked {languages})"
+    )
+    with metrics.span("transcript_fetch"):
+        transcript = track.fetch()
+    return [
+        TranscriptEntry(start=entry.start, duration=entry.duration, text=entry.text)
+        for entry in transcript
+    ]
+
+
+def get_transcript_entries(
     video_id: str, languages: list[str] | None = None
-) -> list[str]:
+) -> list[TranscriptEntry]:
     if languages is None:
         languages = ["th"]
+    store_key = ",".join(languages)
+    if config.TRANSCRIPT_STORE_ENABLED:
+        try:
+            stored = TRANSCRIPT_STORE.get(video_id, store_key)
+        except sqlite3.Error:
+            logger.warning(f"Could not read stored transcript for {video_id}", exc_info=True)
+            stored = None
+        if stored is not None:
+            metrics.CACHE_REQUESTS.inc(cache="transcript_store", result="hit")
+            return [TranscriptEntry(*item) for item in stored]
+        metrics.CACHE_REQUESTS.inc(cache="transcript_store", result="miss")
+
     logger.info(f"Fetching transcript for {video_id} ({languages})")
     try:
-        transcript = YouTubeTranscriptApi().fetch(video_id=video_id, languages=languages)
+        entries = fetch_transcript_track(video_id, languages)
         logger.info(f"Transcript received for {video_id}")
-        return [
-            f"{format_time(entry.start)} - {entry.text.replace('\n', ' ')}"
-            for entry in transcript
-        ]
     except Exception as e:
         logger.error(
             f"Transcript fetch failed for {video_id} ({languages}): {e}",
@@ -46,20 +312,31 @@ def get_transcript_lines(
         )
         raise
 
+    if config.TRANSCRIPT_STORE_ENABLED and entries:
+        try:
+            TRANSCRIPT_STORE.put(video_id, store_key, entries)
+        except sqlite3.Error:
+            # The transcript was fetched; failing to store it only costs a refetch later.
+            logger.warning(f"Could not store transcript for {video_id}", exc_info=True)
+    return entries
 
-async def async_get_transcript_lines(
+
+def get_transcript_lines(
+    video_id: str, languages: list[str] | None = None
+) -> list[str]:
+    return format_transcript_lines(get_transcript_entries(video_id, languages))
+
+
+async def async_get_transcript_entries(
     video_id: str,
     languages: list[str] | None = None,
-) -> list[str]:
+) -> list[TranscriptEntry]:
     if languages is None:
         languages = ["th"]
     logger.info(f"Async fetching transcript for {video_id} ({languages})")
 
-    def _fetch():
-        return get_transcript_lines(video_id, languages)
-
     try:
-        result = await asyncio.to_thread(_fetch)
+        result = await asyncio.to_thread(get_transcript_entries, video_id, languages)
         logger.info(f"Async transcript received for {video_id}")
         return result
     except Exception as e:
@@ -68,3 +345,11 @@ async def async_get_transcript_lines(
             exc_info=True,
         )
         raise
+
+
+async def async_get_transcript_lines(
+    video_id: str,
+    languages: list[str] | None = None,
+) -> list[str]:
+    entries = await async_get_transcript_entries(video_id, languages)
+    return format_transcript_lines(entries)
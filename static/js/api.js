@@ -1,4 +1,41 @@
-import { convertToTimestamp, attachTimestampClickHandlers } from './timestamps.js';
+import { appendTimestampLine, attachTimestampClickHandlers, convertToTimestamp } from './timestamps.js';
+
+/**
+ * Reads a text/event-stream response body and calls onEvent(event, data) for
+ * every complete Server-Sent Event.
+ */
+async function readServerSentEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    const dispatch = (frame) => {
+        let event = 'message';
+        const dataLines = [];
+        frame.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).replace(/^ /, ''));
+            }
+        });
+        onEvent(event, dataLines.join('\n'));
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        const frames = buffer.split('\n\n');
+        buffer = frames.pop();
+        frames.filter(frame => frame.trim()).forEach(dispatch);
+    }
+    if (buffer.trim()) {
+        dispatch(buffer);
+    }
+}
 
 export async function sendData() {
     const tabLoading = document.querySelector(".tab-loading");
@@ -9,7 +46,8 @@ export async function sendData() {
     // Show loading state
     tabLoading.classList.remove('hidden');
     tabTimestamp.classList.add('hidden');
-    timestampDisplayContent.innerHTML = '<p>Sending data to Flask...</p>';
+    timestampDisplayContent.innerHTML = '';
+    commentTabContent.value = '';
 
     try {
         const youtubeUrlInput = document.querySelector('[data-youtube-url-input]');
@@ -22,7 +60,7 @@ export async function sendData() {
             language: languageSelect ? languageSelect.value : 'auto'
         };
 
-        const response = await fetch('/api/timestamp/generate', {
+        const response = await fetch('/api/timestamp/stream', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(dataToSend)
@@ -33,13 +71,47 @@ export async function sendData() {
             throw new Error(`HTTP Error! Status: ${response.status} - ${errorText}`);
         }
 
-        const rawTimestamps = await response.text();
+        const rawLines = [];
+        let streamError = null;
+        let finished = false;
+
+        // Render each timestamp as soon as it arrives
+        await readServerSentEvents(response, (event, data) => {
+            switch (event) {
+                case 'timestamp':
+                    rawLines.push(data);
+                    commentTabContent.value = rawLines.join('\n');
+                    appendTimestampLine(data);
+                    if (rawLines.length === 1) {
+                        tabLoading.classList.add('hidden');
+                        tabTimestamp.classList.remove("hidden");
+                    }
+                    break;
+                case 'replace':
+                    // The server repaired the streamed chapters; show what it stored.
+                    rawLines.splice(0, rawLines.length, ...data.split('\n'));
+                    commentTabContent.value = data;
+                    timestampDisplayContent.innerHTML = convertToTimestamp(data);
+                    attachTimestampClickHandlers();
+                    tabLoading.classList.add('hidden');
+                    tabTimestamp.classList.remove("hidden");
+                    break;
+                case 'error':
+                    streamError = data;
+                    break;
+                case 'done':
+                    finished = true;
+                    break;
+            }
+        });
 
-        const htmlContent = convertToTimestamp(rawTimestamps);
-        commentTabContent.value = rawTimestamps;
-        timestampDisplayContent.innerHTML = htmlContent;
+        if (streamError) {
+            throw new Error(streamError);
+        }
+        if (!finished) {
+            throw new Error('The connection was closed before all timestamps were received.');
+        }
 
-        attachTimestampClickHandlers();
         tabLoading.classList.add('hidden');
         tabTimestamp.classList.remove("hidden");
 
@@ -49,4 +121,4 @@ export async function sendData() {
         tabLoading.classList.remove('hidden');
         tabTimestamp.classList.add("hidden");
     }
-}
\ No newline at end of file
+}
@@ -5,80 +5,63 @@
 */
 import { convertToSeconds, convertSecondsToTimestamp } from './utils.js';
 
-export function convertToTimestamp(rawText) {
-    const rawLines = rawText.split('\n');
-    const parsedTimestamps = [];
-    const timestampRegex = /^(\d{1,2}:\d{2}(:\d{2})?)\s*(.*)/; // Regex to capture timestamp and description
-
-    rawLines.forEach(rawLine => {
-        const trimmedLine = rawLine.trim();
-        if (!trimmedLine) {
-            return; // Skip empty lines
-        }
+const timestampRegex = /^(\d{1,2}:\d{2}(:\d{2})?)\s*(.*)/; // Regex to capture timestamp and description
 
-        const match = trimmedLine.match(timestampRegex);
-
-        if (match) {
-            // This line starts with a timestamp
-            const timestamp = match[1];
-            const description = match[3] ? match[3].trim() : ''; // Capture the rest as description
-            parsedTimestamps.push({ timestamp, description });
-        } else if (parsedTimestamps.length > 0) {
-            // This line does not start with a timestamp, append to the previous description
-            parsedTimestamps[parsedTimestamps.length - 1].description += '\n' + trimmedLine;
-        }
-    });
+export function parseTimestampLine(rawLine) {
+    const match = rawLine.trim().match(timestampRegex);
+    if (!match) {
+        return null;
+    }
+    const timestamp = match[1];
+    const description = match[3] ? match[3].trim() : ''; // Capture the rest as description
+    return { timestamp, description };
+}
 
-    let hasHHMMSS = false;
-    parsedTimestamps.forEach(item => {
-        const seconds = convertToSeconds(item.timestamp);
-        if (seconds !== null && seconds >= 3600) { // If hours are present
-            hasHHMMSS = true;
-        } else if (item.timestamp.length === 8) { // If it was explicitly HH:MM:SS
-            hasHHMMSS = true;
-        }
-    });
+const hasHoursFormat = (timestamp) => {
+    const seconds = convertToSeconds(timestamp);
+    // If hours are present, or it was explicitly HH:MM:SS
+    return (seconds !== null && seconds >= 3600) || timestamp.length === 8;
+};
 
-    let htmlContent = '';
-    const totalItems = parsedTimestamps.length;
+const mainColorAt = (index) => index % 2 === 0 ? 'secondary' : 'primary';
+const previousColorAt = (index) => index % 2 === 0 ? 'primary' : 'secondary';
 
-    parsedTimestamps.forEach((item, index) => {
-        const originalTimestamp = item.timestamp;
-        const text_content = item.description;
-        const secondsValue = convertToSeconds(originalTimestamp);
+const processDescription = (text_content, mainColor, hasHHMMSS) => {
+    let processedTextContent = text_content.replace(/\n/g, '<br>');
+    const inlineTimestampRegex = /\b(\d{1,2}:\d{2}(:\d{2})?)\b/g;
 
+    return processedTextContent.replace(inlineTimestampRegex, (match, timestampStr) => {
+        const secondsValue = convertToSeconds(timestampStr);
         if (secondsValue === null) {
-            console.warn(`Skipping invalid timestamp format: ${originalTimestamp}`);
-            return;
+            return match;
         }
 
-        const displayTimestamp = convertSecondsToTimestamp(secondsValue, hasHHMMSS);
+        const formattedTimestamp = convertSecondsToTimestamp(secondsValue, hasHHMMSS);
+
+        return `<button class="btn btn-xs btn-${mainColor} timestamp-link" data-time="${secondsValue}">${formattedTimestamp}</button>`;
+    });
+};
 
-        const previousColor = index % 2 === 0
-            ? 'primary'
-            : 'secondary';
-        const mainColor = index % 2 === 0
-            ? 'secondary'
-            : 'primary';
+function renderTimestampItem(item, index, totalItems, hasHHMMSS) {
+    const originalTimestamp = item.timestamp;
+    const secondsValue = convertToSeconds(originalTimestamp);
 
-        const topHr = index === 0 ? '' : `<hr class="bg-${previousColor}" />`;
-        const bottomHr = index === totalItems - 1 ? '' : `<hr class="bg-${mainColor}" />`;
+    if (secondsValue === null) {
+        console.warn(`Skipping invalid timestamp format: ${originalTimestamp}`);
+        return '';
+    }
 
-        let processedTextContent = text_content.replace(/\n/g, '<br>');
-        const inlineTimestampRegex = /\b(\d{1,2}:\d{2}(:\d{2})?)\b/g;
+    const displayTimestamp = convertSecondsToTimestamp(secondsValue, hasHHMMSS);
 
-        processedTextContent = processedTextContent.replace(inlineTimestampRegex, (match, timestampStr) => {
-            const secondsValue = convertToSeconds(timestampStr);
-            if (secondsValue === null) {
-                return match;
-            }
+    const previousColor = previousColorAt(index);
+    const mainColor = mainColorAt(index);
 
-            const formattedTimestamp = convertSecondsToTimestamp(secondsValue, hasHHMMSS);
+    const topHr = index === 0 ? '' : `<hr class="bg-${previousColor}" />`;
+    const bottomHr = index === totalItems - 1 ? '' : `<hr class="bg-${mainColor}" />`;
 
-            return `<button class="btn btn-xs btn-${mainColor} timestamp-link" data-time="${secondsValue}">${formattedTimestamp}</button>`;
-        });
+    const processedTextContent = processDescription(item.description, mainColor, hasHHMMSS);
 
-        htmlContent += `
+    return `
             <li class="md:animate-appear motion-reduce:animate-none">
                 ${topHr}
                 <div class="timeline-middle">
@@ -90,10 +73,77 @@ export function convertToTimestamp(rawText) {
                 ${bottomHr}
             </li>
         `;
+}
+
+export function convertToTimestamp(rawText) {
+    const rawLines = rawText.split('\n');
+    const parsedTimestamps = [];
+
+    rawLines.forEach(rawLine => {
+        const trimmedLine = rawLine.trim();
+        if (!trimmedLine) {
+            return; // Skip empty lines
+        }
+
+        const item = parseTimestampLine(trimmedLine);
+
+        if (item) {
+            // This line starts with a timestamp
+            parsedTimestamps.push(item);
+        } else if (parsedTimestamps.length > 0) {
+            // This line does not start with a timestamp, append to the previous description
+            parsedTimestamps[parsedTimestamps.length - 1].description += '\n' + trimmedLine;
+        }
+    });
+
+    const hasHHMMSS = parsedTimestamps.some(item => hasHoursFormat(item.timestamp));
+
+    let htmlContent = '';
+    const totalItems = parsedTimestamps.length;
+
+    parsedTimestamps.forEach((item, index) => {
+        htmlContent += renderTimestampItem(item, index, totalItems, hasHHMMSS);
     });
     return htmlContent;
 }
 
+/**
+ * Appends one streamed line to the timeline without re-rendering earlier items.
+ * Returns true when the line started a new timeline item.
+ */
+export function appendTimestampLine(rawLine) {
+    const timestampDisplayContent = document.getElementById('timestamp-display-content');
+    const trimmedLine = rawLine.trim();
+    if (!trimmedLine) {
+        return false;
+    }
+
+    const items = timestampDisplayContent.querySelectorAll('li');
+    const previousItem = items[items.length - 1];
+    const item = parseTimestampLine(trimmedLine);
+
+    if (!item) {
+        // Continuation of the previous description
+        const description = previousItem ? previousItem.querySelector('.timeline-description') : null;
+        if (description) {
+            description.insertAdjacentHTML('beforeend', '<br>' + processDescription(
+                trimmedLine, mainColorAt(items.length - 1), false));
+            attachTimestampClickHandlers(description);
+        }
+        return false;
+    }
+
+    const index = items.length;
+    if (previousItem) {
+        // The previous item is no longer the last one, so it needs its bottom line.
+        previousItem.insertAdjacentHTML('beforeend', `<hr class="bg-${mainColorAt(index - 1)}" />`);
+    }
+    timestampDisplayContent.insertAdjacentHTML(
+        'beforeend', renderTimestampItem(item, index, index + 1, hasHoursFormat(item.timestamp)));
+    attachTimestampClickHandlers(timestampDisplayContent.lastElementChild);
+    return true;
+}
+
 export const convertTimelineToText = () => {
     const lines = [];
     const listItems = document.getElementById('timestamp-display-content').querySelectorAll('li');
@@ -122,8 +172,11 @@ export const convertTimelineToText = () => {
     return lines.join('\n');
 };
 
-export const attachTimestampClickHandlers = () => {
-    document.getElementById('timestamp-display-content').querySelectorAll('.timestamp-link').forEach(btn => {
+export const attachTimestampClickHandlers = (root = document.getElementById('timestamp-display-content')) => {
+    if (!root) {
+        return;
+    }
+    root.querySelectorAll('.timestamp-link').forEach(btn => {
         btn.addEventListener('click', (e) => {
             const time = e.target.dataset.time;
             const youtubeVideoPlayer = document.getElementById('youtube-video-player');
@@ -1,4 +1,14 @@
+import os
 from pathlib import Path
 import sys
 
-sys.path.append(str(Path(__file__).resolve().parent.parent))
\ No newline at end of file
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# Gemini calls need a key; tests never reach the real API.
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+# Tests share transcripts across video IDs; the index would reuse chapters between them.
+os.environ.setdefault("NEAR_DUPLICATE_ENABLED", "false")
+# Tests inject 429s into many unrelated calls; the shared overload controller would
+# spend its retry budget and open its circuit across them. tests/test_overload.py
+# uses its own controllers.
+os.environ.setdefault("GEMINI_OVERLOAD_CONTROL", "false")
@@ -0,0 +1,189 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from utils import artifact_sink, file_io
+from utils.artifact_sink import DirectorySink, SQLiteSink, atomic_write
+
+
+@pytest.fixture(params=["directory", "sqlite"])
+def sink(request, tmp_path):
+    if request.param == "directory":
+        sink = DirectorySink(tmp_path / "artifacts")
+    else:
+        sink = SQLiteSink(tmp_path / "db" / "artifacts.sqlite3")
+    yield sink
+    sink.close()
+
+
+# ============================================================================
+# Group 1: Atomic writes
+# ============================================================================
+
+
+def test_atomic_write_creates_parents_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "video" / "prompt.txt"
+
+    atomic_write(path, "first")
+    atomic_write(path, "second")
+
+    assert path.read_text() == "second"
+    assert [p.name for p in path.parent.iterdir()] == ["prompt.txt"]
+
+
+def test_atomic_write_keeps_old_file_on_failure(tmp_path):
+    path = tmp_path / "prompt.txt"
+    atomic_write(path, "old")
+
+    with (
+        patch("pathlib.Path.replace", side_effect=OSError("disk full")),
+        pytest.raises(OSError, match="disk full"),
+    ):
+        atomic_write(path, "new")
+
+    assert path.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["prompt.txt"]
+
+
+# ============================================================================
+# Group 2: Sinks
+# ============================================================================
+
+
+def test_put_is_readable_before_and_after_flush(sink):
+    sink.put("abc/prompt.txt", "hello")
+
+    assert sink.read("abc/prompt.txt") == "hello"
+    assert sink.flush(timeout=5)
+    assert sink.read("abc/prompt.txt") == "hello"
+    assert sink.read("missing/prompt.txt") is None
+
+
+def test_latest_write_wins(sink):
+    for n in range(20):
+        sink.put("abc/response.txt", f"v{n}")
+
+    assert sink.flush(timeout=5)
+
+    assert sink.read("abc/response.txt") == "v19"
+
+
+def test_directory_sink_writes_files(tmp_path):
+    sink = DirectorySink(tmp_path)
+    sink.put("abc/timestamps.txt", "00:00 Intro")
+    assert sink.flush(timeout=5)
+    sink.close()
+
+    assert (tmp_path / "abc" / "timestamps.txt").read_text() == "00:00 Intro"
+
+
+def test_sqlite_sink_keeps_one_file(tmp_path):
+    sink = SQLiteSink(tmp_path / "db" / "artifacts.sqlite3")
+    for n in range(50):
+        sink.put(f"video{n}/prompt.txt", "x" * 1000)
+    assert sink.flush(timeout=5)
+    sink.close()
+
+    assert sink.read("video7/prompt.txt") == "x" * 1000
+    assert {p.name for p in (tmp_path / "db").iterdir()} <= {
+        "artifacts.sqlite3",
+        "artifacts.sqlite3-wal",
+        "artifacts.sqlite3-shm",
+    }
+
+
+def test_put_refuses_when_queue_is_full(tmp_path):
+    sink = DirectorySink(tmp_path, max_pending=2)
+    release = threading.Event()
+    original_write = sink._write
+
+    def slow_write(batch):
+        release.wait(5)
+        original_write(batch)
+
+    with patch.object(sink, "_write", side_effect=slow_write):
+        assert sink.put("a/prompt.txt", "a")
+        assert sink.put("b/prompt.txt", "b")
+        assert not sink.put("c/prompt.txt", "c")
+        # Re-queueing a pending name only replaces its value.
+        assert sink.put("b/prompt.txt", "b2")
+        assert not (tmp_path / "c").exists()
+        release.set()
+        assert sink.flush(timeout=5)
+    sink.close()
+
+    assert sink.read("b/prompt.txt") == "b2"
+    assert sink.read("c/prompt.txt") is None
+
+
+@pytest.mark.asyncio
+async def test_async_save_writes_overflow_off_the_event_loop(tmp_path):
+    sink = DirectorySink(tmp_path, max_pending=0)
+    loop_thread = threading.current_thread()
+    writer_threads = []
+    original_write = sink._write
+
+    def record_write(batch):
+        writer_threads.append(threading.current_thread())
+        original_write(batch)
+
+    inline_before = artifact_sink.ARTIFACT_WRITES.value(result="inline")
+    with (
+        patch.object(file_io, "ARTIFACT_SINK", sink),
+        patch.object(sink, "_write", side_effect=record_write),
+        patch("config.SAVE_PROMPT", True),
+    ):
+        await file_io.async_save_prompt_to_file("the prompt", "vid")
+
+    assert (tmp_path / "vid" / "prompt.txt").read_text(encoding="utf-8") == "the prompt"
+    assert writer_threads
+    assert loop_thread not in writer_threads
+    assert artifact_sink.ARTIFACT_WRITES.value(result="inline") == inline_before + 1
+
+
+def test_sqlite_sink_prunes_rows_past_retention(tmp_path):
+    sink = SQLiteSink(tmp_path / "artifacts.sqlite3", retention=60)
+    with patch.object(artifact_sink.time, "time", return_value=1000.0):
+        sink._write({"old/prompt.txt": "old"})
+    with patch.object(
+        artifact_sink.time, "time", return_value=1000.0 + artifact_sink.PRUNE_INTERVAL_SECONDS
+    ):
+        sink._write({"new/prompt.txt": "new"})
+
+    assert sink._read("old/prompt.txt") is None
+    assert sink._read("new/prompt.txt") == "new"
+
+
+def test_write_failure_is_logged_not_raised(tmp_path, caplog):
+    sink = DirectorySink(tmp_path)
+
+    with patch.object(sink, "_write", side_effect=OSError("read-only")):
+        sink.put("a/prompt.txt", "a")
+        assert sink.flush(timeout=5)
+    sink.close()
+
+    assert "Could not store 1 artifacts" in caplog.text
+
+
+# ============================================================================
+# Group 3: file_io integration
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_save_helpers_go_through_sink(tmp_path):
+    sink = DirectorySink(tmp_path)
+    with (
+        patch.object(file_io, "ARTIFACT_SINK", sink),
+        patch("config.SAVE_PROMPT", True),
+        patch("config.LOAD_PROMPT", True),
+    ):
+        await file_io.async_save_prompt_to_file("the prompt", "vid")
+
+        assert await file_io.async_load_prompt_from_file("vid") == "the prompt"
+        assert file_io.load_prompt_from_file("other") is None
+    assert sink.flush(timeout=5)
+    sink.close()
+
+    assert (tmp_path / "vid" / "prompt.txt").read_text() == "the prompt"
@@ -0,0 +1,106 @@
+import pytest
+from tenacity import RetryError
+
+from benchmarks import formatting, loadtest
+from benchmarks.fakes import FakeGeminiClient, install_fakes, make_snippets
+from services import gemini, youtube
+
+# ============================================================================
+# Group 1: Fakes
+# ============================================================================
+
+
+def test_fake_transcript_covers_requested_duration():
+    snippets = make_snippets(300, seconds_per_entry=3)
+
+    assert len(snippets) == 100
+    assert snippets[-1].start == 297
+
+
+@pytest.mark.asyncio
+async def test_fake_gemini_answers_from_prompt_timestamps():
+    client = FakeGeminiClient(latency=0, chapter_every=60)
+    prompt = "\n".join(f"0:{minute:02d}:00 - words" for minute in range(5))
+
+    response = await client.models.generate_content(model="m", contents=prompt, config={})
+
+    assert response.text.split("\n") == [
+        f"00:{minute:02d}:00 - Chapter {minute + 1}" for minute in range(5)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_injected_errors_are_retried():
+    with install_fakes(600, transcript_latency=0, gemini_latency=0, retry_wait_scale=0) as fakes:
+        fakes.gemini.models.error_rate = 1.0
+        with pytest.raises(RetryError):
+            await gemini.evaluate_timestamps("0:00:00 - hi", video_id="bench000000")
+
+    assert fakes.gemini.stats.calls == 5
+
+
+def test_install_fakes_restores_real_clients():
+    real_api, real_client = youtube.YouTubeTranscriptApi, gemini.get_client
+    with install_fakes(60):
+        assert youtube.YouTubeTranscriptApi is not real_api
+    assert youtube.YouTubeTranscriptApi is real_api
+    assert gemini.get_client is real_client
+
+
+# ============================================================================
+# Group 2: Load test
+# ============================================================================
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+
+    assert loadtest.percentile(values, 50) == 50
+    assert loadtest.percentile(values, 99) == 99
+    assert loadtest.percentile([], 95) == 0
+
+
+@pytest.mark.parametrize(("text", "seconds"), [("90", 90), ("5m", 300), ("10h", 36000)])
+def test_parse_duration(text, seconds):
+    assert loadtest.parse_duration(text) == seconds
+
+
+@pytest.mark.parametrize("target", ["app", "cli"])
+def test_scenario_reports_every_request(target):
+    report = loadtest.run_scenario(
+        target, 600, requests=6, concurrency=3, transcript_latency=0, gemini_latency=0.01
+    )
+
+    assert report.ok == 6
+    assert report.failed == 0
+    assert report.gemini_calls == 6
+    assert report.latency_p50 <= report.latency_p99 <= report.latency_max
+    assert report.throughput_rps > 0
+    assert "req/s" in report.format()
+
+
+# ============================================================================
+# Group 3: Transcript formatting
+# ============================================================================
+
+
+@pytest.mark.parametrize("start", [0, 59.9, 61, 3599.5, 36000, 90000])
+def test_bulk_formatting_matches_per_entry_lines(start):
+    entries = [
+        youtube.TranscriptEntry(0.0, 2.0, "first"),
+        youtube.TranscriptEntry(float(start), 2.0, "two\nlines"),
+    ]
+
+    expected = "\n".join(youtube.format_transcript_lines(entries))
+    assert youtube.format_transcript(entries) == expected
+    assert youtube.format_transcript([]) == ""
+
+
+def test_formatting_benchmark_reports_both_paths():
+    lines = []
+    [report] = formatting.main(["--durations", "10m", "--repeat", "2"], out=lines.append)
+
+    assert report.entries == 200
+    assert report.per_entry_ms > 0
+    assert report.bulk_ms > 0
+    assert "per-entry" in lines[0]
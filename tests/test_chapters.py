@@ -0,0 +1,164 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services import chapters, video_processor
+from services.chapters import Chapter, ChapterList
+from services.youtube import TranscriptEntry
+
+# ============================================================================
+# Group 1: Parsing
+# ============================================================================
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        ("05:30 - Intro", (330, "Intro")),
+        ("[01:02:03] Conclusion", (3723, "Conclusion")),
+        ("1:02:03 \u2013 Dash", (3723, "Dash")),
+        ("05:75 - Not a time", None),
+        ("Intro", None),
+    ],
+)
+def test_parse_chapter_line(line, expected):
+    assert chapters.parse_chapter_line(line) == expected
+
+
+def test_parse_output_keeps_order_and_drops_other_lines():
+    output = "Sure, here are the chapters:\n\n00:00 - Intro\n12:00 - Demo\n05:00 - Setup\n07:00\n"
+
+    parsed = chapters.parse_output(output)
+
+    assert list(parsed) == [Chapter(0, "Intro"), Chapter(720, "Demo"), Chapter(300, "Setup")]
+
+
+# ============================================================================
+# Group 2: Repair
+# ============================================================================
+
+
+def test_repair_sorts_clamps_and_deduplicates():
+    parsed = ChapterList(
+        [
+            (600, "Outro"),
+            (0, "Intro"),
+            (0, "Intro again"),
+            (120, "Main"),
+            (125, "main"),
+            (999, "Late"),
+        ]
+    )
+
+    repaired = chapters.repair(parsed, duration=700)
+
+    assert list(repaired) == [
+        Chapter(0, "Intro"),
+        Chapter(120, "Main"),
+        Chapter(600, "Outro"),
+        Chapter(700, "Late"),
+    ]
+
+
+def test_repair_min_gap_merges_nearby_boundaries():
+    parsed = ChapterList([(0, "Intro"), (5, "Hello"), (60, "Main")])
+
+    assert chapters.repair(parsed, 100, min_gap=10).labels == ("Intro", "Main")
+    assert chapters.repair(parsed, 100).labels == ("Intro", "Hello", "Main")
+
+
+# ============================================================================
+# Group 3: Serialization
+# ============================================================================
+
+
+def test_lines_use_hours_for_long_videos():
+    result = ChapterList([(0, "Intro"), (3723, "End")])
+
+    assert result.lines() == ["00:00:00 - Intro", "01:02:03 - End"]
+    assert ChapterList([(0, "Intro")], duration=600).to_text() == "00:00 - Intro"
+
+
+def test_json_round_trip_and_equality():
+    result = ChapterList([(0, "บทนำ"), (90, "Demo")], duration=300.5)
+
+    restored = ChapterList.from_json(result.to_json())
+
+    assert restored == result
+    assert hash(restored) == hash(result)
+    assert restored.duration == 300.5
+    assert "บทนำ" in result.to_json()
+
+
+def test_youtube_description_follows_chapter_rules():
+    result = ChapterList(
+        [(4, "Intro"), (8, "Too short"), (60, "Main"), (3700, "Q&A"), (3995, "Bye")],
+        duration=4000,
+    )
+
+    assert result.to_youtube_description() == "0:00 Intro\n1:00 Main\n1:01:40 Q&A"
+    assert ChapterList([(0, "Intro"), (60, "Main")]).to_youtube_description() == ""
+
+
+# ============================================================================
+# Group 4: Streaming
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_only_chapters_then_the_repaired_list():
+    async def stream(*_args, **_kwargs):
+        for line in (
+            "Here are the chapters:",
+            "00:00 - Intro",
+            "00:05 - Later",
+            "00:03 - Earlier",
+            "09:00 - Past the end",
+            "00:05 - Duplicate",
+        ):
+            yield line
+
+    with (
+        patch.object(video_processor.config, "RESULT_CACHE_ENABLED", False),
+        patch(
+            "services.youtube.async_get_transcript_entries",
+            AsyncMock(return_value=[TranscriptEntry(start=0.0, duration=10.0, text="hello")]),
+        ),
+        patch("services.gemini.stream_timestamps", stream),
+    ):
+        events = [
+            event
+            async for event in video_processor.stream_video_timestamp(
+                "https://youtu.be/Q9gxKxGLmkc", "", "th"
+            )
+        ]
+
+    assert events == [
+        ("timestamp", "00:00 - Intro"),
+        ("timestamp", "00:05 - Later"),
+        ("replace", "00:00 - Intro\n00:03 - Earlier\n00:05 - Later\n00:10 - Past the end"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_without_repairs_sends_no_replace_event():
+    async def stream(*_args, **_kwargs):
+        for line in ("00:00 - Intro", "00:05 - Main"):
+            yield line
+
+    with (
+        patch.object(video_processor.config, "RESULT_CACHE_ENABLED", False),
+        patch(
+            "services.youtube.async_get_transcript_entries",
+            AsyncMock(return_value=[TranscriptEntry(start=0.0, duration=10.0, text="hello")]),
+        ),
+        patch("services.gemini.stream_timestamps", stream),
+    ):
+        events = [
+            event
+            async for event in video_processor.stream_video_timestamp(
+                "https://youtu.be/Q9gxKxGLmkc", "", "th"
+            )
+        ]
+
+    assert [event for event, _ in events] == ["timestamp", "timestamp"]
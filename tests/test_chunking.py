@@ -0,0 +1,109 @@
+import itertools
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services import chunking
+from services.youtube import TranscriptEntry
+
+
+def _entries(duration, every=10):
+    return [
+        TranscriptEntry(start=float(start), duration=float(every), text=f"line {start}")
+        for start in range(0, duration, every)
+    ]
+
+
+# ============================================================================
+# Group 1: Splitting
+# ============================================================================
+
+
+def test_short_transcript_is_not_chunked():
+    with patch.object(chunking.config, "CHUNK_THRESHOLD_SECONDS", 3600):
+        assert not chunking.should_chunk(_entries(1800))
+        assert chunking.should_chunk(_entries(4 * 3600))
+
+
+def test_chunks_overlap_and_cover_every_entry():
+    entries = _entries(3 * 3600)
+    chunks = chunking.split_into_chunks(entries, window=3600, overlap=120)
+
+    assert [chunk.start for chunk in chunks] == [0, 3480, 6960]
+    assert chunks[0].end == 3600
+    assert chunks[-1].end == 3 * 3600
+
+    # Neighbouring windows share the overlap, and their core ranges meet exactly.
+    for previous, current in itertools.pairwise(chunks):
+        assert current.start < previous.end
+        assert previous.core_end == current.core_start
+
+    covered = {entry for chunk in chunks for entry in chunk.entries}
+    assert covered == set(entries)
+
+
+# ============================================================================
+# Group 2: Merging
+# ============================================================================
+
+
+def test_merge_resolves_boundary_duplicates_and_normalizes_format():
+    chunks = chunking.split_into_chunks(_entries(7200), window=3600, overlap=120)
+    outputs = [
+        ["00:00 - Intro", "30:00 - Setup", "58:30 - Q&A begins"],
+        ["00:58:35 - Q&A begins", "01:10:00 - Question 2", "1:59:00 - Outro"],
+    ]
+
+    merged = chunking.merge_chapters(outputs, chunks, duration=7200).lines()
+
+    assert merged == [
+        "00:00:00 - Intro",
+        "00:30:00 - Setup",
+        "00:58:30 - Q&A begins",
+        "01:10:00 - Question 2",
+        "01:59:00 - Outro",
+    ]
+
+
+def test_merge_drops_chapters_outside_core_range_and_garbage():
+    chunks = chunking.split_into_chunks(_entries(7200), window=3600, overlap=600)
+    outputs = [
+        ["00:00:00 - Intro", "00:58:00 - Overlap seen by part 1", "Sure, here you go:"],
+        ["00:57:00 - Overlap seen by part 2", "01:30:00 - Later"],
+    ]
+
+    merged = chunking.merge_chapters(outputs, chunks, duration=7200).lines()
+
+    assert merged == [
+        "00:00:00 - Intro",
+        "00:57:00 - Overlap seen by part 2",
+        "01:30:00 - Later",
+    ]
+
+
+# ============================================================================
+# Group 3: Evaluation
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_evaluate_chunked_calls_gemini_per_chunk():
+    entries = _entries(3 * 3600)
+
+    async def fake_evaluate(captions, instruction, video_id, language):
+        lines = captions.split("\n")
+        middle = lines[len(lines) // 2].split(" - ", 1)[0]
+        return [f"{middle} - Part {video_id[-2:]}"]
+
+    with (
+        patch.object(chunking.config, "CHUNK_WINDOW_SECONDS", 3600),
+        patch.object(chunking.config, "CHUNK_OVERLAP_SECONDS", 120),
+        patch.object(
+            chunking.gemini, "evaluate_timestamps", AsyncMock(side_effect=fake_evaluate)
+        ) as evaluate,
+    ):
+        merged = await chunking.evaluate_chunked(entries, "", "abc", language="en")
+
+    assert evaluate.await_count == 3
+    assert "part 1 of 3" in evaluate.await_args_list[0].args[1]
+    assert merged.labels == ("Part 01", "Part 02", "Part 03")
@@ -1,3 +1,4 @@
+import json
 from pathlib import Path
 import sys
 from unittest.mock import patch
@@ -134,4 +135,84 @@ async def test_cli_with_language(mock_processor, lang_val):
     # Assert that the language value (lang_val) was passed correctly.
     mock_processor.assert_called_once_with(
         url=SAMPLE_URL, language=lang_val, additional_instruction=None
-    )
\ No newline at end of file
+    )
+
+
+# ============================================================================
+# Group 5: Batch mode (-b / --batch)
+# ============================================================================
+
+OTHER_URL = "https://youtu.be/aaaaaaaaaaa"
+
+
+@pytest.mark.asyncio
+async def test_cli_batch_processes_file_and_skips_duplicates(mock_processor, tmp_path):
+    """
+    Test Case:
+    cli.py --batch urls.txt --output-dir out
+    """
+    mock_processor.return_value = "00:00 - Intro"
+    urls = tmp_path / "urls.txt"
+    urls.write_text(f"{SAMPLE_URL}\n\n# comment\n{OTHER_URL}\nQ9gxKxGLmkc\n")
+    output_dir = tmp_path / "out"
+    test_args = ["cli.py", "--batch", str(urls), "--output-dir", str(output_dir), "-l", "en"]
+
+    with patch.object(sys, "argv", test_args), pytest.raises(SystemExit) as exit_info:
+        await main()
+
+    assert exit_info.value.code == 0
+    assert mock_processor.call_count == 2
+    mock_processor.assert_any_call(url=OTHER_URL, language="en", additional_instruction=None)
+    assert (output_dir / "Q9gxKxGLmkc" / "timestamps.txt").read_text() == "00:00 - Intro"
+    assert (output_dir / "aaaaaaaaaaa" / "timestamps.txt").exists()
+
+
+@pytest.mark.asyncio
+async def test_cli_batch_resumes_and_writes_jsonl(mock_processor, tmp_path):
+    """
+    Test Case:
+    cli.py --batch urls.txt --jsonl results.jsonl (already processed IDs are skipped)
+    """
+    mock_processor.return_value = "00:00 - Intro"
+    urls = tmp_path / "urls.txt"
+    urls.write_text(f"{SAMPLE_URL}\n{OTHER_URL}\n")
+    output_dir = tmp_path / "out"
+    (output_dir / "Q9gxKxGLmkc").mkdir(parents=True)
+    (output_dir / "Q9gxKxGLmkc" / "timestamps.txt").write_text("done before")
+    jsonl = tmp_path / "results.jsonl"
+    test_args = [
+        "cli.py",
+        "-b",
+        str(urls),
+        "--output-dir",
+        str(output_dir),
+        "--jsonl",
+        str(jsonl),
+    ]
+
+    with patch.object(sys, "argv", test_args), pytest.raises(SystemExit):
+        await main()
+
+    mock_processor.assert_called_once_with(
+        url=OTHER_URL, language="auto", additional_instruction=None
+    )
+    records = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    assert [(r["video_id"], r["status"]) for r in records] == [("aaaaaaaaaaa", "done")]
+
+
+@pytest.mark.asyncio
+async def test_cli_batch_reports_failures(mock_processor, tmp_path):
+    """
+    Test Case:
+    A failing video does not stop the batch, but the exit code is non-zero.
+    """
+    mock_processor.side_effect = [RuntimeError("boom"), "00:00 - Intro"]
+    urls = tmp_path / "urls.txt"
+    urls.write_text(f"{SAMPLE_URL}\n{OTHER_URL}\nnot a url\n")
+    test_args = ["cli.py", "-b", str(urls), "--output-dir", str(tmp_path), "-c", "1"]
+
+    with patch.object(sys, "argv", test_args), pytest.raises(SystemExit) as exit_info:
+        await main()
+
+    assert exit_info.value.code == 1
+    assert mock_processor.call_count == 2
@@ -0,0 +1,200 @@
+import asyncio
+from datetime import UTC, datetime
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.genai.errors import APIError
+import pytest
+
+from services import gemini, prompts
+from services.context_cache import ContextCacheRegistry
+from services.gemini_pool import Endpoint
+from services.overload import OverloadController
+from services.rate_limit import InProcessRateLimiter, Quota
+
+# About 2000 estimated tokens.
+CAPTIONS = "0:00:05 - a long enough caption line\n" * 220
+
+
+def cached(name: str, ttl: float = 3600) -> SimpleNamespace:
+    return SimpleNamespace(name=name, expire_time=datetime.fromtimestamp(time.time() + ttl, UTC))
+
+
+@pytest.fixture
+def client():
+    client = MagicMock()
+    client.models.generate_content = AsyncMock(return_value=SimpleNamespace(text="00:00 - Intro"))
+    client.caches.create = AsyncMock(return_value=cached("cachedContents/1"))
+    client.caches.update = AsyncMock(return_value=cached("cachedContents/1"))
+    client.caches.delete = AsyncMock()
+    return client
+
+
+@pytest.fixture
+def registry(client):
+    registry = ContextCacheRegistry(lambda _key: client, ttl=3600, min_tokens=1000, max_entries=2)
+    with (
+        patch.object(gemini, "CONTEXT_CACHE", registry),
+        patch.object(gemini, "get_client", return_value=client),
+        patch.object(gemini, "RATE_LIMITER", InProcessRateLimiter(Quota(rpm=1000))),
+        patch("config.CONTEXT_CACHE_ENABLED", True),
+        patch("config.LOAD_PROMPT", False),
+    ):
+        yield registry
+
+
+def endpoint() -> Endpoint:
+    return Endpoint("key", "gemini-2.5-flash")
+
+
+# ============================================================================
+# Group 1: Generation with cached content
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_follow_ups_only_send_the_instructions(client, registry):
+    await gemini.evaluate_timestamps(CAPTIONS, "", "abc", "English")
+    await gemini.evaluate_timestamps(CAPTIONS, "Focus on Q&A.", "abc", "Thai")
+
+    client.caches.create.assert_awaited_once()
+    create = client.caches.create.await_args.kwargs
+    assert create["config"]["contents"] == [CAPTIONS]
+    assert create["config"]["system_instruction"] == prompts.ACTIVE.system_instruction
+
+    call = client.models.generate_content.await_args.kwargs
+    assert call["config"]["cached_content"] == "cachedContents/1"
+    assert "system_instruction" not in call["config"]
+    assert call["contents"] == prompts.ACTIVE.cached_parts("Focus on Q&A.", "Thai")
+
+
+@pytest.mark.asyncio
+async def test_short_transcripts_are_sent_inline(client, registry):
+    await gemini.evaluate_timestamps("0:00:00 - hi", "", "abc")
+
+    client.caches.create.assert_not_awaited()
+    call = client.models.generate_content.await_args.kwargs
+    assert call["config"] is gemini.request_config
+    assert call["contents"][-1] == "0:00:00 - hi"
+
+
+@pytest.mark.asyncio
+async def test_unsupported_model_falls_back_and_stops_trying(client, registry):
+    client.caches.create.side_effect = APIError(400, {"error": {"message": "not supported"}})
+
+    assert await gemini.evaluate_timestamps(CAPTIONS, "", "abc") == ["00:00 - Intro"]
+    await gemini.evaluate_timestamps(CAPTIONS, "", "abc")
+
+    client.caches.create.assert_awaited_once()
+    assert client.models.generate_content.await_args.kwargs["contents"][-1] == CAPTIONS
+
+
+@pytest.mark.asyncio
+async def test_slow_cache_creation_falls_back_without_counting_as_overload(client, registry):
+    async def slow_create(**_kwargs):
+        await asyncio.sleep(3600)
+
+    client.caches.create.side_effect = slow_create
+    registry.timeout = 0.05
+    controller = OverloadController(
+        min_limit=1, max_limit=8, window_seconds=30, min_calls=1, open_seconds=30
+    )
+
+    with patch.object(gemini, "OVERLOAD", controller), patch("config.GEMINI_TIMEOUT", 1):
+        assert await gemini.evaluate_timestamps(CAPTIONS, "", "abc") == ["00:00 - Intro"]
+
+    assert client.models.generate_content.await_args.kwargs["contents"][-1] == CAPTIONS
+    snapshot = controller.snapshot()
+    assert snapshot["overloaded"] == 0
+    assert snapshot["limit"] == 8
+
+
+@pytest.mark.asyncio
+async def test_cache_deleted_on_the_server_falls_back_to_full_prompt(client, registry):
+    await gemini.evaluate_timestamps(CAPTIONS, "", "abc")
+    client.models.generate_content.side_effect = [
+        APIError(403, {"error": {"message": "CachedContent not found"}}),
+        SimpleNamespace(text="00:00 - Intro"),
+    ]
+
+    assert await gemini.evaluate_timestamps(CAPTIONS, "", "abc") == ["00:00 - Intro"]
+    assert client.models.generate_content.await_args.kwargs["contents"][-1] == CAPTIONS
+    assert len(registry) == 0
+
+
+def _stream(*texts):
+    async def generator():
+        for text in texts:
+            yield SimpleNamespace(text=text)
+
+    return generator()
+
+
+async def _collect(*args):
+    return [line async for line in gemini.stream_timestamps(*args)]
+
+
+@pytest.mark.asyncio
+async def test_streams_use_cached_content(client, registry):
+    client.models.generate_content_stream = AsyncMock(
+        side_effect=lambda **_kwargs: _stream("00:00 - Intro\n")
+    )
+
+    assert await _collect(CAPTIONS, "Focus on Q&A.", "abc", "Thai") == ["00:00 - Intro"]
+
+    client.caches.create.assert_awaited_once()
+    call = client.models.generate_content_stream.await_args.kwargs
+    assert call["config"]["cached_content"] == "cachedContents/1"
+    assert call["contents"] == prompts.ACTIVE.cached_parts("Focus on Q&A.", "Thai")
+
+
+@pytest.mark.asyncio
+async def test_stream_falls_back_when_cache_is_gone(client, registry):
+    async def gone():
+        raise APIError(404, {"error": {"message": "CachedContent not found"}})
+        yield  # pragma: no cover
+
+    client.models.generate_content_stream = AsyncMock(
+        side_effect=[gone(), _stream("00:00 - Intro\n")]
+    )
+
+    assert await _collect(CAPTIONS, "", "abc") == ["00:00 - Intro"]
+    call = client.models.generate_content_stream.await_args.kwargs
+    assert call["config"] is gemini.request_config
+    assert call["contents"][-1] == CAPTIONS
+    assert len(registry) == 0
+
+
+# ============================================================================
+# Group 2: Refresh and eviction
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_entries_in_use_are_extended_and_expired_ones_recreated(client, registry):
+    client.caches.create.return_value = cached("cachedContents/1", ttl=1000)
+    assert await registry.lookup(endpoint(), "abc", CAPTIONS, prompts.ACTIVE) == "cachedContents/1"
+
+    # Under half the TTL left: extended in place.
+    client.caches.update.return_value = cached("cachedContents/1", ttl=10)
+    assert await registry.lookup(endpoint(), "abc", CAPTIONS, prompts.ACTIVE) == "cachedContents/1"
+    client.caches.update.assert_awaited_once()
+    assert client.caches.update.await_args.kwargs["config"] == {"ttl": "3600s"}
+
+    # About to expire: dropped and created again.
+    client.caches.create.return_value = cached("cachedContents/2")
+    assert await registry.lookup(endpoint(), "abc", CAPTIONS, prompts.ACTIVE) == "cachedContents/2"
+    assert client.caches.create.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_caches_are_deleted(client, registry):
+    client.caches.create.side_effect = [cached(f"cachedContents/{n}") for n in range(3)]
+    for video_id in ("first", "second"):
+        await registry.lookup(endpoint(), video_id, CAPTIONS, prompts.ACTIVE)
+    await registry.lookup(endpoint(), "first", CAPTIONS, prompts.ACTIVE)
+    await registry.lookup(endpoint(), "third", CAPTIONS, prompts.ACTIVE)
+
+    client.caches.delete.assert_awaited_once_with(name="cachedContents/1")
+    assert len(registry) == 2
@@ -0,0 +1,203 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.genai.errors import APIError
+import pytest
+from tenacity import stop_after_attempt, wait_none
+
+from services import gemini
+from services.rate_limit import InProcessRateLimiter, Quota
+
+
+def _response(text):
+    return SimpleNamespace(text=text)
+
+
+@pytest.fixture
+def mock_client():
+    """
+    Replaces the per-loop async Gemini client with a mock whose
+    `models.generate_content` is an AsyncMock, and gives each test a fresh limiter.
+    """
+    client = MagicMock()
+    client.models.generate_content = AsyncMock()
+    with (
+        patch.object(gemini, "get_client", return_value=client),
+        patch.object(gemini, "RATE_LIMITER", InProcessRateLimiter(Quota(rpm=1000))),
+    ):
+        yield client
+
+
+# Retry immediately so tests do not sleep through the exponential backoff.
+evaluate_timestamps = gemini.evaluate_timestamps.retry_with(
+    wait=wait_none(), stop=stop_after_attempt(3)
+)
+
+
+# ============================================================================
+# Group 1: Async generation
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_evaluate_timestamps_awaits_async_client(mock_client):
+    mock_client.models.generate_content.return_value = _response(
+        "00:00 - Intro\n\n 02:15 - Setup \n"
+    )
+
+    output = await evaluate_timestamps("0:00:00 - hello", video_id="abc")
+
+    assert output == ["00:00 - Intro", "02:15 - Setup"]
+    kwargs = mock_client.models.generate_content.await_args.kwargs
+    assert kwargs["model"] == gemini.MODEL
+    assert "0:00:00 - hello" in kwargs["contents"]
+
+
+@pytest.mark.asyncio
+async def test_event_loop_keeps_running_during_call(mock_client):
+    ticks = 0
+
+    async def slow_generate(**_kwargs):
+        await asyncio.sleep(0.05)
+        return _response("00:00 - Intro")
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    mock_client.models.generate_content.side_effect = slow_generate
+    ticker_task = asyncio.create_task(ticker())
+    await evaluate_timestamps("captions")
+    ticker_task.cancel()
+
+    assert ticks > 1
+
+
+# ============================================================================
+# Group 2: Retry, timeout and cancellation
+# ============================================================================
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("code", [429, 503])
+async def test_overloaded_errors_are_retried(mock_client, code):
+    mock_client.models.generate_content.side_effect = [
+        APIError(code, {}),
+        _response("00:00 - Intro"),
+    ]
+
+    assert await evaluate_timestamps("captions") == ["00:00 - Intro"]
+    assert mock_client.models.generate_content.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_retried(mock_client):
+    mock_client.models.generate_content.side_effect = APIError(400, {})
+
+    with pytest.raises(APIError):
+        await evaluate_timestamps("captions")
+    assert mock_client.models.generate_content.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_call_times_out(mock_client):
+    async def hang(**_kwargs):
+        await asyncio.sleep(10)
+
+    mock_client.models.generate_content.side_effect = hang
+
+    with patch.object(gemini.config, "GEMINI_TIMEOUT", 0.01), pytest.raises(TimeoutError):
+        await evaluate_timestamps("captions")
+
+
+@pytest.mark.asyncio
+async def test_cancellation_reaches_the_api_call(mock_client):
+    started = asyncio.Event()
+    cancelled = False
+
+    async def hang(**_kwargs):
+        nonlocal cancelled
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    mock_client.models.generate_content.side_effect = hang
+    task = asyncio.create_task(evaluate_timestamps("captions"))
+    await started.wait()
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert cancelled
+
+
+# ============================================================================
+# Group 3: Streaming
+# ============================================================================
+
+
+def _stream(*texts):
+    async def generator():
+        for text in texts:
+            yield _response(text)
+
+    return generator()
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_complete_lines_only(mock_client):
+    mock_client.models.generate_content_stream = AsyncMock(
+        return_value=_stream("00:00 - In", "tro\n02:15 - Se", "tup\n\n05:30 - End")
+    )
+
+    lines = [line async for line in gemini.stream_timestamps("captions", video_id="abc")]
+
+    assert lines == ["00:00 - Intro", "02:15 - Setup", "05:30 - End"]
+
+
+@pytest.mark.asyncio
+async def test_stream_retries_overload_before_first_chunk(mock_client):
+    async def overloaded():
+        raise APIError(429, {})
+        yield  # pragma: no cover
+
+    mock_client.models.generate_content_stream = AsyncMock(
+        side_effect=[overloaded(), _stream("00:00 - Intro\n")]
+    )
+
+    with patch.object(gemini._open_stream.retry, "wait", wait_none()):
+        lines = [line async for line in gemini.stream_timestamps("captions")]
+
+    assert lines == ["00:00 - Intro"]
+    assert mock_client.models.generate_content_stream.await_count == 2
+
+
+class _HangingStream:
+    def __init__(self):
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(10)
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_stream_is_closed_when_first_chunk_times_out(mock_client):
+    stream = _HangingStream()
+    mock_client.models.generate_content_stream = AsyncMock(return_value=stream)
+
+    with patch.object(gemini.config, "GEMINI_TIMEOUT", 0.01), pytest.raises(TimeoutError):
+        await anext(gemini.stream_timestamps("captions"))
+
+    assert stream.closed
@@ -0,0 +1,155 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.genai.errors import ClientError, ServerError
+import pytest
+from tenacity import stop_after_attempt, wait_none
+
+from services import gemini
+from services.gemini_pool import GeminiPool
+from services.rate_limit import InProcessRateLimiter, Quota
+
+RATE_LIMITED = ClientError(429, {"error": {"code": 429, "message": "quota"}})
+OVERLOADED = ServerError(503, {"error": {"code": 503, "message": "busy"}})
+
+
+def _limiter(rpm=1000, **quotas):
+    return InProcessRateLimiter(Quota(rpm=rpm), quotas=quotas)
+
+
+# ============================================================================
+# Group 1: Routing
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_routes_to_least_loaded_key():
+    pool = GeminiPool(["key-a", "key-b"], ["flash"])
+    limiter = _limiter()
+
+    first = await pool.acquire(limiter)
+    second = await pool.acquire(limiter)
+
+    assert {first.api_key, second.api_key} == {"key-a", "key-b"}
+    pool.release(first)
+    third = await pool.acquire(limiter)
+    assert third is first
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_key_is_quarantined():
+    pool = GeminiPool(["key-a", "key-b"], ["flash"], quarantine_seconds=60)
+    limiter = _limiter()
+
+    endpoint = await pool.acquire(limiter)
+    pool.release(endpoint, RATE_LIMITED)
+
+    for _ in range(3):
+        other = await pool.acquire(limiter)
+        assert other.api_key != endpoint.api_key
+        pool.release(other)
+    assert pool.states()[("flash", "quarantined")] == 1
+
+
+@pytest.mark.asyncio
+async def test_overload_backs_off_exponentially():
+    pool = GeminiPool(["key-a"], ["flash"], quarantine_seconds=60)
+    endpoint = pool.endpoints[0]
+
+    pool.release(endpoint, OVERLOADED)
+    first_backoff = endpoint.quarantined_until
+    pool.release(endpoint, OVERLOADED)
+
+    assert endpoint.failures == 2
+    assert endpoint.quarantined_until > first_backoff
+    pool.release(endpoint)
+    assert endpoint.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_next_tier_when_out_of_quota():
+    pool = GeminiPool(["key-a"], ["pro", "flash"])
+    limiter = _limiter(rpm=1000, pro=Quota(rpm=1))
+
+    first = await pool.acquire(limiter)
+    second = await pool.acquire(limiter)
+
+    assert first.model == "pro"
+    assert second.model == "flash"
+
+
+@pytest.mark.asyncio
+async def test_short_prompts_prefer_the_short_model():
+    pool = GeminiPool(["key-a"], ["flash"], short_model="flash-lite", short_prompt_tokens=100)
+    limiter = _limiter()
+
+    assert (await pool.acquire(limiter, tokens=50)).model == "flash-lite"
+    assert (await pool.acquire(limiter, tokens=500)).model == "flash"
+    assert pool.signature == "flash;flash-lite<=100"
+
+
+@pytest.mark.asyncio
+async def test_uses_soonest_released_endpoint_when_all_quarantined():
+    pool = GeminiPool(["key-a", "key-b"], ["flash"], quarantine_seconds=60)
+    a, b = pool.endpoints
+    a.quarantined_until, b.quarantined_until = 1e12, 1e11
+
+    assert await pool.acquire(_limiter()) is b
+
+
+# ============================================================================
+# Group 2: Gemini calls through the pool
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_retry_moves_to_another_key_after_429():
+    pool = GeminiPool(["key-a", "key-b"], ["flash"])
+    clients = {}
+
+    def client_for(api_key=None):
+        if api_key not in clients:
+            client = MagicMock()
+            client.models.generate_content = AsyncMock(
+                side_effect=RATE_LIMITED
+                if not clients
+                else [MagicMock(text="00:00 - Intro", usage_metadata=None)]
+            )
+            clients[api_key] = client
+        return clients[api_key]
+
+    evaluate = gemini.evaluate_timestamps.retry_with(wait=wait_none(), stop=stop_after_attempt(3))
+    with (
+        patch.object(gemini, "POOL", pool),
+        patch.object(gemini, "RATE_LIMITER", _limiter()),
+        patch.object(gemini, "get_client", side_effect=client_for),
+    ):
+        output = await evaluate("0:00:00 - hello", video_id="abc")
+
+    assert output == ["00:00 - Intro"]
+    assert len(clients) == 2
+    assert all(endpoint.in_flight == 0 for endpoint in pool.endpoints)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_releases_endpoint():
+    pool = GeminiPool(["key-a"], ["flash"])
+    client = MagicMock()
+
+    async def hang(**_kwargs):
+        await asyncio.sleep(10)
+
+    client.models.generate_content = hang
+    with (
+        patch.object(gemini, "POOL", pool),
+        patch.object(gemini, "RATE_LIMITER", _limiter()),
+        patch.object(gemini, "get_client", return_value=client),
+    ):
+        task = asyncio.create_task(gemini.evaluate_timestamps("0:00:00 - hi", video_id="abc"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert pool.endpoints[0].in_flight == 0
+    assert not pool.endpoints[0].quarantined_until
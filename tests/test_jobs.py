@@ -0,0 +1,191 @@
+import asyncio
+import sqlite3
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from youtube_transcript_api import TranscriptsDisabled
+
+from services import jobs
+from services.jobs import JobStore, JobWorkerPool
+from utils.background_loop import BackgroundLoop
+
+SAMPLE_URL = "https://www.youtube.com/watch?v=Q9gxKxGLmkc"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(tmp_path / "jobs.sqlite3")
+
+
+# ============================================================================
+# Group 1: Job store
+# ============================================================================
+
+
+def test_claims_highest_priority_then_oldest(store):
+    low = store.submit(SAMPLE_URL, priority=0)
+    high = store.submit(SAMPLE_URL, priority=5)
+    later_low = store.submit(SAMPLE_URL, priority=0)
+
+    assert [store.claim().id for _ in range(3)] == [high.id, low.id, later_low.id]
+    assert store.claim() is None
+
+
+def test_claim_marks_job_running(store):
+    job = store.submit(SAMPLE_URL, "focus on Q&A", "en")
+
+    claimed = store.claim()
+
+    assert claimed.id == job.id
+    assert claimed.status == jobs.RUNNING
+    assert claimed.attempts == 1
+    assert store.get(job.id).status == jobs.RUNNING
+
+
+def test_queue_position_counts_jobs_ahead(store):
+    first = store.submit(SAMPLE_URL)
+    second = store.submit(SAMPLE_URL)
+    urgent = store.submit(SAMPLE_URL, priority=1)
+
+    assert store.position(urgent) == 0
+    assert store.position(first) == 1
+    assert store.position(second) == 2
+
+
+def test_stale_running_jobs_are_requeued_then_failed(store):
+    job = store.submit(SAMPLE_URL)
+    for _ in range(jobs.MAX_ATTEMPTS):
+        store.claim()
+        assert store.requeue_stale(max_age=-1) in (0, 1)
+
+    assert store.get(job.id).status == jobs.FAILED
+    assert store.get(job.id).error_type == "Abandoned"
+
+
+def test_heartbeat_keeps_long_running_jobs_claimed(store):
+    with patch.object(jobs.time, "time", return_value=1000.0):
+        beating = store.submit(SAMPLE_URL, priority=1)
+        silent = store.submit(SAMPLE_URL)
+        store.claim()
+        store.claim()
+    with patch.object(jobs.time, "time", return_value=1000.0 + jobs.STALE_JOB_SECONDS):
+        store.heartbeat([beating.id])
+    with patch.object(jobs.time, "time", return_value=1001.0 + jobs.STALE_JOB_SECONDS):
+        assert store.requeue_stale() == 1
+
+    assert store.get(beating.id).status == jobs.RUNNING
+    assert store.get(silent.id).status == jobs.QUEUED
+
+
+def test_adds_heartbeat_column_to_existing_database(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, url TEXT NOT NULL,"
+        " additional_instruction TEXT NOT NULL, language TEXT NOT NULL,"
+        " priority INTEGER NOT NULL, status TEXT NOT NULL,"
+        " attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error_type TEXT, error TEXT,"
+        " created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+    )
+    connection.close()
+    store = JobStore(path)
+
+    job = store.submit(SAMPLE_URL)
+
+    assert store.claim().heartbeat_at is not None
+    assert store.get(job.id).heartbeat_at is not None
+
+
+def test_purge_removes_old_finished_jobs(store):
+    done = store.submit(SAMPLE_URL)
+    queued = store.submit(SAMPLE_URL)
+    store.claim()
+    store.complete(done.id, "00:00 - Intro")
+    time.sleep(0.01)
+
+    assert store.purge(retention=0.001) == 1
+    assert store.get(done.id) is None
+    assert store.get(queued.id) is not None
+
+
+# ============================================================================
+# Group 2: Worker pool
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_run_job_records_result_and_failure(store):
+    pool = JobWorkerPool(store, concurrency=1)
+    ok = store.submit(SAMPLE_URL)
+    bad = store.submit(SAMPLE_URL)
+
+    with patch(
+        "services.video_processor.process_video_timestamp",
+        AsyncMock(side_effect=["00:00 - Intro", TranscriptsDisabled("Q9gxKxGLmkc")]),
+    ):
+        await pool.run_job(store.claim())
+        await pool.run_job(store.claim())
+
+    assert store.get(ok.id).status == jobs.DONE
+    assert store.get(ok.id).result == "00:00 - Intro"
+    assert store.get(bad.id).status == jobs.FAILED
+    assert store.get(bad.id).error_type == "TranscriptsDisabled"
+
+
+def test_pool_runs_jobs_with_bounded_concurrency(store):
+    loop = BackgroundLoop("test-loop")
+    pool = JobWorkerPool(store, concurrency=2, loop=loop, poll_interval=0.05)
+    running = peak = 0
+
+    async def process(*_args):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return "00:00 - Intro"
+
+    try:
+        with patch("services.video_processor.process_video_timestamp", side_effect=process):
+            submitted = [store.submit(SAMPLE_URL) for _ in range(5)]
+            pool.start()
+            deadline = time.monotonic() + 5
+            while store.stats()[jobs.DONE] < 5 and time.monotonic() < deadline:
+                time.sleep(0.02)
+    finally:
+        loop.stop()
+
+    assert all(store.get(job.id).status == jobs.DONE for job in submitted)
+    assert peak == 2
+
+
+# ============================================================================
+# Group 3: API
+# ============================================================================
+
+
+def test_api_submit_and_poll(store):
+    from app import app
+
+    with (
+        patch.object(jobs, "JOB_STORE", store),
+        patch.object(jobs.JOB_POOL, "start"),
+        patch.object(jobs.JOB_POOL, "notify"),
+    ):
+        client = app.test_client()
+        response = client.post("/api/jobs", json={"url": SAMPLE_URL, "priority": 3})
+        job_id = response.get_json()["id"]
+
+        assert response.status_code == 202
+        assert response.headers["Location"] == f"/api/jobs/{job_id}"
+        assert response.get_json()["queue_position"] == 0
+
+        store.claim()
+        store.complete(job_id, "00:00 - Intro")
+        polled = client.get(f"/api/jobs/{job_id}").get_json()
+
+        assert polled["status"] == jobs.DONE
+        assert polled["result"] == "00:00 - Intro"
+        assert client.get("/api/jobs/missing").status_code == 404
+        assert client.post("/api/jobs", json={}).status_code == 400
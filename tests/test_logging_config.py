@@ -0,0 +1,136 @@
+import json
+import logging
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from utils import logging_config
+from utils.logging_config import (
+    JSONFormatter,
+    SamplingFilter,
+    configure_logging,
+    request_id_var,
+    video_id_var,
+)
+
+
+def _record(name="services.gemini", level=logging.INFO, msg="hello %s", args=("world",)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    def configure(**kwargs):
+        configure_logging(log_dir=tmp_path, **kwargs)
+        return tmp_path / "app.log"
+
+    yield configure
+    logging_config.stop_logging()
+
+
+# ============================================================================
+# Group 1: Formatting and filters
+# ============================================================================
+
+
+def test_json_formatter_includes_context_and_exception():
+    record = _record()
+    record.request_id, record.video_id = "req-1", "Q9gxKxGLmkc"
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record.exc_info = sys.exc_info()
+
+    entry = json.loads(JSONFormatter().format(record))
+
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["request_id"] == "req-1"
+    assert entry["video_id"] == "Q9gxKxGLmkc"
+    assert "ValueError: boom" in entry["exception"]
+
+
+def test_sampling_drops_stage_chatter_but_keeps_warnings_and_app_lines():
+    sampler = SamplingFilter(rate=0.0)
+
+    assert not sampler.filter(_record("services.gemini", logging.INFO))
+    assert sampler.filter(_record("services.gemini", logging.WARNING))
+    assert sampler.filter(_record("app", logging.INFO))
+
+
+def test_sampling_keeps_or_drops_whole_requests():
+    sampler = SamplingFilter(rate=0.5)
+    decisions = set()
+    for _ in range(5):
+        record = _record()
+        record.request_id = "same-request"
+        decisions.add(sampler.filter(record))
+
+    assert len(decisions) == 1
+
+
+# ============================================================================
+# Group 2: Queue pipeline
+# ============================================================================
+
+
+def test_records_are_written_by_the_listener_with_context(pipeline):
+    log_file = pipeline(log_format="json")
+    token = request_id_var.set("req-42")
+    video_token = video_id_var.set("Q9gxKxGLmkc")
+    try:
+        logging.getLogger("services.test").info("stage %s done", "fetch")
+    finally:
+        request_id_var.reset(token)
+        video_id_var.reset(video_token)
+    logging_config.stop_logging()
+
+    entry = json.loads(log_file.read_text().strip().splitlines()[-1])
+    assert entry["message"] == "stage fetch done"
+    assert entry["request_id"] == "req-42"
+    assert entry["video_id"] == "Q9gxKxGLmkc"
+
+
+def test_text_format_rotates_at_max_bytes(pipeline, tmp_path):
+    pipeline(max_bytes=2000, backup_count=2)
+    for n in range(200):
+        logging.getLogger("app").warning("line %d %s", n, "x" * 40)
+    logging_config.stop_logging()
+
+    assert (tmp_path / "app.log.1").exists()
+    assert not (tmp_path / "app.log.3").exists()
+    assert "⚠️" in (tmp_path / "app.log").read_text()
+
+
+def test_invalid_settings_fall_back_to_defaults(monkeypatch, tmp_path):
+    from flask import Flask
+
+    monkeypatch.setenv("LOG_DIR", str(tmp_path))
+    monkeypatch.setenv("LOG_MAX_BYTES", "10MB")
+    monkeypatch.setenv("LOG_BACKUP_COUNT", "ten")
+    monkeypatch.setenv("LOG_SAMPLE_RATE", "half")
+    with patch.object(logging_config, "configure_logging") as configure:
+        logging_config.setup_logging(Flask("test"))
+
+    kwargs = configure.call_args.kwargs
+    assert kwargs["max_bytes"] == 10 * 1024 * 1024
+    assert kwargs["backup_count"] == 10
+    assert kwargs["sample_rate"] == 1.0
+
+
+# ============================================================================
+# Group 3: Request IDs
+# ============================================================================
+
+
+def test_request_id_is_echoed_or_generated():
+    from app import app
+
+    client = app.test_client()
+    supplied = client.get("/", headers={"X-Request-ID": "abc-123"})
+    generated = client.get("/", headers={"X-Request-ID": "bad id"})
+
+    assert supplied.headers["X-Request-ID"] == "abc-123"
+    assert generated.headers["X-Request-ID"] != "bad id"
+    assert len(generated.headers["X-Request-ID"]) == 16
@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.genai.errors import ClientError
+import pytest
+from tenacity import stop_after_attempt, wait_none
+
+from services import gemini, jobs
+from services.jobs import JobStore
+from services.rate_limit import InProcessRateLimiter, Quota
+from utils import metrics
+
+# ============================================================================
+# Group 1: Metric types
+# ============================================================================
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "Test.", ("stage",), buckets=(0.1, 1))
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(5, stage="a")
+
+    rendered = histogram.render()
+
+    assert "# TYPE test_seconds histogram" in rendered
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in rendered
+    assert 'test_seconds_bucket{stage="a",le="1"} 2' in rendered
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 3' in rendered
+    assert 'test_seconds_count{stage="a"} 3' in rendered
+    assert 'test_seconds_sum{stage="a"} 5.55' in rendered
+
+
+def test_counter_rejects_unknown_labels_and_escapes_values():
+    counter = metrics.Counter("test_total", "Test.", ("kind",))
+    counter.inc(kind='say "hi"')
+
+    assert 'test_total{kind="say \\"hi\\""} 1' in counter.render()
+    with pytest.raises(ValueError, match="expects labels"):
+        counter.inc(other="x")
+
+
+def test_span_records_outcome():
+    before_ok = metrics.STAGE_SECONDS.count(stage="unit_test", outcome="ok")
+    before_error = metrics.STAGE_SECONDS.count(stage="unit_test", outcome="error")
+
+    with metrics.span("unit_test"):
+        pass
+    with pytest.raises(RuntimeError), metrics.span("unit_test"):
+        raise RuntimeError("boom")
+
+    assert metrics.STAGE_SECONDS.count(stage="unit_test", outcome="ok") == before_ok + 1
+    assert metrics.STAGE_SECONDS.count(stage="unit_test", outcome="error") == before_error + 1
+
+
+# ============================================================================
+# Group 2: Gemini instrumentation
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_gemini_attempts_retries_and_tokens_are_recorded():
+    usage = SimpleNamespace(prompt_token_count=1200, candidates_token_count=80)
+    client = MagicMock()
+    client.models.generate_content = AsyncMock(
+        side_effect=[
+            ClientError(429, {"error": {"code": 429, "message": "slow down"}}),
+            SimpleNamespace(text="00:00 - Intro", usage_metadata=usage),
+        ]
+    )
+    evaluate = gemini.evaluate_timestamps.retry_with(wait=wait_none(), stop=stop_after_attempt(3))
+    before = {
+        "429": metrics.GEMINI_ATTEMPTS.value(outcome="429"),
+        "ok": metrics.GEMINI_ATTEMPTS.value(outcome="ok"),
+        "retries": metrics.GEMINI_RETRIES.value(call="evaluate_timestamps"),
+        "prompt": metrics.GEMINI_TOKENS.value(model=gemini.MODEL, kind="prompt"),
+        "waits": metrics.STAGE_SECONDS.count(stage="rate_limit_wait", outcome="ok"),
+    }
+
+    with (
+        patch.object(gemini, "get_client", return_value=client),
+        patch.object(gemini, "RATE_LIMITER", InProcessRateLimiter(Quota(rpm=1000))),
+    ):
+        await evaluate("0:00:00 - hello", video_id="abc")
+
+    assert metrics.GEMINI_ATTEMPTS.value(outcome="429") == before["429"] + 1
+    assert metrics.GEMINI_ATTEMPTS.value(outcome="ok") == before["ok"] + 1
+    assert metrics.GEMINI_RETRIES.value(call="evaluate_timestamps") == before["retries"] + 1
+    tokens = metrics.GEMINI_TOKENS.value(model=gemini.MODEL, kind="prompt")
+    assert tokens == before["prompt"] + 1200
+    assert metrics.STAGE_SECONDS.count(stage="rate_limit_wait", outcome="ok") == (
+        before["waits"] + 2
+    )
+
+
+# ============================================================================
+# Group 3: Endpoint
+# ============================================================================
+
+
+def test_metrics_endpoint_serves_prometheus_text(tmp_path):
+    from app import app
+
+    with patch.object(jobs, "JOB_STORE", JobStore(tmp_path / "jobs.sqlite3")):
+        response = app.test_client().get("/metrics")
+
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert "# TYPE youtamp_stage_duration_seconds histogram" in body
+    assert 'youtamp_jobs{status="queued"} 0' in body
@@ -0,0 +1,140 @@
+import random
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services import near_duplicate, result_cache, video_processor
+from services.chapters import ChapterList
+from services.near_duplicate import NearDuplicateIndex, fingerprint, similarity
+from services.youtube import TranscriptEntry
+
+WORDS = (
+    "chapter", "model", "python", "video", "cache", "server", "request", "latency",
+    "queue", "worker", "thread", "memory", "profile", "tokens", "prompt", "index",
+)
+
+
+def make_entries(seed: int, count: int = 200, offset: float = 0.0) -> list[TranscriptEntry]:
+    rng = random.Random(seed)
+    return [
+        TranscriptEntry(offset + n * 5.0, 5.0, " ".join(rng.choices(WORDS, k=8)))
+        for n in range(count)
+    ]
+
+
+def key_for(video_id: str, instruction: str = "") -> result_cache.CacheKey:
+    return result_cache.make_key(video_id, "en", instruction, "gemini-2.5-flash", "v1")
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "near_duplicates.sqlite3", threshold=0.85)
+    with (
+        patch.object(near_duplicate, "NEAR_DUPLICATES", index),
+        patch("config.NEAR_DUPLICATE_ENABLED", True),
+        patch.object(near_duplicate.file_io, "async_save_response_to_file", AsyncMock()),
+    ):
+        yield index
+
+
+# ============================================================================
+# Group 1: Fingerprints
+# ============================================================================
+
+
+def test_shifted_copy_has_the_same_fingerprint():
+    original = fingerprint(make_entries(1))
+    shifted = fingerprint(make_entries(1, offset=42.0))
+
+    assert similarity(original.signature, shifted.signature) == 1.0
+    assert near_duplicate.estimate_offset(original.anchors, shifted.anchors) == 42.0
+
+
+def test_small_edits_stay_similar_and_other_videos_do_not():
+    entries = make_entries(1)
+    edited = list(entries)
+    edited[10] = TranscriptEntry(50.0, 5.0, "a completely different caption line here")
+
+    base = fingerprint(entries).signature
+    assert similarity(base, fingerprint(edited).signature) >= 0.85
+    assert similarity(base, fingerprint(make_entries(2)).signature) < 0.3
+
+
+def test_short_transcripts_are_not_fingerprinted():
+    assert fingerprint(make_entries(1, count=3)) is None
+
+
+def test_shift_chapters_moves_clamps_and_drops():
+    lines = ["00:00 - Intro", "01:00 - Setup", "02:00 - Demo", "09:00 - Outro"]
+
+    assert near_duplicate.shift_chapters(lines, -90, 400) == ["00:00 - Setup", "00:30 - Demo"]
+    assert near_duplicate.shift_chapters(lines, 30, 3600) == [
+        "00:00:30 - Intro",
+        "00:01:30 - Setup",
+        "00:02:30 - Demo",
+        "00:09:30 - Outro",
+    ]
+    assert near_duplicate.shift_chapters(lines, 0, 10) == lines
+
+
+# ============================================================================
+# Group 2: Index
+# ============================================================================
+
+
+def test_index_finds_near_duplicate_with_same_settings_only(index):
+    index.add(fingerprint(make_entries(1)), "original000", key_for("x").variant, ["00:00 - A"])
+    copy = fingerprint(make_entries(1, offset=10.0))
+
+    match = index.find(copy, key_for("x").variant, "mirror00000")
+    assert match.video_id == "original000"
+    assert match.offset == 10.0
+    assert match.chapters == ["00:00 - A"]
+
+    assert index.find(copy, key_for("x", "other instruction").variant, "mirror00000") is None
+    assert index.find(copy, key_for("x").variant, "original000") is None
+    assert index.find(fingerprint(make_entries(3)), key_for("x").variant, "other000000") is None
+
+
+def test_readding_a_video_replaces_its_entry(index):
+    fp = fingerprint(make_entries(1))
+    index.add(fp, "original000", key_for("x").variant, ["00:00 - Old"])
+    index.add(fp, "original000", key_for("x").variant, ["00:00 - New"])
+
+    assert index.find(fp, key_for("x").variant, "mirror00000").chapters == ["00:00 - New"]
+
+
+# ============================================================================
+# Group 3: Reuse in the pipeline
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_reupload_reuses_chapters_without_gemini(index):
+    gemini_call = AsyncMock(
+        return_value=ChapterList([(0, "Intro"), (300, "Main part")], duration=600)
+    )
+    with patch.object(video_processor, "call_gemini", gemini_call):
+        first = await video_processor.evaluate_transcript(
+            make_entries(1), "", "original000", "en"
+        )
+        second = await video_processor.evaluate_transcript(
+            make_entries(1, offset=60.0), "", "reupload000", "en"
+        )
+
+    gemini_call.assert_awaited_once()
+    assert first.lines() == ["00:00 - Intro", "05:00 - Main part"]
+    assert second.lines() == ["01:00 - Intro", "06:00 - Main part"]
+    saved = near_duplicate.file_io.async_save_response_to_file.await_args.args
+    assert saved[1] == "reupload000"
+    assert '"near_duplicate_of": "original000"' in saved[0]
+
+
+@pytest.mark.asyncio
+async def test_different_video_still_calls_gemini(index):
+    gemini_call = AsyncMock(return_value=ChapterList([(0, "Intro")]))
+    with patch.object(video_processor, "call_gemini", gemini_call):
+        await video_processor.evaluate_transcript(make_entries(1), "", "original000", "en")
+        await video_processor.evaluate_transcript(make_entries(2), "", "unrelated00", "en")
+
+    assert gemini_call.await_count == 2
@@ -0,0 +1,318 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.genai.errors import APIError
+import pytest
+from tenacity import wait_none
+
+from services import gemini, overload, result_cache, video_processor
+from services.overload import GeminiUnavailableError, OverloadController
+from services.rate_limit import InProcessRateLimiter, Quota
+from services.result_cache import ResultCache
+
+
+def _controller(**overrides):
+    params = {
+        "min_limit": 1,
+        "max_limit": 8,
+        "window_seconds": 30,
+        "retry_ratio": 0.2,
+        "min_retries": 2,
+        "failure_ratio": 0.5,
+        "min_calls": 4,
+        "open_seconds": 30,
+    }
+    params.update(overrides)
+    return OverloadController(**params)
+
+
+async def _call(controller, error=None):
+    await controller.acquire()
+    controller.release(error)
+
+
+def _clock(start=1000.0):
+    """Patches the controller's clock; returns a setter for the current time."""
+    now = [start]
+    patcher = patch.object(overload.time, "monotonic", side_effect=lambda: now[0])
+
+    def set_time(value):
+        now[0] = value
+
+    return patcher, set_time
+
+
+# ============================================================================
+# Group 1: Adaptive concurrency
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_overload_halves_limit_once_per_cooldown():
+    controller = _controller(min_calls=100)
+    patcher, set_time = _clock()
+    with patcher:
+        await _call(controller, TimeoutError())
+        assert controller.snapshot()["limit"] == 4
+
+        # A burst of failures within the cooldown counts once.
+        await _call(controller, APIError(503, {}))
+        assert controller.snapshot()["limit"] == 4
+
+        set_time(1000.0 + overload.DECREASE_COOLDOWN_SECONDS)
+        await _call(controller, APIError(429, {}))
+        assert controller.snapshot()["limit"] == 2
+
+
+@pytest.mark.asyncio
+async def test_success_raises_limit_additively():
+    controller = _controller(min_calls=100)
+    controller.limit = 2.0
+
+    # 2 -> 2.5 -> 2.9 -> 3.24: about one step per ``limit`` successes.
+    for _ in range(3):
+        await _call(controller)
+    assert controller.snapshot()["limit"] == 3
+
+    for _ in range(50):
+        await _call(controller)
+    assert controller.snapshot()["limit"] == 8
+
+
+@pytest.mark.asyncio
+async def test_other_errors_do_not_lower_limit():
+    controller = _controller()
+
+    await _call(controller, APIError(400, {}))
+
+    assert controller.snapshot()["limit"] == 8
+    assert controller.snapshot()["overloaded"] == 0
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_a_free_slot():
+    controller = _controller(max_limit=1)
+    await controller.acquire()
+
+    waiter = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(overload.POLL_SECONDS * 2)
+    assert not waiter.done()
+
+    controller.release()
+    await asyncio.wait_for(waiter, timeout=1)
+    assert controller.snapshot()["in_flight"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_frees_slot_without_recording_a_call():
+    controller = _controller()
+    await controller.acquire()
+
+    controller.release(asyncio.CancelledError())
+
+    snapshot = controller.snapshot()
+    assert snapshot["in_flight"] == 0
+    assert snapshot["calls"] == 0
+
+
+# ============================================================================
+# Group 2: Retry budget
+# ============================================================================
+
+
+def test_retry_budget_has_a_floor_and_runs_out():
+    controller = _controller(min_retries=2)
+
+    assert controller.allow_retry()
+    assert controller.allow_retry()
+    assert not controller.allow_retry()
+    assert controller.retry_budget() == 0
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_grows_with_calls_and_refills_after_window():
+    controller = _controller(min_retries=0, retry_ratio=0.5, min_calls=100)
+    patcher, set_time = _clock()
+    with patcher:
+        for _ in range(4):
+            await _call(controller)
+        assert controller.retry_budget() == 2
+        assert controller.allow_retry()
+        assert controller.retry_budget() == 1
+
+        set_time(1000.0 + 31)
+        assert controller.retry_budget() == 0
+        await _call(controller)
+        await _call(controller)
+        assert controller.retry_budget() == 1
+
+
+def test_disabled_controller_allows_everything():
+    controller = _controller(enabled=False, min_retries=0)
+
+    assert controller.allow_retry()
+    controller.release(TimeoutError())
+    assert not controller.is_open()
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_when_budget_is_spent():
+    client = MagicMock()
+    client.models.generate_content = AsyncMock(side_effect=APIError(429, {}))
+    controller = _controller(min_retries=1, min_calls=100)
+    evaluate = gemini.evaluate_timestamps.retry_with(wait=wait_none())
+    with (
+        patch.object(gemini, "get_client", return_value=client),
+        patch.object(gemini, "RATE_LIMITER", InProcessRateLimiter(Quota(rpm=1000))),
+        patch.object(gemini, "OVERLOAD", controller),
+    ):
+        with pytest.raises(APIError):
+            await evaluate("captions")
+        # The first try plus the single retry in the budget, not all five attempts.
+        assert client.models.generate_content.await_count == 2
+
+        client.models.generate_content.reset_mock()
+        with pytest.raises(APIError):
+            await evaluate("captions")
+        assert client.models.generate_content.await_count == 1
+
+    assert controller.snapshot()["in_flight"] == 0
+
+
+# ============================================================================
+# Group 3: Circuit breaker
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_and_fails_fast():
+    controller = _controller()
+    patcher, _set_time = _clock()
+    with patcher:
+        await _call(controller)
+        await _call(controller)
+        await _call(controller, TimeoutError())
+        assert not controller.is_open()
+        await _call(controller, TimeoutError())
+
+        assert controller.is_open()
+        with pytest.raises(GeminiUnavailableError) as excinfo:
+            await controller.acquire()
+        assert excinfo.value.retry_after == 30
+        assert not controller.allow_retry()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("probe_error", "reopens"),
+    [(None, False), (TimeoutError(), True)],
+)
+async def test_half_open_probe_decides(probe_error, reopens):
+    controller = _controller(min_calls=2)
+    patcher, set_time = _clock()
+    with patcher:
+        await _call(controller, TimeoutError())
+        await _call(controller, TimeoutError())
+        assert controller.is_open()
+
+        set_time(1000.0 + 31)
+        await controller.acquire()
+        # Only the probe goes through while half-open.
+        with pytest.raises(GeminiUnavailableError):
+            await controller.acquire()
+        controller.release(probe_error)
+
+        assert controller.is_open() is reopens
+        assert controller.snapshot()["state"] == (overload.OPEN if reopens else overload.CLOSED)
+
+
+@pytest.mark.asyncio
+async def test_gauges_report_controller_state():
+    controller = _controller(min_calls=2)
+
+    await _call(controller, TimeoutError())
+    await _call(controller, TimeoutError())
+
+    gauges = controller.gauges()
+    assert gauges[("circuit_open",)] == 1.0
+    assert gauges[("limit",)] == 4.0
+    assert gauges[("in_flight",)] == 0.0
+    assert 0 < gauges[("open_for",)] <= 30
+
+
+# ============================================================================
+# Group 4: Serving stale results
+# ============================================================================
+
+
+@pytest.fixture
+def open_circuit():
+    controller = _controller(min_calls=1)
+    controller.release(TimeoutError())
+    assert controller.is_open()
+    with patch.object(gemini, "OVERLOAD", controller):
+        yield controller
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_serves_stale_result(tmp_path, open_circuit):
+    cache = ResultCache(max_entries=4, ttl=10, disk_ttl=0, base_dir=tmp_path)
+    key = video_processor.make_cache_key("Q9gxKxGLmkc", "auto", "")
+    with patch.object(result_cache.time, "monotonic", return_value=100.0):
+        await cache.set(key, "00:00 - Intro")
+
+    generate = AsyncMock()
+    with (
+        patch.object(result_cache, "RESULT_CACHE", cache),
+        patch.object(video_processor.config, "RESULT_CACHE_ENABLED", True),
+        patch.object(video_processor, "generate_timestamps", generate),
+        patch.object(result_cache.time, "monotonic", return_value=200.0),
+    ):
+        output = await video_processor.process_video_timestamp(
+            "https://youtu.be/Q9gxKxGLmkc", "", "auto"
+        )
+
+    assert output == "00:00 - Intro"
+    generate.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_without_stale_result_fails_fast(tmp_path, open_circuit):
+    generate = AsyncMock()
+    with (
+        patch.object(result_cache, "RESULT_CACHE", ResultCache(disk_ttl=0, base_dir=tmp_path)),
+        patch.object(video_processor.config, "RESULT_CACHE_ENABLED", True),
+        patch.object(video_processor, "generate_timestamps", generate),
+        pytest.raises(GeminiUnavailableError),
+    ):
+        await video_processor.process_video_timestamp("https://youtu.be/Q9gxKxGLmkc", "", "auto")
+
+    generate.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_disk_record_is_stale_after_its_ttl(tmp_path):
+    key = video_processor.make_cache_key("Q9gxKxGLmkc", "auto", "")
+    with patch.object(result_cache.time, "time", return_value=1000.0):
+        await ResultCache(disk_ttl=60, base_dir=tmp_path).set(key, "00:00 - Intro")
+
+    cache = ResultCache(disk_ttl=60, base_dir=tmp_path)
+    with patch.object(result_cache.time, "time", return_value=5000.0):
+        assert await cache.get(key) is None
+        assert await cache.get_stale(key) == "00:00 - Intro"
+
+
+def test_app_returns_503_with_retry_after():
+    import app as app_module
+
+    error = GeminiUnavailableError(12.2)
+    with patch.object(
+        app_module.video_processor, "process_video_timestamp", AsyncMock(side_effect=error)
+    ):
+        response = app_module.app.test_client().post(
+            "/api/timestamp/generate", json={"url": "https://youtu.be/Q9gxKxGLmkc"}
+        )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "13"
+    assert response.get_data(as_text=True) == app_module.GEMINI_UNAVAILABLE_MESSAGE
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import sys
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from youtube_transcript_api import TranscriptsDisabled
+
+from cli.manage import main
+from services import pipeline, video_processor, youtube
+from services.youtube import TranscriptEntry
+
+PLAYLIST_URL = "https://www.youtube.com/playlist?list=PLabcdefghijklmnop"
+CHANNEL_URL = "https://www.youtube.com/@somechannel"
+PAGE = (
+    '{"videoId":"aaaaaaaaaaa"},{"videoId":"bbbbbbbbbbb"},'
+    '{"videoId":"aaaaaaaaaaa"},{"videoId":"ccccccccccc"}'
+)
+ENTRIES = [TranscriptEntry(0.0, 5.0, "hello")]
+
+
+@pytest.fixture
+def stages():
+    """Stubs the per-video stages; the pipeline wiring itself runs for real."""
+    with (
+        patch.object(video_processor, "get_cached", AsyncMock(return_value=None)) as cached,
+        patch.object(
+            video_processor, "prepare_transcript", AsyncMock(return_value=ENTRIES)
+        ) as prepare,
+        patch.object(
+            video_processor, "evaluate_transcript", AsyncMock(return_value=["00:00 Intro"])
+        ) as evaluate,
+        patch.object(
+            video_processor, "store_timestamps", AsyncMock(return_value="00:00 Intro")
+        ) as store,
+    ):
+        yield {"cached": cached, "prepare": prepare, "evaluate": evaluate, "store": store}
+
+
+async def collect(results):
+    return [result async for result in results]
+
+
+# ============================================================================
+# Group 1: URL expansion
+# ============================================================================
+
+
+@pytest.mark.parametrize(
+    ("url", "video_id"),
+    [
+        ("https://www.youtube.com/shorts/Q9gxKxGLmkc", "Q9gxKxGLmkc"),
+        ("https://youtube.com/live/Q9gxKxGLmkc?feature=share", "Q9gxKxGLmkc"),
+        ("https://www.youtube.com/watch?v=Q9gxKxGLmkc&list=PLabc", "Q9gxKxGLmkc"),
+    ],
+)
+def test_extract_video_id_accepts_more_forms(url, video_id):
+    assert youtube.extract_video_id(url) == video_id
+
+
+@pytest.mark.parametrize(
+    ("url", "page_url"),
+    [
+        (PLAYLIST_URL, "https://www.youtube.com/playlist?list=PLabcdefghijklmnop"),
+        (CHANNEL_URL, "https://www.youtube.com/@somechannel/videos"),
+        (
+            "https://www.youtube.com/channel/UCabcdefghijklmnopqrstuv/featured",
+            "https://www.youtube.com/channel/UCabcdefghijklmnopqrstuv/videos",
+        ),
+        ("https://www.youtube.com/watch?v=Q9gxKxGLmkc&list=PLabc", None),
+        ("Q9gxKxGLmkc", None),
+    ],
+)
+def test_collection_page_url(url, page_url):
+    assert youtube.collection_page_url(url) == page_url
+
+
+def test_expand_collection_dedupes_in_page_order():
+    with patch.object(youtube, "fetch_page", return_value=PAGE):
+        assert youtube.expand_collection(PLAYLIST_URL) == [
+            "aaaaaaaaaaa",
+            "bbbbbbbbbbb",
+            "ccccccccccc",
+        ]
+        assert youtube.expand_collection(CHANNEL_URL, limit=2) == ["aaaaaaaaaaa", "bbbbbbbbbbb"]
+
+
+def test_expand_collection_without_videos_raises():
+    with (
+        patch.object(youtube, "fetch_page", return_value="<html></html>"),
+        pytest.raises(ValueError, match="No videos found"),
+    ):
+        youtube.expand_collection(PLAYLIST_URL)
+
+
+@pytest.mark.asyncio
+async def test_expand_url_passes_single_videos_through():
+    with patch.object(youtube, "fetch_page") as fetch_page:
+        assert await youtube.async_expand_url("https://youtu.be/Q9gxKxGLmkc") == ["Q9gxKxGLmkc"]
+    fetch_page.assert_not_called()
+
+
+# ============================================================================
+# Group 2: Pipeline
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_every_stage(stages, tmp_path):
+    items = pipeline.items_for(["aaaaaaaaaaa", "bbbbbbbbbbb"])
+
+    results = await collect(pipeline.run_pipeline(items, language="en", output_dir=tmp_path))
+
+    assert sorted((r.video_id, r.status, r.timestamps) for r in results) == [
+        ("aaaaaaaaaaa", "done", "00:00 Intro"),
+        ("bbbbbbbbbbb", "done", "00:00 Intro"),
+    ]
+    assert stages["evaluate"].await_count == 2
+    assert (tmp_path / "aaaaaaaaaaa" / "timestamps.txt").read_text() == "00:00 Intro"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_serves_cache_hits_without_fetching(stages):
+    stages["cached"].return_value = "00:00 Cached"
+
+    results = await collect(pipeline.run_pipeline(pipeline.items_for(["aaaaaaaaaaa"])))
+
+    assert [(r.status, r.timestamps) for r in results] == [("done", "00:00 Cached")]
+    stages["prepare"].assert_not_awaited()
+    stages["store"].assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_finished_videos_when_resuming(stages, tmp_path):
+    (tmp_path / "aaaaaaaaaaa").mkdir()
+    (tmp_path / "aaaaaaaaaaa" / "timestamps.txt").write_text("done before")
+
+    results = await collect(
+        pipeline.run_pipeline(pipeline.items_for(["aaaaaaaaaaa"]), output_dir=tmp_path)
+    )
+
+    assert [r.status for r in results] == ["skipped"]
+    stages["prepare"].assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_reports_failures_per_video(stages):
+    stages["prepare"].side_effect = [TranscriptsDisabled("aaaaaaaaaaa"), ENTRIES]
+    stages["evaluate"].side_effect = RuntimeError("boom")
+
+    results = await collect(
+        pipeline.run_pipeline(
+            pipeline.items_for(["aaaaaaaaaaa", "bbbbbbbbbbb"]), fetch_concurrency=1
+        )
+    )
+
+    assert sorted((r.video_id, r.status, r.error_type) for r in results) == [
+        ("aaaaaaaaaaa", "failed", "TranscriptsDisabled"),
+        ("bbbbbbbbbbb", "failed", "RuntimeError"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_slow_generation_backpressures_fetchers(stages):
+    release = asyncio.Event()
+
+    async def slow_evaluate(*_args):
+        await release.wait()
+        return ["00:00 Intro"]
+
+    stages["evaluate"].side_effect = slow_evaluate
+    ids = [f"video{n:06d}" for n in range(20)]
+    results = pipeline.run_pipeline(
+        pipeline.items_for(ids), fetch_concurrency=8, generate_concurrency=1, queue_size=2
+    )
+    first = asyncio.ensure_future(anext(results))
+    await asyncio.sleep(0.05)
+
+    # One transcript in the Gemini stage, two queued, one per blocked fetcher.
+    assert stages["prepare"].await_count <= 1 + 2 + 8
+    assert stages["prepare"].await_count < len(ids)
+
+    release.set()
+    assert (await first).status == "done"
+    rest = await collect(results)
+    assert len(rest) == len(ids) - 1
+    assert stages["prepare"].await_count == len(ids)
+
+
+# ============================================================================
+# Group 3: CLI and API
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_cli_expands_playlist(stages, tmp_path):
+    jsonl = tmp_path / "results.jsonl"
+    test_args = ["cli.py", PLAYLIST_URL, "--output-dir", str(tmp_path), "--jsonl", str(jsonl)]
+
+    with (
+        patch.object(youtube, "fetch_page", return_value=PAGE),
+        patch.object(sys, "argv", test_args),
+        pytest.raises(SystemExit) as exit_info,
+    ):
+        await main()
+
+    assert exit_info.value.code == 0
+    records = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    assert sorted(r["video_id"] for r in records) == ["aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"]
+    assert (tmp_path / "ccccccccccc" / "timestamps.txt").exists()
+
+
+def test_collection_endpoint_streams_results(stages):
+    from app import app
+
+    stages["prepare"].side_effect = [TranscriptsDisabled("x"), ENTRIES, ENTRIES]
+    with patch.object(youtube, "fetch_page", return_value=PAGE):
+        response = app.test_client().post(
+            "/api/timestamp/collection", json={"url": CHANNEL_URL, "max_videos": 2}
+        )
+        body = response.get_data(as_text=True)
+
+    assert response.mimetype == "text/event-stream"
+    events = [block.split("\n") for block in body.strip().split("\n\n")]
+    assert events[0] == ["event: videos", 'data: ["aaaaaaaaaaa", "bbbbbbbbbbb"]']
+    results = [json.loads(e[1].removeprefix("data: ")) for e in events if e[0] == "event: result"]
+    assert sorted(r["status"] for r in results) == ["done", "failed"]
+    failed = next(r for r in results if r["status"] == "failed")
+    assert "transcripts are disabled" in failed["error"]
+    assert events[-1][0] == "event: done"
+
+
+def test_collection_endpoint_rejects_bad_max_videos():
+    from app import app
+
+    response = app.test_client().post(
+        "/api/timestamp/collection", json={"url": CHANNEL_URL, "max_videos": "many"}
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,94 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services import gemini, prompts
+from services.prompts import PromptRegistry, PromptTemplate
+from utils import metrics
+
+
+def template(version: int = 1, system: str = "Be brief.") -> PromptTemplate:
+    return PromptTemplate(
+        name="test",
+        version=version,
+        system_instruction=system,
+        transcript_header="\nLanguage: {language}\n",
+        chunk_note="Part {part} of {total}.\n",
+        cached_header="\nLanguage: {language}, transcript above\n",
+    )
+
+
+# ============================================================================
+# Group 1: Registry and versions
+# ============================================================================
+
+
+def test_registry_returns_latest_or_pinned_version():
+    registry = PromptRegistry()
+    registry.register(template(1))
+    registry.register(template(2))
+
+    assert registry.get("test").version == 2
+    assert registry.get("test", 1).version == 1
+    with pytest.raises(KeyError):
+        registry.get("test", 3)
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register(template(2))
+
+
+def test_any_edit_changes_the_version_id():
+    assert template().version_id == template().version_id
+    assert template().version_id != template(system="Be thorough.").version_id
+    assert template().version_id.startswith("test-v1-")
+
+
+def test_active_prompt_version_is_exposed():
+    assert prompts.ACTIVE.version_id == gemini.PROMPT_VERSION
+    assert gemini.request_config["system_instruction"] == prompts.ACTIVE.system_instruction
+    assert f'version_id="{prompts.ACTIVE.version_id}"' in metrics.REGISTRY.render()
+
+
+# ============================================================================
+# Group 2: Prompt assembly
+# ============================================================================
+
+
+def test_parts_pass_the_transcript_through_without_copying():
+    captions = "0:00:00 - hello\n" * 1000
+
+    parts = template().parts(captions, "Focus on Q&A.", "Thai")
+
+    assert parts == ["Focus on Q&A.", "\nLanguage: Thai\n", captions]
+    assert parts[-1] is captions
+    assert template().parts(captions, "", "Thai") == ["\nLanguage: Thai\n", captions]
+    assert prompts.prompt_length(parts) == sum(map(len, parts))
+
+
+def test_cached_parts_leave_out_the_transcript():
+    assert template().cached_parts("Focus on Q&A.", "Thai") == [
+        "Focus on Q&A.",
+        "\nLanguage: Thai, transcript above\n",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_build_prompt_skips_disk_unless_load_prompt():
+    load = AsyncMock(return_value="saved prompt")
+    with patch.object(gemini.file_io, "async_load_prompt_from_file", load):
+        with patch("config.LOAD_PROMPT", False):
+            parts = await gemini.build_prompt("captions", "", "abc")
+        load.assert_not_awaited()
+        assert parts[-1] == "captions"
+
+        with patch("config.LOAD_PROMPT", True):
+            assert await gemini.build_prompt("captions", "", "abc") == ["saved prompt"]
+
+
+def test_saved_prompt_joins_parts():
+    with (
+        patch("config.SAVE_PROMPT", True),
+        patch.object(gemini.file_io, "ARTIFACT_SINK") as sink,
+    ):
+        gemini.file_io.save_prompt_to_file(["a", "b", "c"], "abc")
+
+    sink.put.assert_called_once_with("abc/prompt.txt", "abc")
@@ -0,0 +1,118 @@
+from multiprocessing import get_context
+
+import pytest
+
+from services.rate_limit import InProcessRateLimiter, Quota, SQLiteRateLimiter, parse_quotas, take
+
+# ============================================================================
+# Group 1: Token bucket
+# ============================================================================
+
+
+def test_bucket_admits_burst_up_to_rpm():
+    quota = Quota(rpm=3)
+    state = None
+    for _ in range(3):
+        state, wait = take(state, quota, tokens=0, now=0.0)
+        assert wait == 0
+
+    state, wait = take(state, quota, tokens=0, now=0.0)
+    assert wait == pytest.approx(20.0)  # one request refills every 60 / 3 seconds
+
+
+def test_bucket_refills_over_time():
+    quota = Quota(rpm=60)
+    state = None
+    for _ in range(60):
+        state, _ = take(state, quota, tokens=0, now=0.0)
+
+    _, wait = take(state, quota, tokens=0, now=0.0)
+    assert wait > 0
+    _, wait = take(state, quota, tokens=0, now=1.0)
+    assert wait == 0
+
+
+def test_bucket_limits_tokens_per_minute():
+    quota = Quota(rpm=100, tpm=1000)
+
+    state, wait = take(None, quota, tokens=800, now=0.0)
+    assert wait == 0
+
+    _, wait = take(state, quota, tokens=500, now=0.0)
+    assert wait == pytest.approx(18.0)  # 300 missing tokens at 1000 / 60 per second
+
+
+def test_oversized_request_drains_bucket_instead_of_waiting_forever():
+    state, wait = take(None, Quota(rpm=10, tpm=1000), tokens=5000, now=0.0)
+
+    assert wait == 0
+    assert state.tokens == 0
+
+
+def test_parse_quotas():
+    assert parse_quotas("pro:5:250000; flash:9 ;bad:x") == {
+        "pro": Quota(rpm=5, tpm=250000),
+        "flash": Quota(rpm=9, tpm=0),
+    }
+
+
+def test_zero_rpm_means_unlimited_requests():
+    quota = parse_quotas("free:0:1000")["free"]
+
+    state = None
+    for _ in range(100):
+        state, wait = take(state, quota, tokens=1, now=0.0)
+        assert wait == 0
+    _, wait = take(state, quota, tokens=1000, now=0.0)
+    assert wait > 0  # The token limit still applies.
+
+
+def test_parse_quotas_ignores_negative_limits():
+    assert parse_quotas("neg:-1;pro:5") == {"pro": Quota(rpm=5)}
+
+
+# ============================================================================
+# Group 2: Limiter backends
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_in_process_limiter_uses_per_key_quotas():
+    limiter = InProcessRateLimiter(Quota(rpm=1), {"fast": Quota(rpm=5)})
+
+    assert await limiter.try_acquire("slow", 0) == 0
+    assert await limiter.try_acquire("slow", 0) > 0
+    for _ in range(5):
+        assert await limiter.try_acquire("fast", 0) == 0
+
+
+@pytest.mark.asyncio
+async def test_sqlite_limiter_state_is_shared_between_instances(tmp_path):
+    path = tmp_path / "limits.sqlite3"
+    first = SQLiteRateLimiter(path, Quota(rpm=2))
+    second = SQLiteRateLimiter(path, Quota(rpm=2))
+
+    assert await first.try_acquire("model", 0) == 0
+    assert await second.try_acquire("model", 0) == 0
+    assert await first.try_acquire("model", 0) > 0
+
+
+def _acquire_in_process(path, results):
+    limiter = SQLiteRateLimiter(path, Quota(rpm=3))
+    results.put(limiter._try_acquire("model", 0) == 0)
+
+
+def test_sqlite_limiter_is_shared_across_processes(tmp_path):
+    path = tmp_path / "limits.sqlite3"
+    context = get_context("spawn")
+    results = context.Queue()
+    workers = [
+        context.Process(target=_acquire_in_process, args=(path, results)) for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    admitted = [results.get() for _ in workers]
+    assert admitted.count(True) == 3
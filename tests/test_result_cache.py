@@ -0,0 +1,125 @@
+from unittest.mock import patch
+
+import pytest
+
+from services import result_cache
+from services.result_cache import ResultCache, make_key
+
+VIDEO_ID = "Q9gxKxGLmkc"
+
+
+def _key(**overrides):
+    params = {
+        "video_id": VIDEO_ID,
+        "language": "th",
+        "additional_instruction": "",
+        "model": "gemini-2.5-flash",
+        "prompt_version": "v1",
+    }
+    params.update(overrides)
+    return make_key(**params)
+
+
+# ============================================================================
+# Group 1: Cache keys
+# ============================================================================
+
+
+def test_key_normalizes_language_and_instruction():
+    """
+    Test Case:
+    Language casing/whitespace and instruction whitespace do not change the key.
+    """
+    assert _key(language=" TH ") == _key(language="th")
+    assert _key(additional_instruction="  ten chapters ") == _key(
+        additional_instruction="ten chapters"
+    )
+    assert _key(additional_instruction=None) == _key(additional_instruction="")
+
+
+@pytest.mark.parametrize(
+    "override",
+    [
+        {"video_id": "aaaaaaaaaaa"},
+        {"language": "en"},
+        {"additional_instruction": "more"},
+        {"model": "gemini-2.5-pro"},
+        {"prompt_version": "v2"},
+    ],
+)
+def test_key_changes_with_each_component(override):
+    assert _key(**override).digest != _key().digest
+
+
+# ============================================================================
+# Group 2: Memory tier
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_memory_hit_and_miss_counters(tmp_path):
+    cache = ResultCache(max_entries=4, ttl=60, disk_ttl=0, base_dir=tmp_path)
+
+    assert await cache.get(_key()) is None
+    await cache.set(_key(), "00:00 - Intro")
+    assert await cache.get(_key()) == "00:00 - Intro"
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["stores"] == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(max_entries=2, ttl=60, disk_ttl=0, base_dir=tmp_path)
+    first, second, third = _key(language="a"), _key(language="b"), _key(language="c")
+
+    await cache.set(first, "1")
+    await cache.set(second, "2")
+    await cache.get(first)  # first becomes most recently used
+    await cache.set(third, "3")
+
+    assert await cache.get(second) is None
+    assert await cache.get(first) == "1"
+    assert await cache.get(third) == "3"
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_expires_entries(tmp_path):
+    cache = ResultCache(max_entries=2, ttl=10, disk_ttl=0, base_dir=tmp_path)
+
+    with patch.object(result_cache.time, "monotonic", return_value=100.0):
+        await cache.set(_key(), "00:00 - Intro")
+    with patch.object(result_cache.time, "monotonic", return_value=111.0):
+        assert await cache.get(_key()) is None
+
+
+# ============================================================================
+# Group 3: Disk tier
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_new_instance(tmp_path):
+    await ResultCache(disk_ttl=60, base_dir=tmp_path).set(_key(), "00:00 - Intro")
+
+    assert (tmp_path / _key().filename).exists()
+
+    cache = ResultCache(disk_ttl=60, base_dir=tmp_path)
+    assert await cache.get(_key()) == "00:00 - Intro"
+    assert cache.stats()["disk_hits"] == 1
+
+    # Promoted to the memory tier after the disk hit.
+    assert await cache.get(_key()) == "00:00 - Intro"
+    assert cache.stats()["memory_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_expires_entries(tmp_path):
+    with patch.object(result_cache.time, "time", return_value=1000.0):
+        await ResultCache(disk_ttl=60, base_dir=tmp_path).set(_key(), "00:00 - Intro")
+
+    cache = ResultCache(disk_ttl=60, base_dir=tmp_path)
+    with patch.object(result_cache.time, "time", return_value=1061.0):
+        assert await cache.get(_key()) is None
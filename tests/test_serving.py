@@ -0,0 +1,147 @@
+import asyncio
+import os
+from pathlib import Path
+import signal
+import subprocess
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from app import app
+from services import jobs
+from services.jobs import JobStore, JobWorkerPool
+from utils.background_loop import BACKGROUND_LOOP, BackgroundLoop
+from utils.logging_config import request_id_var
+from utils.wsgi import DrainMiddleware
+
+SAMPLE_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+# ============================================================================
+# Group 1: One shared event loop
+# ============================================================================
+
+
+def test_async_views_share_the_background_loop():
+    seen = []
+
+    async def process(*_args):
+        seen.append((asyncio.get_running_loop(), request_id_var.get()))
+        return "00:00 - Intro"
+
+    client = app.test_client()
+    with patch("services.video_processor.process_video_timestamp", side_effect=process):
+        first = client.post("/api/timestamp/generate", json={"url": SAMPLE_URL})
+        second = client.post("/api/timestamp/generate", json={"url": SAMPLE_URL})
+
+    assert first.status_code == second.status_code == 200
+    assert seen[0][0] is seen[1][0] is BACKGROUND_LOOP.loop
+    assert [request_id for _, request_id in seen] == [
+        first.headers["X-Request-ID"],
+        second.headers["X-Request-ID"],
+    ]
+
+
+def test_streams_run_on_the_background_loop():
+    loops = []
+
+    async def stream(*_args):
+        for line in ("00:00 - Intro", "01:00 - Main"):
+            loops.append(asyncio.get_running_loop())
+            yield "timestamp", line
+
+    with patch("services.video_processor.stream_video_timestamp", side_effect=stream):
+        response = app.test_client().post("/api/timestamp/stream", json={"url": SAMPLE_URL})
+
+    assert "data: 01:00 - Main" in response.get_data(as_text=True)
+    assert loops == [BACKGROUND_LOOP.loop] * 2
+
+
+# ============================================================================
+# Group 2: Graceful shutdown
+# ============================================================================
+
+
+def test_drain_waits_for_open_streams_and_rejects_new_requests():
+    release = threading.Event()
+
+    def events():
+        yield b"first"
+        release.wait(5)
+        yield b"last"
+
+    server_app = DrainMiddleware(Response(events()))
+    client = Client(server_app)
+    response = client.get("/")
+    body = response.iter_encoded()
+    assert next(body) == b"first"
+    assert server_app.in_flight() == 1
+
+    assert server_app.drain(0.05) is False
+    assert client.get("/").status_code == 503
+
+    threading.Timer(0.05, release.set).start()
+    assert list(body) == [b"last"]
+    response.close()
+    assert server_app.drain(1) is True
+
+
+def test_job_pool_stop_lets_running_jobs_finish(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    loop = BackgroundLoop("test-loop")
+    pool = JobWorkerPool(store, concurrency=1, loop=loop, poll_interval=0.05)
+
+    async def process(*_args):
+        await asyncio.sleep(0.2)
+        return "00:00 - Intro"
+
+    try:
+        with patch("services.video_processor.process_video_timestamp", side_effect=process):
+            running = store.submit(SAMPLE_URL)
+            pool.start()
+            deadline = time.monotonic() + 5
+            while store.get(running.id).status != jobs.RUNNING and time.monotonic() < deadline:
+                time.sleep(0.01)
+            waiting = store.submit(SAMPLE_URL)
+
+            assert pool.stop(5) is True
+    finally:
+        loop.stop()
+
+    assert store.get(running.id).status == jobs.DONE
+    assert store.get(waiting.id).status == jobs.QUEUED
+
+
+def test_sigterm_drains_and_exits_cleanly(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k not in ("GEMINI_API_KEY", "GEMINI_API_KEYS")}
+    env.update(LOG_DIR=str(tmp_path), JOBS_DB=str(tmp_path / "jobs.sqlite3"))
+    log = tmp_path / "app.log"
+    server = subprocess.Popen(
+        [sys.executable, "cli/serve.py", "--host", "127.0.0.1", "--port", "0"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while not (log.exists() and "job workers" in log.read_text(encoding="utf-8")):
+            assert server.poll() is None
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        server.send_signal(signal.SIGTERM)
+        _stdout, stderr = server.communicate(timeout=30)
+    finally:
+        server.kill()
+
+    assert server.returncode == 0, stderr
+    assert "Traceback" not in stderr
+    text = log.read_text(encoding="utf-8")
+    assert "Server stopped" in text
+    assert "Second signal" not in text
@@ -0,0 +1,175 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services import video_processor
+from services.youtube import TranscriptEntry
+from utils.singleflight import SingleFlight
+
+SAMPLE_URL = "https://www.youtube.com/watch?v=Q9gxKxGLmkc&t=131s"
+
+
+# ============================================================================
+# Group 1: SingleFlight
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flights.do("key", work) for _ in range(10)))
+
+    assert results == ["result"] * 10
+    assert calls == 1
+    assert flights.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately():
+    flights = SingleFlight()
+    work = AsyncMock(side_effect=["a", "b"])
+
+    results = await asyncio.gather(flights.do("a", work), flights.do("b", work))
+
+    assert sorted(results) == ["a", "b"]
+    assert work.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_exception_propagates_to_every_waiter():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(flights.do("key", work) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_waiter_takes_over_when_leader_is_cancelled():
+    flights = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    leader = asyncio.create_task(flights.do("key", work))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flights.do("key", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == 2
+    assert leader.cancelled()
+
+
+# ============================================================================
+# Group 2: Video processor coalescing
+# ============================================================================
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_transcript_and_gemini_calls():
+    async def slow_transcript(*_args):
+        await asyncio.sleep(0.01)
+        return [TranscriptEntry(start=0.0, duration=2.0, text="hello")]
+
+    with (
+        patch.object(video_processor.config, "RESULT_CACHE_ENABLED", False),
+        patch(
+            "services.youtube.async_get_transcript_entries", side_effect=slow_transcript
+        ) as transcript,
+        patch(
+            "services.gemini.evaluate_timestamps", AsyncMock(return_value=["00:00 - Intro"])
+        ) as evaluate,
+    ):
+        results = await asyncio.gather(
+            *(video_processor.process_video_timestamp(SAMPLE_URL, "", "th") for _ in range(5))
+        )
+
+    assert results == ["00:00 - Intro"] * 5
+    assert transcript.call_count == 1
+    assert evaluate.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_streams_share_one_gemini_stream():
+    calls = 0
+
+    async def stream(*_args, **_kwargs):
+        nonlocal calls
+        calls += 1
+        for line in ("00:00 - Intro", "00:01 - Outro"):
+            await asyncio.sleep(0.01)
+            yield line
+
+    async def collect():
+        return [
+            line
+            async for _event, line in video_processor.stream_video_timestamp(SAMPLE_URL, "", "th")
+        ]
+
+    with (
+        patch.object(video_processor.config, "RESULT_CACHE_ENABLED", False),
+        patch(
+            "services.youtube.async_get_transcript_entries",
+            AsyncMock(return_value=[TranscriptEntry(start=0.0, duration=2.0, text="hello")]),
+        ),
+        patch("services.gemini.stream_timestamps", stream),
+        patch("services.gemini.evaluate_timestamps", AsyncMock()) as evaluate,
+    ):
+        results = await asyncio.gather(collect(), collect(), collect())
+
+    assert results == [["00:00 - Intro", "00:01 - Outro"]] * 3
+    assert calls == 1
+    evaluate.assert_not_awaited()
+    assert video_processor.GENERATION_FLIGHTS.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_follower_takes_over_when_leader_disconnects():
+    async def stream(*_args, **_kwargs):
+        await asyncio.sleep(0.01)
+        yield "00:00 - Intro"
+        await asyncio.sleep(1)
+        yield "00:01 - Outro"
+
+    with (
+        patch.object(video_processor.config, "RESULT_CACHE_ENABLED", False),
+        patch(
+            "services.youtube.async_get_transcript_entries",
+            AsyncMock(return_value=[TranscriptEntry(start=0.0, duration=2.0, text="hello")]),
+        ),
+        patch("services.gemini.stream_timestamps", stream),
+        patch(
+            "services.gemini.evaluate_timestamps", AsyncMock(return_value=["00:00 - Intro"])
+        ) as evaluate,
+    ):
+        leader = video_processor.stream_video_timestamp(SAMPLE_URL, "", "th")
+        assert await anext(leader) == ("timestamp", "00:00 - Intro")
+        follower = asyncio.create_task(
+            anext(video_processor.stream_video_timestamp(SAMPLE_URL, "", "th"))
+        )
+        await asyncio.sleep(0.01)
+        await leader.aclose()
+
+        assert await follower == ("timestamp", "00:00 - Intro")
+
+    evaluate.assert_awaited_once()
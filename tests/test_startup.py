@@ -0,0 +1,77 @@
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+from services.gemini_pool import GeminiPool
+from services.rate_limit import InProcessRateLimiter, Quota
+from utils import startup
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_python(code: str) -> subprocess.CompletedProcess[str]:
+    env = {k: v for k, v in os.environ.items() if k not in ("GEMINI_API_KEY", "GEMINI_API_KEYS")}
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+
+# ============================================================================
+# Group 1: Lazy imports
+# ============================================================================
+
+
+def test_cli_and_app_start_without_the_sdk_or_a_key():
+    result = run_python(
+        "import sys, app, cli.manage\n"
+        "assert 'google.genai' not in sys.modules, 'google.genai imported at startup'"
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_help_runs_without_a_key():
+    result = run_python(
+        "import sys, asyncio\n"
+        "sys.argv = ['manage.py', '--help']\n"
+        "from cli.manage import main\n"
+        "asyncio.run(main())"
+    )
+    assert result.returncode == 0, result.stderr
+    assert "--profile-startup" in result.stdout
+
+
+@pytest.mark.asyncio
+async def test_pool_without_keys_fails_on_first_use():
+    pool = GeminiPool(api_keys=[], models=["gemini-2.5-flash"])
+
+    with pytest.raises(ValueError, match="GEMINI_API_KEY"):
+        await pool.acquire(InProcessRateLimiter(Quota(rpm=10)))
+
+
+# ============================================================================
+# Group 2: Startup report
+# ============================================================================
+
+
+def test_report_sums_self_time_per_package():
+    lines = [
+        "import time: self [us] | cumulative | imported package",
+        "import time:       300 |        300 |     google.genai.types",
+        "import time:       100 |        400 |   google.genai",
+        "import time:        50 |         50 | json",
+    ]
+    profile = startup.StartupProfile("app", 0.5, startup.parse_importtime(lines))
+
+    assert [package for package, _ in profile.by_package()] == ["google", "json"]
+    assert profile.by_package()[0][1] == pytest.approx(0.0004)
+    report = startup.format_report(profile)
+    assert report.startswith("Cold start of app: 0.50s wall, 0.00s importing 3 modules")
+    assert "     0.4 ms  google" in report
@@ -0,0 +1,96 @@
+from unittest.mock import patch
+
+import pytest
+
+from services import video_processor
+from services.transcript_compaction import clean_text, compact_transcript, merge_windows
+from services.youtube import TranscriptEntry
+
+
+def _entry(start, text, duration=2.0):
+    return TranscriptEntry(start=float(start), duration=duration, text=text)
+
+
+# ============================================================================
+# Group 1: Text cleanup
+# ============================================================================
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("[Music]", ""),
+        ("♪ la la ♪", "la"),
+        ("so um I think, uh, we should", "so I think, we should"),
+        ("the the the plan", "the plan"),
+        ("(Applause) thank you\nall", "thank you all"),
+        ("เอ่อ สวัสดีครับ", "สวัสดีครับ"),
+    ],
+)
+def test_clean_text(text, expected):
+    assert clean_text(text) == expected
+
+
+def test_clean_text_can_keep_fillers():
+    assert clean_text("um okay", drop_fillers=False) == "um okay"
+
+
+# ============================================================================
+# Group 2: Entries
+# ============================================================================
+
+
+def test_merge_windows_groups_adjacent_fragments():
+    entries = [_entry(0, "a"), _entry(3, "b"), _entry(9, "c"), _entry(10, "d"), _entry(25, "e")]
+
+    merged = merge_windows(entries, window_seconds=10)
+
+    assert [(entry.start, entry.text) for entry in merged] == [
+        (0.0, "a b c"),
+        (10.0, "d"),
+        (25.0, "e"),
+    ]
+    assert merged[0].duration == 11.0
+
+
+def test_compact_transcript_drops_tags_and_repeats_and_reports_tokens():
+    entries = [
+        _entry(0, "[Music]"),
+        _entry(2, "welcome back everyone"),
+        _entry(4, "welcome back everyone"),
+        _entry(6, "uh today we build a robot"),
+    ]
+
+    compacted, report = compact_transcript(entries, window_seconds=0)
+
+    assert [entry.text for entry in compacted] == [
+        "welcome back everyone",
+        "today we build a robot",
+    ]
+    assert compacted[0].duration == 4.0
+    assert report.entries_before == 4
+    assert report.entries_after == 2
+    assert report.tokens_after < report.tokens_before
+    assert 0 < report.saved_ratio < 1
+
+
+@pytest.mark.parametrize(
+    "setting",
+    [
+        ("COMPACT_TRANSCRIPT", False),
+        ("COMPACT_WINDOW_SECONDS", 30),
+        ("COMPACT_DROP_FILLERS", False),
+    ],
+)
+def test_compaction_settings_change_the_cache_key(setting):
+    with (
+        patch("config.COMPACT_TRANSCRIPT", True),
+        patch("config.COMPACT_WINDOW_SECONDS", 10),
+        patch("config.COMPACT_DROP_FILLERS", True),
+    ):
+        key = video_processor.make_cache_key("abc", "en", "")
+        with patch(f"config.{setting[0]}", setting[1]):
+            changed = video_processor.make_cache_key("abc", "en", "")
+
+    assert changed.digest != key.digest
+    assert changed.variant != key.variant
@@ -0,0 +1,86 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services import youtube
+from services.transcript_store import TranscriptStore
+from services.youtube import TranscriptEntry
+
+VIDEO_ID = "Q9gxKxGLmkc"
+
+
+def _entries(count, text="สวัสดีครับ hello"):
+    return [TranscriptEntry(float(i), 2.5, f"{text} {i}") for i in range(count)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TranscriptStore(tmp_path / "transcripts.sqlite3", max_bytes=1024 * 1024)
+
+
+# ============================================================================
+# Group 1: Store
+# ============================================================================
+
+
+def test_round_trip_keeps_raw_entries(store):
+    entries = _entries(3)
+    store.put(VIDEO_ID, "th", entries)
+
+    assert [TranscriptEntry(*item) for item in store.get(VIDEO_ID, "th")] == entries
+    assert store.get(VIDEO_ID, "en") is None
+
+
+def test_creates_missing_directory(tmp_path):
+    store = TranscriptStore(tmp_path / "missing" / "t.sqlite3", max_bytes=1024 * 1024)
+
+    assert store.get(VIDEO_ID, "th") is None
+    store.put(VIDEO_ID, "th", _entries(1))
+    assert store.get(VIDEO_ID, "th") is not None
+
+
+def test_evicts_least_recently_read_when_over_size(tmp_path):
+    store = TranscriptStore(tmp_path / "transcripts.sqlite3", max_bytes=1)
+    store.put("aaaaaaaaaaa", "th", _entries(5))
+    store.put("bbbbbbbbbbb", "th", _entries(5))
+
+    assert store.get("aaaaaaaaaaa", "th") is None
+    assert store.stats()["transcripts"] <= 1
+
+
+def test_reading_refreshes_recency(tmp_path):
+    store = TranscriptStore(tmp_path / "transcripts.sqlite3", max_bytes=1024 * 1024)
+    with patch("services.transcript_store.time.time", side_effect=[1.0, 2.0, 3.0, 4.0]):
+        store.put("aaaaaaaaaaa", "th", _entries(50))
+        store.put("bbbbbbbbbbb", "th", _entries(50))
+        store.get("aaaaaaaaaaa", "th")
+    # Shrink the budget so only one transcript fits, then trigger eviction.
+    store.max_bytes = store.stats()["bytes"] - 1
+    store.put("ccccccccccc", "th", [])
+
+    assert store.get("bbbbbbbbbbb", "th") is None
+    assert store.get("aaaaaaaaaaa", "th") is not None
+
+
+# ============================================================================
+# Group 2: youtube.get_transcript_entries
+# ============================================================================
+
+
+def test_second_fetch_skips_network(store):
+    track = MagicMock(language_code="th", is_generated=False)
+    track.fetch.return_value = [MagicMock(start=0.0, duration=1.5, text="hello")]
+    api = MagicMock()
+    api.return_value.list.return_value = [track]
+
+    with (
+        patch.object(youtube, "TRACK_LISTS", youtube.TrackListCache(ttl=60, max_entries=8)),
+        patch.object(youtube, "TRANSCRIPT_STORE", store),
+        patch.object(youtube.config, "TRANSCRIPT_STORE_ENABLED", True),
+        patch.object(youtube, "YouTubeTranscriptApi", api),
+    ):
+        first = youtube.get_transcript_entries(VIDEO_ID, ["th"])
+        second = youtube.get_transcript_entries(VIDEO_ID, ["th"])
+
+    assert first == second == [TranscriptEntry(0.0, 1.5, "hello")]
+    assert track.fetch.call_count == 1
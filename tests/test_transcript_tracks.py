@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from youtube_transcript_api import NoTranscriptFound
+
+from services import youtube
+from services.youtube import TrackListCache, TranscriptEntry, select_track
+
+VIDEO_ID = "Q9gxKxGLmkc"
+
+
+@dataclass
+class FakeTrack:
+    language_code: str
+    is_generated: bool = False
+
+    def fetch(self):
+        return [MagicMock(start=0.0, duration=2.0, text=f"{self.language_code} captions")]
+
+
+# ============================================================================
+# Group 1: Track selection
+# ============================================================================
+
+
+@pytest.mark.parametrize(
+    ("tracks", "languages", "expected"),
+    [
+        # Requested language: manual before auto-generated, exact code before variant.
+        ([FakeTrack("en", True), FakeTrack("th")], ["th"], ("th", "requested")),
+        ([FakeTrack("th", True), FakeTrack("th-TH")], ["th"], ("th-TH", "requested")),
+        ([FakeTrack("en-GB"), FakeTrack("en-US")], ["en-US"], ("en-US", "requested")),
+        ([FakeTrack("pt-BR", True)], ["pt"], ("pt-BR", "requested")),
+        # Later requested languages before any fallback.
+        ([FakeTrack("ja", True), FakeTrack("en")], ["th", "en"], ("en", "requested")),
+        # Original language: the manual track in the auto-captioned language.
+        ([FakeTrack("de"), FakeTrack("ja"), FakeTrack("ja", True)], ["th"], ("ja", "original")),
+        ([FakeTrack("de"), FakeTrack("ja", True)], ["th"], ("ja", "generated")),
+        ([FakeTrack("de"), FakeTrack("fr")], ["th"], ("de", "available")),
+    ],
+)
+def test_select_track_fallback_order(tracks, languages, expected):
+    track, reason = select_track(tracks, languages)
+
+    assert (track.language_code, reason) == expected
+
+
+def test_select_track_without_tracks():
+    assert select_track([], ["th"]) is None
+
+
+# ============================================================================
+# Group 2: Fetching
+# ============================================================================
+
+
+@pytest.fixture
+def api():
+    api = MagicMock()
+    api.return_value.list.return_value = [FakeTrack("en"), FakeTrack("en", True)]
+    with (
+        patch.object(youtube, "YouTubeTranscriptApi", api),
+        patch.object(youtube, "TRACK_LISTS", TrackListCache(ttl=60, max_entries=8)),
+        patch.object(youtube.config, "TRANSCRIPT_STORE_ENABLED", False),
+    ):
+        yield api
+
+
+def test_missing_language_falls_back_instead_of_failing(api):
+    entries = youtube.get_transcript_entries(VIDEO_ID, ["th"])
+
+    assert entries == [TranscriptEntry(0.0, 2.0, "en captions")]
+
+
+def test_mixed_languages_list_each_video_once(api):
+    def slow_list(video_id):
+        time.sleep(0.05)
+        return [FakeTrack("th"), FakeTrack("en", True)]
+
+    api.return_value.list.side_effect = slow_list
+    threads = [
+        threading.Thread(target=youtube.get_transcript_entries, args=(VIDEO_ID, [language]))
+        for language in ("th", "en", "th", "ja")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    youtube.get_transcript_entries("other000000", ["en"])
+
+    assert [call.args for call in api.return_value.list.call_args_list] == [
+        (VIDEO_ID,),
+        ("other000000",),
+    ]
+
+
+def test_video_without_tracks_raises(api):
+    api.return_value.list.return_value = []
+
+    with pytest.raises(NoTranscriptFound):
+        youtube.get_transcript_entries(VIDEO_ID, ["th"])
+
+
+def test_listing_expires_after_ttl(api):
+    cache = TrackListCache(ttl=0.01, max_entries=8)
+
+    cache.get(VIDEO_ID)
+    time.sleep(0.02)
+    cache.get(VIDEO_ID)
+
+    assert api.return_value.list.call_count == 2
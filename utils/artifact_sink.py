@@ -0,0 +1,258 @@
+from abc import ABC, abstractmethod
+import atexit
+import logging
+import os
+from pathlib import Path
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+
+import config
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Writes queued within this window are committed together.
+FLUSH_INTERVAL_SECONDS = 0.5
+MAX_BATCH = 256
+# How often SQLiteSink deletes rows older than its retention.
+PRUNE_INTERVAL_SECONDS = 60 * 60
+
+ARTIFACT_WRITES = metrics.REGISTRY.register(
+    metrics.Counter(
+        "youtamp_artifact_writes_total",
+        "Debug and audit artifacts by result (written, inline, failed).",
+        ("result",),
+    )
+)
+
+
+def atomic_write(path: Path, data: str) -> None:
+    """Writes ``data`` to a temp file next to ``path`` and renames it into place.
+
+    Readers see either the old file or the complete new one, never a partial write.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        tmp_path.replace(path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+class ArtifactSink(ABC):
+    """Queues artifact writes and stores them in batches on a background thread.
+
+    ``put`` never touches the disk, so request handlers do not wait on I/O. When
+    more than ``max_pending`` writes are queued (the disk cannot keep up) it
+    returns False instead of queueing, and the caller stores the artifact with
+    ``write`` off the request path, since prompts and responses are kept for
+    auditing and must not be lost.
+    """
+
+    def __init__(self, max_pending: int = 1000) -> None:
+        self.max_pending = max_pending
+        self._queue: queue.Queue[tuple[str, str] | None] = queue.Queue()
+        # Latest queued value per name, so reads see writes that are not flushed yet.
+        self._pending: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def put(self, name: str, data: str) -> bool:
+        """Queues a write. Returns False, without storing anything, when the queue is full."""
+        with self._lock:
+            if len(self._pending) >= self.max_pending and name not in self._pending:
+                return False
+            self._pending[name] = data
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="artifact-sink", daemon=True
+                )
+                self._thread.start()
+        self._queue.put((name, data))
+        return True
+
+    def write(self, name: str, data: str) -> None:
+        """Stores one artifact in the calling thread, for saves ``put`` could not queue."""
+        logger.warning(f"Artifact queue full, writing {name} outside the background writer")
+        try:
+            with metrics.span("artifact_write"):
+                self._write({name: data})
+            ARTIFACT_WRITES.inc(result="inline")
+        except Exception:
+            ARTIFACT_WRITES.inc(result="failed")
+            logger.exception(f"Could not store artifact {name}")
+
+    def read(self, name: str) -> str | None:
+        with self._lock:
+            if name in self._pending:
+                return self._pending[name]
+        return self._read(name)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Blocks until everything queued so far is stored. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+
+    def close(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch: dict[str, str] = {}
+            deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                if item[0]:
+                    batch[item[0]] = item[1]
+                if len(batch) >= MAX_BATCH:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            self._store_batch(batch)
+            if stop:
+                return
+
+    def _store_batch(self, batch: dict[str, str]) -> None:
+        if not batch:
+            return
+        try:
+            with metrics.span("artifact_write"):
+                self._write(batch)
+            ARTIFACT_WRITES.inc(len(batch), result="written")
+        except Exception:
+            ARTIFACT_WRITES.inc(len(batch), result="failed")
+            logger.exception(f"Could not store {len(batch)} artifacts")
+        finally:
+            with self._lock:
+                for name, data in batch.items():
+                    # A newer value queued meanwhile stays pending for the next batch.
+                    if self._pending.get(name) is data:
+                        del self._pending[name]
+
+    @abstractmethod
+    def _write(self, batch: dict[str, str]) -> None: ...
+
+    @abstractmethod
+    def _read(self, name: str) -> str | None: ...
+
+
+class DirectorySink(ArtifactSink):
+    """One file per artifact under ``base_dir`` (``<video_id>/prompt.txt``), written atomically."""
+
+    def __init__(self, base_dir: Path, max_pending: int = 1000) -> None:
+        super().__init__(max_pending)
+        self.base_dir = Path(base_dir)
+
+    def _write(self, batch: dict[str, str]) -> None:
+        for name, data in batch.items():
+            atomic_write(self.base_dir / name, data)
+
+    def _read(self, name: str) -> str | None:
+        try:
+            return (self.base_dir / name).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+
+class SQLiteSink(ArtifactSink):
+    """Append-only, zlib-compressed artifact log in a single SQLite file.
+
+    Every write is a new row; reads return the latest row for a name. Keeps the
+    file count at one no matter how many videos are processed. Rows older than
+    ``retention`` seconds are deleted (0 keeps them forever).
+    """
+
+    def __init__(self, path: Path, max_pending: int = 1000, retention: float = 0) -> None:
+        super().__init__(max_pending)
+        self.path = Path(path)
+        self.retention = retention
+        self._initialized = False
+        self._last_prune = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " name TEXT NOT NULL,"
+                " data BLOB NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS artifacts_name ON artifacts (name)")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS artifacts_created_at ON artifacts (created_at)"
+            )
+            self._initialized = True
+        return connection
+
+    def _write(self, batch: dict[str, str]) -> None:
+        now = time.time()
+        rows = [(name, zlib.compress(data.encode()), now) for name, data in batch.items()]
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO artifacts (name, data, created_at) VALUES (?, ?, ?)", rows
+                )
+                if self.retention > 0 and now - self._last_prune >= PRUNE_INTERVAL_SECONDS:
+                    self._last_prune = now
+                    pruned = connection.execute(
+                        "DELETE FROM artifacts WHERE created_at < ?", (now - self.retention,)
+                    ).rowcount
+                    if pruned:
+                        logger.info(f"Pruned {pruned} artifacts older than {self.retention:.0f}s")
+        finally:
+            connection.close()
+
+    def _read(self, name: str) -> str | None:
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT data FROM artifacts WHERE name = ? ORDER BY id DESC LIMIT 1", (name,)
+            ).fetchone()
+        finally:
+            connection.close()
+        return zlib.decompress(row[0]).decode() if row else None
+
+
+def create_sink(backend: str = config.ARTIFACT_SINK) -> ArtifactSink:
+    if backend == "sqlite":
+        return SQLiteSink(
+            config.ARTIFACT_DB, config.ARTIFACT_QUEUE_SIZE, config.ARTIFACT_RETENTION_SECONDS
+        )
+    if backend != "directory":
+        logger.warning(f"Unknown ARTIFACT_SINK {backend!r}, using 'directory'")
+    return DirectorySink(config.ARTIFACTS_DIR, config.ARTIFACT_QUEUE_SIZE)
+
+
+ARTIFACT_SINK = create_sink()
+atexit.register(ARTIFACT_SINK.close)
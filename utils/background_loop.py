@@ -0,0 +1,87 @@
+import asyncio
+from collections.abc import Coroutine
+import concurrent.futures
+import logging
+import threading
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """An event loop running forever on a daemon thread.
+
+    Async views and streams (see ``app.Youtamp``) and long-running work (job
+    workers, timers) all run here, so they share one set of clients and limiters
+    and background work outlives the request that started it.
+    """
+
+    def __init__(self, name: str = "background-loop") -> None:
+        self.name = name
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        self.start()
+        assert self._loop is not None
+        return self._loop
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.is_running():
+                return
+            ready = threading.Event()
+
+            def run() -> None:
+                self._loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self._loop)
+                ready.set()
+                try:
+                    self._loop.run_forever()
+                finally:
+                    self._loop.close()
+
+            self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            logger.info(f"Started {self.name}")
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> concurrent.futures.Future[T]:
+        """Schedules ``coro`` on the loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback: Any, *args: Any) -> None:
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            if not self.is_running():
+                return
+            loop, thread = self._loop, self._thread
+            assert loop is not None
+            assert thread is not None
+
+            async def cancel_all() -> None:
+                tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            try:
+                asyncio.run_coroutine_threadsafe(cancel_all(), loop).result(timeout)
+            except (concurrent.futures.TimeoutError, RuntimeError):
+                logger.warning(f"{self.name} did not cancel its tasks within {timeout}s")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            self._thread = None
+            logger.info(f"Stopped {self.name}")
+
+
+BACKGROUND_LOOP = BackgroundLoop()
@@ -1,29 +1,34 @@
+import asyncio
+from collections.abc import Iterable, Sequence
 import logging
-from collections.abc import Iterable
 from pathlib import Path
 
 import aiofiles
 
 import config
+from utils import metrics
+from utils.artifact_sink import ARTIFACT_SINK, atomic_write
 
 logger = logging.getLogger(__name__)
 
 
+def _store(filename: str, data: str) -> None:
+    if not ARTIFACT_SINK.put(filename, data):
+        ARTIFACT_SINK.write(filename, data)
+
+
+async def _async_store(filename: str, data: str) -> None:
+    # The overflow write goes to a worker thread so it never blocks the event loop.
+    if not ARTIFACT_SINK.put(filename, data):
+        await asyncio.to_thread(ARTIFACT_SINK.write, filename, data)
+
+
 async def async_write_file(
     data: str,
     filename: str,
     base_dir_name: Path = config.ARTIFACTS_DIR,
 ) -> None:
-    file_path = Path(base_dir_name) / filename
-    directory_path = file_path.parent
-    directory_path.mkdir(parents=True, exist_ok=True)
-    try:
-        async with aiofiles.open(file_path, "w") as f:
-            await f.write(data)
-        logger.info(f"File saved: {file_path}")
-    except Exception as e:
-        logger.error(f"File write failed: {file_path} ({e})", exc_info=True)
-        raise
+    await asyncio.to_thread(write_file, data, filename, base_dir_name)
 
 
 async def async_read_file(
@@ -52,27 +57,25 @@ async def async_save_timestamps_to_file(
     filename = f"{folder_name}/timestamps.txt"
     if config.SAVE_RESPONSE and timestamps:
         logger.info(f"Saving timestamps to {filename}")
-        timestamps_text = "\n".join(timestamps)
-        await async_write_file(timestamps_text, filename)
+        await _async_store(filename, "\n".join(timestamps))
 
 
-async def async_save_prompt_to_file(prompt: str, folder_name: str) -> None:
+async def async_save_prompt_to_file(prompt: str | Sequence[str], folder_name: str) -> None:
+    """Saves a prompt, given whole or as the parts sent to Gemini."""
     filename = f"{folder_name}/prompt.txt"
     if config.SAVE_PROMPT:
         logger.info(f"Saving prompt to {filename}")
-        await async_write_file(prompt, filename)
+        await _async_store(filename, prompt if isinstance(prompt, str) else "".join(prompt))
 
 
 async def async_load_prompt_from_file(folder_name: str) -> str | None:
     filename = f"{folder_name}/prompt.txt"
     if config.LOAD_PROMPT:
         logger.info(f"Loading prompt from {filename}")
-        try:
-            prompt = await async_read_file(filename)
-            return prompt
-        except FileNotFoundError:
+        prompt = await asyncio.to_thread(ARTIFACT_SINK.read, filename)
+        if prompt is None:
             logger.warning(f"Prompt file not found: {filename}")
-            return None
+        return prompt
     return None
 
 
@@ -80,7 +83,7 @@ async def async_save_response_to_file(response: str, folder_name: str) -> None:
     filename = f"{folder_name}/response.json"
     if config.SAVE_RESPONSE:
         logger.info(f"Saving response to {filename}")
-        await async_write_file(response, filename)
+        await _async_store(filename, response)
 
 
 def write_file(
@@ -89,11 +92,9 @@ def write_file(
     base_dir_name: Path = config.ARTIFACTS_DIR,
 ) -> None:
     file_path = Path(base_dir_name) / filename
-    directory_path = file_path.parent
-    directory_path.mkdir(parents=True, exist_ok=True)
     try:
-        with Path.open(file_path, "w") as f:
-            f.write(data)
+        with metrics.span("artifact_write"):
+            atomic_write(file_path, data)
         logger.info(f"File saved: {file_path}")
     except Exception as e:
         logger.error(f"File write failed: {file_path} ({e})", exc_info=True)
@@ -123,27 +124,25 @@ def save_timestamps_to_file(
     filename = f"{folder_name}/timestamps.txt"
     if config.SAVE_RESPONSE and timestamps:
         logger.info(f"Saving timestamps to {filename}")
-        timestamps_text = "\n".join(timestamps)
-        write_file(timestamps_text, filename)
+        _store(filename, "\n".join(timestamps))
 
 
-def save_prompt_to_file(prompt: str, folder_name: str) -> None:
+def save_prompt_to_file(prompt: str | Sequence[str], folder_name: str) -> None:
+    """Saves a prompt, given whole or as the parts sent to Gemini."""
     filename = f"{folder_name}/prompt.txt"
     if config.SAVE_PROMPT:
         logger.info(f"Saving prompt to {filename}")
-        write_file(prompt, filename)
+        _store(filename, prompt if isinstance(prompt, str) else "".join(prompt))
 
 
 def load_prompt_from_file(folder_name: str) -> str | None:
     filename = f"{folder_name}/prompt.txt"
     if config.LOAD_PROMPT:
         logger.info(f"Loading prompt from {filename}")
-        try:
-            prompt = read_file(filename)
-            return prompt
-        except FileNotFoundError:
+        prompt = ARTIFACT_SINK.read(filename)
+        if prompt is None:
             logger.warning(f"Prompt file not found: {filename}")
-            return None
+        return prompt
     return None
 
 
@@ -151,4 +150,4 @@ def save_response_to_file(response: str, folder_name: str) -> None:
     filename = f"{folder_name}/response.txt"
     if config.SAVE_RESPONSE:
         logger.info(f"Saving response to {filename}")
-        write_file(response, filename)
+        _store(filename, response)
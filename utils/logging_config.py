@@ -1,9 +1,31 @@
+import atexit
+import contextvars
+from datetime import UTC, datetime
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
 from pathlib import Path
+import queue
+import random
+from typing import TYPE_CHECKING
+import zlib
 
-from flask import Flask
+import config
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+# Set per request (or per background job) and stamped onto every log record, so
+# all lines for one generation can be found together.
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="")
+video_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("video_id", default="")
+
+# Loggers whose INFO lines are per-stage chatter and subject to LOG_SAMPLE_RATE.
+SAMPLED_LOGGERS = ("services.", "utils.")
+
+_listener: QueueListener | None = None
+_queue_handler: QueueHandler | None = None
 
 
 class EmojiFormatter(logging.Formatter):
@@ -20,37 +42,159 @@ class EmojiFormatter(logging.Formatter):
     def format(self, record):
         # Get the original formatter's output
         s = super().format(record)
+        request_id = getattr(record, "request_id", "")
+        if request_id:
+            s = f"[{request_id}] {s}"
         # Prepend the emoji
         emoji = self.LEVEL_EMOJIS.get(record.levelno, "➡️")
         return f"{emoji} {s}"
 
 
-def setup_logging(app: Flask) -> None:
-    """Configures logging for the Flask application."""
-    # Create logs directory if it doesn't exist
-    log_dir = Path("logs")
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ("request_id", "video_id"):
+            value = getattr(record, field, "")
+            if value:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the request and video IDs from context variables onto the record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.video_id = video_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only ``rate`` of the INFO and DEBUG lines from ``SAMPLED_LOGGERS``.
+
+    Warnings and errors always pass. Sampling is by request ID when there is one,
+    so a request is logged either in full or not at all.
+    """
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1 or record.levelno >= logging.WARNING:
+            return True
+        if not record.name.startswith(SAMPLED_LOGGERS):
+            return True
+        request_id = getattr(record, "request_id", "")
+        if request_id:
+            return zlib.crc32(request_id.encode()) / 0xFFFFFFFF < self.rate
+        return random.random() < self.rate
+
+
+class PreparedQueueHandler(QueueHandler):
+    """Queues records with the message rendered but the traceback kept separate.
+
+    The stock handler folds the traceback into ``msg`` on the calling thread, which
+    both costs time there and loses it as a separate field for the JSON formatter.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+
+def configure_logging(
+    log_dir: Path = Path("logs"),
+    level: int = logging.INFO,
+    log_format: str = "text",
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 10,
+    sample_rate: float = 1.0,
+) -> QueueListener:
+    """Routes the root logger through a queue to a rotating file written on a background thread.
+
+    Callers only pay for filtering and putting the record on the queue; formatting
+    and disk I/O happen on the listener thread.
+    """
+    stop_logging()
+
     log_dir.mkdir(parents=True, exist_ok=True)
+    file_handler = RotatingFileHandler(
+        log_dir / "app.log", maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    if log_format == "json":
+        file_handler.setFormatter(JSONFormatter())
+    else:
+        file_handler.setFormatter(
+            EmojiFormatter("%(asctime)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+        )
+    file_handler.setLevel(level)
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = PreparedQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _queue_handler = queue_handler
+    _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
 
+def stop_logging() -> None:
+    """Flushes queued records and stops the listener thread."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def setup_logging(app: "Flask") -> None:
+    """Configures logging for the Flask application."""
     # Determine log level from environment variable, default to INFO
     log_level_str = os.environ.get("LOG_LEVEL", "INFO").upper()
     log_level = getattr(logging, log_level_str, logging.INFO)
 
-    # Set up a rotating file handler
-    file_handler = RotatingFileHandler(
-        log_dir / "app.log", maxBytes=10240, backupCount=10
-    )
-
-    # Use the custom EmojiFormatter and a cleaner format
-    formatter = EmojiFormatter(
-        "%(asctime)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+    configure_logging(
+        log_dir=Path(os.environ.get("LOG_DIR", "logs")),
+        level=log_level,
+        log_format=os.environ.get("LOG_FORMAT", "text").lower(),
+        max_bytes=config.get_int_env("LOG_MAX_BYTES", 10 * 1024 * 1024),
+        backup_count=config.get_int_env("LOG_BACKUP_COUNT", 10),
+        sample_rate=config.get_float_env("LOG_SAMPLE_RATE", 1.0),
     )
-    file_handler.setFormatter(formatter)
-    file_handler.setLevel(log_level)
 
-    # Remove default handlers and add our custom one
+    # The app logger goes through the root queue handler like everything else.
     app.logger.handlers = []
-    app.logger.addHandler(file_handler)
     app.logger.setLevel(log_level)
-
-    # Also configure the root logger
-    logging.basicConfig(level=log_level, handlers=[file_handler])
+    app.logger.propagate = True
@@ -0,0 +1,239 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+A deliberately small subset of ``prometheus_client`` (counters, gauges and
+histograms with labels) so the app does not take on another dependency. Values
+are per process; scrape each worker, or sum them in the query.
+"""
+
+from abc import ABC, abstractmethod
+import asyncio
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+import contextlib
+import math
+import threading
+import time
+
+# Request stages range from sub-millisecond (ID extraction) to minutes (retried calls).
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300,
+)
+
+LabelValues = tuple[str, ...]
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]: ...
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """A gauge whose value is read from ``callback`` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], dict[LabelValues, float]],
+        labels: tuple[str, ...] = (),
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self.callback().items()):
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: non-cumulative bucket counts, sum, count.
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, totals = self._values.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+            counts[index] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return int(entry[1][1]) if entry else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted((key, (list(c), list(t))) for key, (c, t) in self._values.items())
+        for key, (counts, (total, count)) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts, strict=True):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                labels = _format_labels(self.label_names, key, le)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {_format_value(count)}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register[M: Metric](self, metric: M) -> M:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "youtamp_stage_duration_seconds",
+        "Time spent in each stage of generating timestamps.",
+        labels=("stage", "outcome"),
+    )
+)
+GEMINI_ATTEMPTS = REGISTRY.register(
+    Counter("youtamp_gemini_attempts_total", "Gemini API calls, per attempt.", ("outcome",))
+)
+GEMINI_RETRIES = REGISTRY.register(
+    Counter(
+        "youtamp_gemini_retries_total",
+        "Gemini calls retried by tenacity after a 429 or 503.",
+        ("call",),
+    )
+)
+GEMINI_TOKENS = REGISTRY.register(
+    Counter(
+        "youtamp_gemini_tokens_total",
+        "Tokens reported in Gemini response usage metadata.",
+        ("model", "kind"),
+    )
+)
+GEMINI_QUARANTINES = REGISTRY.register(
+    Counter(
+        "youtamp_gemini_quarantines_total",
+        "Gemini key/model endpoints taken out of rotation.",
+        ("model", "reason"),
+    )
+)
+GEMINI_REJECTIONS = REGISTRY.register(
+    Counter(
+        "youtamp_gemini_rejections_total",
+        "Gemini calls and retries refused by the overload controller.",
+        ("reason",),
+    )
+)
+CACHE_REQUESTS = REGISTRY.register(
+    Counter("youtamp_cache_requests_total", "Cache lookups by result.", ("cache", "result"))
+)
+
+
+@contextlib.contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Times a stage into STAGE_SECONDS, labelled ``ok`` or ``error``.
+
+    Cancellation (a client going away) is recorded as ``cancelled``.
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage, outcome=outcome)
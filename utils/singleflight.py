@@ -0,0 +1,102 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+import concurrent.futures
+import logging
+import threading
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key.
+
+    The first caller for a key (the leader) runs the coroutine; everyone who
+    arrives while it is in flight awaits the same result, or the same exception.
+    Results are shared through a ``concurrent.futures.Future`` so callers on
+    different threads and event loops (Flask runs each async view on its own
+    loop) can still join the same flight.
+    """
+
+    def __init__(self, name: str = "singleflight") -> None:
+        self.name = name
+        self._flights: dict[Hashable, concurrent.futures.Future[Any]] = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def lead(self, key: Hashable) -> "Flight | None":
+        """Claims ``key`` for a caller that produces the result itself, such as a stream.
+
+        Returns None when a flight for ``key`` is already running (join it with
+        ``do``). The caller must settle the returned Flight, or followers wait forever.
+        """
+        with self._lock:
+            if key in self._flights:
+                return None
+            future: concurrent.futures.Future[Any] = concurrent.futures.Future()
+            self._flights[key] = future
+        return Flight(self, key, future)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            flight = self.lead(key)
+            if flight is not None:
+                break
+            with self._lock:
+                future = self._flights.get(key)
+            if future is None:
+                continue
+
+            logger.info(f"[{self.name}] Joining in-flight call for {key}")
+            try:
+                # Shield so a cancelled waiter does not cancel the shared future.
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if not future.cancelled() or (task is not None and task.cancelling()):
+                    raise
+                # The leader was cancelled (e.g. its client went away); take over.
+                logger.info(f"[{self.name}] Leader cancelled for {key}, retrying")
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        flight.set_result(result)
+        return result
+
+
+class Flight:
+    """The leader's side of one in-flight call; settling it releases the key."""
+
+    def __init__(
+        self, flights: SingleFlight, key: Hashable, future: concurrent.futures.Future[Any]
+    ) -> None:
+        self._flights = flights
+        self._key = key
+        self._future = future
+
+    def _release(self) -> None:
+        with self._flights._lock:
+            if self._flights._flights.get(self._key) is self._future:
+                del self._flights._flights[self._key]
+
+    def set_result(self, result: Any) -> None:
+        self._future.set_result(result)
+        self._release()
+
+    def set_exception(self, error: BaseException) -> None:
+        self._future.set_exception(error)
+        self._release()
+
+    def cancel(self) -> None:
+        """Lets a waiting follower take over, as when the leader's client went away."""
+        self._future.cancel()
+        self._release()
@@ -0,0 +1,82 @@
+"""Import-time report for cold starts (CLI runs, serverless workers, test runs).
+
+The module is imported in a fresh interpreter with ``-X importtime``, so the
+numbers are those of a real cold start rather than of the current process,
+which has already imported everything.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+import re
+import subprocess
+import sys
+import time
+
+import config
+
+# "import time: <self us> | <cumulative us> | <indent><module>"
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \| *(\S+)$")
+
+
+@dataclass(frozen=True, slots=True)
+class ImportTiming:
+    module: str
+    self_seconds: float
+
+
+@dataclass(frozen=True, slots=True)
+class StartupProfile:
+    module: str
+    wall_seconds: float
+    imports: list[ImportTiming]
+
+    @property
+    def import_seconds(self) -> float:
+        return sum(timing.self_seconds for timing in self.imports)
+
+    def by_package(self) -> list[tuple[str, float]]:
+        """Self time summed per top-level package, slowest first."""
+        totals: dict[str, float] = {}
+        for timing in self.imports:
+            package = timing.module.split(".")[0]
+            totals[package] = totals.get(package, 0.0) + timing.self_seconds
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def parse_importtime(lines: Iterable[str]) -> list[ImportTiming]:
+    timings = []
+    for line in lines:
+        match = IMPORTTIME_RE.match(line.rstrip())
+        if match:
+            self_us, module = match.groups()
+            timings.append(ImportTiming(module, int(self_us) / 1e6))
+    return timings
+
+
+def profile_startup(module: str) -> StartupProfile:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=config.PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    wall = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+    return StartupProfile(module, wall, parse_importtime(completed.stderr.splitlines()))
+
+
+def format_report(profile: StartupProfile, top: int = 15) -> str:
+    lines = [
+        (
+            f"Cold start of {profile.module}: {profile.wall_seconds:.2f}s wall, "
+            f"{profile.import_seconds:.2f}s importing {len(profile.imports)} modules"
+        ),
+        "",
+        "Slowest packages (self time of all their modules):",
+    ]
+    for package, seconds in profile.by_package()[:top]:
+        lines.append(f"  {seconds * 1000:8.1f} ms  {package}")
+    return "\n".join(lines)
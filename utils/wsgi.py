@@ -0,0 +1,60 @@
+from collections.abc import Callable, Iterable
+import logging
+import threading
+from typing import Any
+
+from werkzeug.wsgi import ClosingIterator
+
+logger = logging.getLogger(__name__)
+
+WSGIApp = Callable[[dict[str, Any], Callable[..., Any]], Iterable[bytes]]
+
+
+class DrainMiddleware:
+    """Tracks requests in flight so a server can shut down without cutting them off.
+
+    A request counts until its response is closed, which for a streamed response
+    is when the last event has been sent. Once ``drain`` is called, new requests
+    are turned away with a 503 so a load balancer retries them elsewhere.
+    """
+
+    def __init__(self, app: WSGIApp) -> None:
+        self.app = app
+        self._active = 0
+        self._draining = False
+        self._idle = threading.Condition()
+
+    def in_flight(self) -> int:
+        with self._idle:
+            return self._active
+
+    def __call__(
+        self, environ: dict[str, Any], start_response: Callable[..., Any]
+    ) -> Iterable[bytes]:
+        with self._idle:
+            if self._draining:
+                start_response(
+                    "503 Service Unavailable",
+                    [("Content-Type", "text/plain"), ("Retry-After", "1")],
+                )
+                return [b"Server is shutting down."]
+            self._active += 1
+        try:
+            response = self.app(environ, start_response)
+        except BaseException:
+            self._finish()
+            raise
+        return ClosingIterator(response, self._finish)
+
+    def _finish(self) -> None:
+        with self._idle:
+            self._active -= 1
+            self._idle.notify_all()
+
+    def drain(self, timeout: float) -> bool:
+        """Stops accepting requests and waits up to ``timeout`` for the rest to finish."""
+        with self._idle:
+            self._draining = True
+            if self._active:
+                logger.info(f"Waiting for {self._active} requests to finish")
+            return self._idle.wait_for(lambda: self._active == 0, timeout)